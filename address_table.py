@@ -0,0 +1,149 @@
+"""
+Address table helpers for PvZModTool
+Flattens addresses.py into entries and reads or writes them in bulk for either target
+"""
+import bisect
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import addresses
+from file_io_utils import file_io_manager, PROCESS_TARGET
+from relocation import address_relocator
+from write_queue import process_write_queue, MAX_WRITE_GAP
+
+
+# Entries closer than this are read together, reading the gap is cheaper than another read
+MAX_SPAN_GAP = 0x1000
+
+
+class AddressEntry(NamedTuple):
+    category: str
+    name: str
+    address: int
+    size: int
+
+
+def parse_address(address) -> List[int]:
+    """Normalize an addresses.py value (int, list of ints, '0x..' or '0x../0x..') to a list of ints"""
+    if isinstance(address, int):
+        return [address]
+    if isinstance(address, str):
+        return [int(part, 16) for part in address.split('/')]
+    return [value for item in address for value in parse_address(item)]
+
+
+def iter_entries() -> Iterator[AddressEntry]:
+    """Every address of every address editor category"""
+    for category, table in addresses.categories.items():
+        size = addresses.sizes.get(category, 4)
+        for name, address in table.items():
+            for value in parse_address(address):
+                yield AddressEntry(category, name, value, size)
+
+
+def coalesce_ranges(ranges: List[Tuple[int, int]], max_gap: int = MAX_SPAN_GAP) -> List[Tuple[int, int]]:
+    """Merge (address, size) ranges whose gaps are at most max_gap into (start, end) spans"""
+    spans = []
+    for address, size in sorted(ranges):
+        end = address + size
+        if spans and address - spans[-1][1] <= max_gap:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((address, end))
+    return spans
+
+
+def snapshot(target: str, entries: Optional[List[AddressEntry]] = None) -> Dict[AddressEntry, Optional[int]]:
+    """Read the current value of every entry with one read per coalesced span"""
+    entries = list(iter_entries()) if entries is None else entries
+    located = [(entry, address_relocator.translate(entry.address)) for entry in entries]
+    spans = coalesce_ranges([(address, entry.size) for entry, address in located if address is not None])
+
+    span_data = []
+    for start, end in spans:
+        span_data.append((start, end, file_io_manager.read_data(target, start, end - start)))
+    starts = [start for start, _, _ in span_data]
+
+    values = {}
+    for entry, address in located:
+        values[entry] = None
+        if address is None:
+            continue
+        start, end, data = span_data[bisect.bisect_right(starts, address) - 1]
+        if data is not None and address + entry.size <= end:
+            values[entry] = int.from_bytes(data[address - start:address - start + entry.size], byteorder='little')
+    return values
+
+
+def apply_preset(target: str, preset_name: str, manager=file_io_manager) -> Tuple[int, int, Optional[str]]:
+    """Write a spawn rate preset; returns (written, total, address that failed or None).
+
+    manager is another instance's FileIOManager when the preset fans out to several games.
+    """
+    preset_values = addresses.spawn_rate_values[preset_name]
+    located = [(address_str, address_relocator.translate(int(address_str, 16)), value)
+               for address_str, value in preset_values.items()]
+    written = 0
+    # The whole preset is one undo step
+    with manager.transaction(preset_name):
+        if target == PROCESS_TARGET:
+            # Spawn rate values sit next to each other: one read and one write per merged span
+            writes = []
+            for address_str, address, value in located:
+                if address is None:
+                    break
+                writes.append((address, bytes([value]), preset_name))
+            if manager is process_write_queue.manager:
+                process_write_queue.flush()  # Queued edits land first
+            results = manager.write_memory_batch(writes, MAX_WRITE_GAP)
+            written = results.index(False) if False in results else len(results)
+            failed = None if written == len(preset_values) else located[written][0]
+            return written, len(preset_values), failed
+
+        for address_str, address, value in located:
+            # Spawn rate values are single bytes
+            if address is None or not manager.write_data(target, address, value, size=1):
+                return written, len(preset_values), address_str
+            written += 1
+    return written, len(preset_values), None
+
+
+_label_cache = {}  # relocation table id -> (starts, spans)
+
+
+def address_labels() -> Tuple[List[int], List[Tuple[int, int, str]]]:
+    """Sorted (start, end, label) spans of every named address in the current build, plus their starts"""
+    key = id(address_relocator.table)
+    cached = _label_cache.get(key)
+    if cached is not None:
+        return cached
+
+    spans = []
+    for entry in iter_entries():
+        address = address_relocator.translate(entry.address)
+        if address is not None:
+            spans.append((address, address + entry.size, f"{entry.category}: {entry.name}"))
+    for name, info in addresses.multi_byte_replacements.items():
+        if isinstance(info, dict):
+            address = address_relocator.translate(info["addresses"])
+            if address is not None:
+                spans.append((address, address + len(info["original_bytes"]), name))
+    for address_str in {address_str for values in addresses.spawn_rate_values.values() for address_str in values}:
+        address = address_relocator.translate(int(address_str, 16))
+        if address is not None:
+            spans.append((address, address + 1, f"Spawn rate {address_str}"))
+    spans.sort()
+
+    _label_cache.clear()
+    _label_cache[key] = ([start for start, _, _ in spans], spans)
+    return _label_cache[key]
+
+
+def label_for(address: int, size: int = 1) -> Optional[str]:
+    """Name from addresses.py of the entry overlapping [address, address + size), or None"""
+    starts, spans = address_labels()
+    index = bisect.bisect_right(starts, address + size - 1) - 1
+    # Entries are small, looking a few back covers one that starts earlier but still overlaps
+    for start, end, label in reversed(spans[max(0, index - 4):index + 1]):
+        if start < address + size and address < end:
+            return label
+    return None
@@ -416,6 +416,35 @@ multi_byte_replacements = {
     }
 }
 
+# Wildcarded byte signatures for relocating patch points on other PvZ builds (GOTY, Steam, localized)
+# Key: file offset in this build, value: (pattern, offset of the patch point inside the pattern)
+# Addresses without a signature follow the nearest located signature in the section they land in,
+# so every section we patch needs one; a section without a located signature is not relocated
+# (see relocation.py)
+aob_signatures = {
+    0x030A25: ("C7 80 ?? ?? 00 00 06 27 00 00", 0),  # .text, Disable Sun Limit: mov [eax+5560h], 9990
+    0x030A7A: ("C7 40 ?? 9F 86 01 00", 0),  # .text, Disable Money Limit: mov [eax+28h], 99999
+    # .data, projectile table (type, image row, damage): Pea 20, Snow Pea 20, Cabbage 40, Melon 80, Puff 20
+    0x29F1C8: ("14 00 00 00 01 00 00 00 ?? ?? ?? ?? 14 00 00 00 02 00 00 00 ?? ?? ?? ?? 28 00 00 00 "
+               "03 00 00 00 ?? ?? ?? ?? 50 00 00 00 04 00 00 00 ?? ?? ?? ?? 14 00 00 00", 0),
+}
+
+# Address editor categories
+categories = {
+    "Sun Cost": sun_cost,
+    "Recharge": recharge,
+    "Action Rates": action_rates,
+    "Health & Armor": health_and_armor,
+    "Projectiles": projectiles,
+    "Damage": damage,
+    "First Zombie Arrival": first_zombie_arrival,
+    "Currency Prices": currency_prices,
+    "Prize Bags": prize_bags,
+    "Shop Prices": shop_prices,
+    "Minigame Flags": minigame_flags,
+    "Minigame Plants": minigame_plants,
+}
+
 # Sizes for each category (in bytes)
 sizes = {
     "Sun Cost": 4,
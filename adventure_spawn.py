@@ -1,44 +1,53 @@
 from tkinter import *
 from tkinter import filedialog, simpledialog, messagebox, ttk
 import os,shutil,struct
-from file_io_utils import file_io_manager
-    
+from file_io_utils import file_io_manager, PROCESS_TARGET
+from io_executor import io_executor, target_lane, PROCESS_LANE
+from process_discovery import PROCESS_ATTACHED
+from write_queue import process_write_queue, MAX_WRITE_GAP
+from process_snapshot import process_snapshot
+from process_fleet import process_fleet, failed_pids
+from relocation import address_relocator
+from instrumentation import instrumentation
+from project_index import project_index, SPAWN_TABLE_KEY
+# Таблица спавна: адрес клетки = 0x2A35B4 + x * 0x04 + y * 0xCC
+from spawn_table import (SpawnTable, SPAWN_BASE_ADDRESS, SPAWN_COLUMN_STRIDE, SPAWN_ROW_STRIDE, ROW_NAMES,
+                         COLUMN_NAMES, WORLDS, POOL_WORLDS, POOL_ROWS, row_index, table_size, world_columns,
+                         world_mask)
+
+# Переход, включающий спавн приключений (0x7D - jge, 0xEB - jmp)
+SPAWN_TOGGLE_ADDRESS = 0x00D6A3
+
+def fleet_error(results):
+    """Текст ошибки записи в несколько экземпляров игры или None, если записано везде"""
+    failed = failed_pids(results)
+    if not failed:
+        return None
+    pids = ", ".join(str(pid) for pid in failed)
+    return f"Записано в {len(results) - len(failed)} из {len(results)} экземпляров, ошибка в PID {pids}"
+
+
 class AdventureSpawnEditor:
     def __init__(self, parent_frame, project_path, main_menu):
         self.parent = parent_frame
         self.project_path = project_path
         self.main_menu = main_menu
-        self.grid_width = 50  # Ширина игрового поля (50 клеток)
-        self.grid_height = 32  # Высота игрового поля (32 клетки)
+        # Модель сетки: массив NumPy, массовые правки записываются только измененными клетками
+        self.spawn_table = SpawnTable()
+        self.grid_width = self.spawn_table.width  # Ширина игрового поля (50 клеток)
+        self.grid_height = self.spawn_table.height  # Высота игрового поля (32 клетки)
         self.cell_size = 24    # Размер клетки в пикселях (увеличен для лучшей видимости)
-        self.grid_data = [[0 for _ in range(self.grid_width)] for _ in range(self.grid_height)]  # 0 - красный, 1 - зеленый
-
-        # Загрузить текущие значения спавна в зависимости от глобального режима
-        self.load_spawn_values_from_current_mode()
+        self.grid_data = self.spawn_table.cells  # 0 - красный, 1 - зеленый
+        self.region_clipboard = None  # Скопированная область сетки
 
         # Инициализировать переменные для UI
-        self.spawn_checkbox_var = BooleanVar()
-        current_value = self.read_address_value(0x00D6A3, size=1)
-        if current_value is not None:
-            self.spawn_checkbox_var.set(current_value == 0xEB)
-        else:
-            self.spawn_checkbox_var.set(False)
+        self.spawn_checkbox_var = BooleanVar(value=False)
 
         # Названия рядов (зомби)
-        self.row_names = [
-            "Zombie", "Flag", "Conehead", "Pole Vaulter", "Buckethead", "Newspaper",
-            "Screen Door", "Football", "Dancing", "Backup Dancer", "Ducky Tube", "Snorkel",
-            "Zomboni", "Bobsled Team", "Dolphin Rider", "Jack-In-The-Box", "Balloon",
-            "Digger", "Pogo", "Yeti", "Bungee", "Ladder", "Catapult", "Gargantuar",
-            "Imp", "Zomboss", "Peashooter", "Wall-nut", "Jalapeno", "Gatling Pea",
-            "Squash", "Tall-Nut", "Giga-Garg"
-        ]
-
-        # Названия столбцов (уровни)
-        self.col_names = []
-        for world in range(1, 6):  # Миры 1-5
-            for level in range(1, 11):  # Уровни 1-10
-                self.col_names.append(f"{world}-{level}")
+        self.row_names = list(ROW_NAMES)
+
+        # Названия столбцов (уровни 1-1 .. 5-10)
+        self.col_names = list(COLUMN_NAMES)
 
         # Создать основную рамку для всего интерфейса
         self.main_frame = Frame(self.parent)
@@ -46,6 +55,7 @@ class AdventureSpawnEditor:
 
         # Создать кнопки управления
         self.create_control_buttons()
+        self.create_bulk_edit_controls()
 
         # Создать область с подписями и сеткой
         self.create_grid_area()
@@ -59,6 +69,16 @@ class AdventureSpawnEditor:
         self.canvas.bind("<Motion>", self.on_mouse_move)
         self.canvas.bind("<Leave>", self.hide_crosshair)
 
+        # Сетка из индекса проекта видна сразу, чтение EXE в фоне ее уточнит
+        cached = project_index.blob(SPAWN_TABLE_KEY) if self.current_mode() == "exe" else None
+        if cached:
+            self.apply_spawn_table(cached)
+            self.draw_grid()
+
+        # Загрузить текущие значения спавна и состояние переключателя в фоне
+        self.refresh_grid()
+        self.refresh_spawn_checkbox()
+
     def load_spawn_values_from_current_mode(self):
         """Загрузить текущие значения спавна в зависимости от глобального режима"""
         # Get global mode from main menu
@@ -72,6 +92,7 @@ class AdventureSpawnEditor:
         else:
             self.load_spawn_values_from_exe()
 
+    @instrumentation.timed("spawn.load_exe", "ui")
     def load_spawn_values_from_exe(self):
         """Загрузить текущие значения спавна из exe файла"""
         try:
@@ -80,104 +101,133 @@ class AdventureSpawnEditor:
             if not os.path.exists(exe_path):
                 return
 
-            # Чтение значений спавна для каждой клетки
-            base_address = 0x2A35B4
-            cells_read = 0
-            for row in range(self.grid_height):
-                for col in range(self.grid_width):
-                    # Рассчитать адрес спавна: 0x2A35B4 + x * 0x04 + y * 0xCC
-                    spawn_address = base_address + col * 0x04 + row * 0xCC
-
-                    # Чтение байта из exe файла
-                    value_bytes = file_io_manager.read_file_data(exe_path, spawn_address, size=1)
-
-                    if value_bytes is not None:
-                        # Convert bytes to integer
-                        import struct
-                        value = struct.unpack('<B', value_bytes)[0]
-                        # Установить значение в grid_data (1 если значение != 0, иначе 0)
-                        self.grid_data[row][col] = 1 if value != 0 else 0
-                        cells_read += 1
-                    else:
-                        print(f"Не удалось прочитать адрес {hex(spawn_address)}")
-                        self.grid_data[row][col] = 0
+            # Прочитать всю таблицу спавна одним блоком
+            base_address = self.spawn_base_address()
+            spawn_bytes = None
+            if base_address is not None:
+                spawn_bytes = file_io_manager.read_file_data(exe_path, base_address, self.spawn_table_size())
+            cells_read = self.apply_spawn_table(spawn_bytes)
 
+            if spawn_bytes is None:
+                print(f"Не удалось прочитать таблицу спавна по адресу {hex(SPAWN_BASE_ADDRESS)}")
             print(f"DEBUG: Successfully read {cells_read} cells from EXE file")
             print("Значения спавна загружены из EXE файла")
 
         except Exception as e:
             print(f"Ошибка загрузки значений спавна: {e}")
             # В случае ошибки заполнить сетку нулями
-            self.grid_data = [[0 for _ in range(self.grid_width)] for _ in range(self.grid_height)]
+            self.spawn_table.load(None)
 
+    @instrumentation.timed("spawn.load_process", "ui")
     def load_spawn_values_from_process(self):
         """Загрузить текущие значения спавна из процесса"""
         try:
-            import ctypes
-            import psutil
-            process_id = None
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] == 'PlantsVsZombies.exe':
-                    process_id = proc.info['pid']
-                    break
-
-            if not process_id:
+            if not file_io_manager.find_pvz_process():
                 if hasattr(self, 'coord_label'):
                     self.coord_label.config(text="PlantsVsZombies.exe не запущен")
                 return
 
-            process_handle = ctypes.windll.kernel32.OpenProcess(0x1F0FFF, False, process_id)
-            if not process_handle:
+            # Прочитать всю таблицу спавна одним блоком (с разбиением по секциям PE)
+            base_address = self.spawn_base_address()
+            if base_address is None:
+                if hasattr(self, 'coord_label'):
+                    self.coord_label.config(text="Таблица спавна не найдена в этой версии EXE")
+                return
+            spawn_bytes = file_io_manager.read_memory_data(base_address, self.spawn_table_size())
+            if spawn_bytes is None:
                 if hasattr(self, 'coord_label'):
                     self.coord_label.config(text="Не удалось подключиться к процессу")
                 return
 
-            # Чтение значений спавна для каждой клетки
-            base_address = 0x2A35B4
-            for row in range(self.grid_height):
-                for col in range(self.grid_width):
-                    # Рассчитать адрес спавна: 0x2A35B4 + x * 0x04 + y * 0xCC
-                    spawn_address = base_address + col * 0x04 + row * 0xCC
-                    process_address = spawn_address + 0x400000
-
-                    buffer = ctypes.create_string_buffer(1)
-                    bytes_read = ctypes.c_size_t()
-
-                    if ctypes.windll.kernel32.ReadProcessMemory(process_handle, ctypes.c_void_p(process_address), buffer, 1, ctypes.byref(bytes_read)):
-                        value = struct.unpack('<B', buffer.raw)[0]
-                        # Установить значение в grid_data (1 если значение != 0, иначе 0)
-                        self.grid_data[row][col] = 1 if value != 0 else 0
-                    else:
-                        print(f"Не удалось прочитать адрес {hex(spawn_address)} из процесса")
-                        self.grid_data[row][col] = 0
-
-            ctypes.windll.kernel32.CloseHandle(process_handle)
+            self.apply_spawn_table(spawn_bytes)
+
             print("Значения спавна загружены из процесса")
 
         except Exception as e:
             print(f"Ошибка загрузки значений спавна из процесса: {e}")
             # В случае ошибки заполнить сетку нулями
-            self.grid_data = [[0 for _ in range(self.grid_width)] for _ in range(self.grid_height)]
+            self.spawn_table.load(None)
 
-    def refresh_grid(self):
-        """Обновить сетку в зависимости от текущего режима"""
-        # Get global mode from main menu
+    def apply_spawn_table(self, spawn_bytes):
+        """Заполнить сетку из байтов таблицы спавна (None - все клетки выключены); возвращает число клеток"""
+        return self.spawn_table.load(spawn_bytes)
+
+    def current_mode(self):
+        """Глобальный режим редактирования: process или exe"""
         if hasattr(self, 'main_menu') and hasattr(self.main_menu, 'global_edit_mode_var'):
-            global_mode = self.main_menu.global_edit_mode_var.get()
- 
+            return self.main_menu.global_edit_mode_var.get()
+        return "process"  # Default fallback
+
+    def spawn_target(self):
+        """Цель чтения/записи для текущего режима: путь к EXE или процесс"""
+        if self.current_mode() == "process":
+            return PROCESS_TARGET
+        return self.project_path + "/PlantsVsZombies.exe"
+
+    def read_spawn_table(self, target):
+        """Прочитать таблицу спавна целиком (выполняется в фоновом потоке); возвращает (байты, ошибка)"""
+        base_address = self.spawn_base_address()
+        if base_address is None:
+            return None, "Таблица спавна не найдена в этой версии EXE"
+        size = self.spawn_table_size()
+        if target == PROCESS_TARGET:
+            # Таблица лежит в .data: свежий снимок секций данных читается парой больших чтений
+            if process_snapshot.refresh() and process_snapshot.covers(base_address, size):
+                return process_snapshot.read(base_address, size), None
+            if not file_io_manager.find_pvz_process():
+                return None, "PlantsVsZombies.exe не запущен"
+        elif not os.path.exists(target):
+            return None, "EXE файл не найден"
+        spawn_bytes = file_io_manager.read_data(target, base_address, size)
+        if spawn_bytes is None:
+            return None, "Не удалось прочитать таблицу спавна"
+        return spawn_bytes, None
+
+    def spawn_base_address(self):
+        """Адрес таблицы спавна в текущей сборке EXE (None, если не найден)"""
+        return address_relocator.translate(SPAWN_BASE_ADDRESS)
+
+    def spawn_table_size(self):
+        """Размер таблицы спавна в байтах (от первой до последней клетки)"""
+        return table_size(self.grid_height, self.grid_width)
 
-        if global_mode == "process":
-            self.load_spawn_values_from_process()
-        else:
-            self.load_spawn_values_from_exe()
+    def refresh_grid(self):
+        """Обновить сетку в зависимости от текущего режима (чтение в фоне)"""
+        global_mode = self.current_mode()
+        target = self.spawn_target()
+        io_executor.submit(self.read_spawn_table, target, key="spawn.grid", lane=target_lane(target),
+                           on_done=lambda result: self.show_spawn_table(global_mode, *result))
+
+    def show_spawn_table(self, global_mode, spawn_bytes, error):
+        """Показать прочитанную таблицу спавна (вызывается в потоке Tk)"""
+        if error is not None:
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text=error)
+            return
+        self.apply_spawn_table(spawn_bytes)
+        if global_mode == "exe" and spawn_bytes:
+            project_index.save_blob(SPAWN_TABLE_KEY, spawn_bytes)
 
         # Перерисовать сетку
         self.draw_grid()
         if hasattr(self, 'coord_label'):
             self.coord_label.config(text=f"Сетка обновлена ({global_mode})")
 
+    def refresh_spawn_checkbox(self):
+        """Прочитать состояние переключателя спавна в фоне"""
+        address = address_relocator.translate(SPAWN_TOGGLE_ADDRESS)
+        if address is None:
+            return
+        target = self.spawn_target()
+        io_executor.submit(file_io_manager.read_data, target, address, 1, key="spawn.toggle", lane=target_lane(target),
+                           on_done=lambda value: self.spawn_checkbox_var.set(value == b'\xEB'))
+
     def read_address_value(self, address, size=1):
         """Прочитать значение из адреса в процессе или exe файле"""
+        address = address_relocator.translate(address)
+        if address is None:
+            return None
+
         # Get global mode from main menu
         global_mode = "process"  # Default fallback
         if hasattr(self, 'main_menu') and hasattr(self.main_menu, 'global_edit_mode_var'):
@@ -186,34 +236,17 @@ class AdventureSpawnEditor:
         if global_mode == "process":
             return self.read_process_value(address, size)
         else:
-            return file_io_manager.read_file_data(self.project_path + "/PlantsVsZombies.exe", address, size)
+            value_bytes = file_io_manager.read_file_data(self.project_path + "/PlantsVsZombies.exe", address, size)
+            if value_bytes is None:
+                return None
+            return int.from_bytes(value_bytes, byteorder='little')
 
     def read_process_value(self, address, size=1):
         """Прочитать значение из процесса"""
         try:
-            import ctypes
-            import psutil
-            process_id = None
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] == 'PlantsVsZombies.exe':
-                    process_id = proc.info['pid']
-                    break
-
-            if process_id:
-                process_handle = ctypes.windll.kernel32.OpenProcess(0x1F0FFF, False, process_id)
-                if process_handle:
-                    buffer = ctypes.create_string_buffer(size)
-                    bytes_read = ctypes.c_size_t()
-
-                    process_address = address + 0x400000
-                    if ctypes.windll.kernel32.ReadProcessMemory(process_handle, ctypes.c_void_p(process_address), buffer, size, ctypes.byref(bytes_read)):
-                        if size == 1:
-                            return struct.unpack('<B', buffer.raw)[0]
-                        elif size == 2:
-                            return struct.unpack('<H', buffer.raw)[0]
-                        elif size == 4:
-                            return struct.unpack('<I', buffer.raw)[0]
-                    ctypes.windll.kernel32.CloseHandle(process_handle)
+            value_bytes = file_io_manager.read_memory_data(address, size)
+            if value_bytes is not None and size in (1, 2, 4):
+                return int.from_bytes(value_bytes, byteorder='little')
             return None
         except Exception as e:
             print(f"Error reading process value: {e}")
@@ -241,10 +274,138 @@ class AdventureSpawnEditor:
         self.refresh_button = Button(inner_button_frame, text="Обновить сетку", command=self.refresh_grid)
         self.refresh_button.pack(side=LEFT, padx=5)
 
+        # Кнопка записи всей сетки во все выбранные экземпляры игры
+        self.push_layout_button = Button(inner_button_frame, text="Записать сетку в игры", command=self.push_layout)
+        self.push_layout_button.pack(side=LEFT, padx=5)
+
         # Метка для отображения статуса
         self.coord_label = Label(inner_button_frame, text="Режим: Процесс", fg="blue")
         self.coord_label.pack(side=LEFT, padx=5)
 
+    def create_bulk_edit_controls(self):
+        """Массовые правки: ряд зомби по миру, копирование миров и областей, маска бассейна"""
+        bulk_frame = Frame(self.parent)
+        bulk_frame.pack(padx=10, fill=X)
+
+        Label(bulk_frame, text="Зомби:").pack(side=LEFT, padx=2)
+        self.bulk_row_combo = ttk.Combobox(bulk_frame, state="readonly", width=16,
+                                           values=["Все"] + self.row_names[:self.grid_height])
+        self.bulk_row_combo.current(0)
+        self.bulk_row_combo.pack(side=LEFT, padx=2)
+        Label(bulk_frame, text="Мир:").pack(side=LEFT, padx=2)
+        world_values = ["Все"] + [str(world) for world in range(1, WORLDS + 1)]
+        self.bulk_world_combo = ttk.Combobox(bulk_frame, state="readonly", width=4, values=world_values)
+        self.bulk_world_combo.current(0)
+        self.bulk_world_combo.pack(side=LEFT, padx=2)
+        Button(bulk_frame, text="Включить", command=lambda: self.bulk_set(1)).pack(side=LEFT, padx=2)
+        Button(bulk_frame, text="Выключить", command=lambda: self.bulk_set(0)).pack(side=LEFT, padx=2)
+        Button(bulk_frame, text="Копировать", command=self.copy_region).pack(side=LEFT, padx=2)
+        Button(bulk_frame, text="Вставить", command=self.paste_region).pack(side=LEFT, padx=2)
+
+        Label(bulk_frame, text="Мир").pack(side=LEFT, padx=(10, 2))
+        self.copy_source_combo = ttk.Combobox(bulk_frame, state="readonly", width=3, values=world_values[1:])
+        self.copy_source_combo.current(0)
+        self.copy_source_combo.pack(side=LEFT)
+        Label(bulk_frame, text="→").pack(side=LEFT)
+        self.copy_destination_combo = ttk.Combobox(bulk_frame, state="readonly", width=3, values=world_values[1:])
+        self.copy_destination_combo.current(1)
+        self.copy_destination_combo.pack(side=LEFT)
+        Button(bulk_frame, text="Копировать мир", command=self.copy_world).pack(side=LEFT, padx=2)
+
+        Button(bulk_frame, text="Водные зомби только в бассейне",
+               command=self.mask_pool_zombies).pack(side=LEFT, padx=(10, 2))
+
+    def bulk_selection(self):
+        """Ряды и столбцы, выбранные в полях массовых правок"""
+        row = self.bulk_row_combo.get()
+        world = self.bulk_world_combo.get()
+        rows = slice(None) if row == "Все" else row_index(row)
+        cols = slice(None) if world == "Все" else world_columns(int(world))
+        return rows, cols
+
+    def bulk_set(self, value):
+        """Включить или выключить выбранного зомби в выбранном мире"""
+        rows, cols = self.bulk_selection()
+        label = f"Спавн {self.bulk_row_combo.get()} мир {self.bulk_world_combo.get()} " + ("вкл" if value else "выкл")
+        self.spawn_table.set(rows, cols, value)
+        self.write_pending(label)
+
+    def copy_world(self):
+        source, destination = int(self.copy_source_combo.get()), int(self.copy_destination_combo.get())
+        if source == destination:
+            return
+        self.spawn_table.copy_world(source, destination)
+        self.write_pending(f"Спавн: мир {source} → мир {destination}")
+
+    def mask_pool_zombies(self):
+        """Выключить водных зомби на уровнях без бассейна"""
+        pool_rows = [row_index(name) for name in POOL_ROWS]
+        self.spawn_table.set_mask(self.spawn_table.mask(pool_rows, ~world_mask(POOL_WORLDS)), 0)
+        self.write_pending("Спавн: водные зомби только в бассейне")
+
+    def copy_region(self):
+        """Запомнить выбранную область сетки"""
+        self.region_clipboard = self.spawn_table.copy_region(*self.bulk_selection())
+        if hasattr(self, 'coord_label'):
+            rows, cols = self.region_clipboard.shape
+            self.coord_label.config(text=f"Скопирована область {rows}x{cols}")
+
+    def paste_region(self):
+        """Вставить скопированную область в левый верхний угол выбранной"""
+        if self.region_clipboard is None:
+            return
+        rows, cols = self.bulk_selection()
+        row = 0 if isinstance(rows, slice) else rows
+        col = 0 if cols.start is None else cols.start
+        self.spawn_table.paste_region(self.region_clipboard, row, col)
+        self.write_pending("Спавн: вставка области")
+
+    def write_pending(self, label):
+        """Показать и записать одним пакетом только клетки, изменившиеся после правки модели"""
+        change = self.spawn_table.pending()
+        if not len(change):
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text="Нет изменений")
+            return
+        base_address = self.spawn_base_address()
+        if base_address is None:
+            self.spawn_table.rollback(change)
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text="Адрес таблицы спавна не найден в этой версии EXE")
+            return
+        self.draw_grid()
+        writes = self.spawn_table.writes(base_address, change, label)
+        target = self.spawn_target()
+        io_executor.submit(self.write_spawn_batch, target, writes, label, lane=target_lane(target),
+                           on_done=lambda result: self.on_pending_written(change, *result))
+
+    def write_spawn_batch(self, target, writes, label):
+        """Записать клетки одним пакетом (выполняется в фоновом потоке); возвращает (записано в цель, ошибка)"""
+        if target == PROCESS_TARGET and process_fleet.active:
+            results = process_fleet.write_batch(writes, MAX_WRITE_GAP, label=label)
+            # Сетка показывает основной экземпляр
+            return results[0].ok, fleet_error(results)
+        if target == PROCESS_TARGET:
+            if not file_io_manager.find_pvz_process():
+                return False, "PlantsVsZombies.exe не запущен"
+            process_write_queue.flush()  # Клики в очереди ложатся первыми
+        elif not os.path.exists(target):
+            return False, "EXE файл не найден"
+        with file_io_manager.transaction(label):
+            results = file_io_manager.write_batch(target, writes, MAX_WRITE_GAP)
+        if not all(results):
+            return False, "Не удалось записать в процесс" if target == PROCESS_TARGET else "Ошибка записи в exe файл"
+        return True, None
+
+    def on_pending_written(self, change, written, error):
+        """Отметить пакет записанным или откатить его клетки (вызывается в потоке Tk)"""
+        if written:
+            self.spawn_table.mark_written(change)
+        elif self.spawn_table.rollback(change).any():
+            self.draw_grid()
+        if hasattr(self, 'coord_label'):
+            self.coord_label.config(text=error or f"Записано клеток: {len(change)}")
+
     def get_column_x_position(self, col):
         """Получить x-позицию столбца без отступов между мирами"""
         label_width = 120
@@ -295,6 +456,7 @@ class AdventureSpawnEditor:
             x_pos = x1 + self.cell_size//2
             self.canvas.create_text(x_pos, label_height//2,
                                   text=col_name, anchor=CENTER, font=("Arial", 9), fill="white")
+    @instrumentation.timed("spawn.draw_grid", "ui")
     def draw_grid(self):
         """Нарисовать сетку клеток"""
         self.canvas.delete("all")  # Очистить canvas
@@ -356,36 +518,108 @@ class AdventureSpawnEditor:
             return col
         return -1
 
+    @instrumentation.timed("spawn.cell_click", "ui")
     def on_cell_click(self, event):
         col = self.get_column_from_x(event.x)
         row = (event.y - 30) // self.cell_size   # Отступ сверху 30px
 
         # Проверить границы
         if 0 <= row < self.grid_height and 0 <= col < self.grid_width:
-            new_value = 1 - self.grid_data[row][col]  # 0 -> 1, 1 -> 0
-
-            base_address = 0x2A35B4
-            spawn_address = base_address + col * 0x04 + row * 0xCC
+            new_value = 1 - int(self.grid_data[row][col])  # 0 -> 1, 1 -> 0
 
-            # Сохранить изменения в зависимости от выбранного режима
-            write_success = False
-            # Get global mode from main menu
-            if hasattr(self, 'main_menu') and hasattr(self.main_menu, 'global_edit_mode_var'):
-                global_mode = self.main_menu.global_edit_mode_var.get()
-            else:
-                global_mode = "process"  # Default fallback
+            base_address = self.spawn_base_address()
+            if base_address is None:
+                return
+            spawn_address = base_address + col * SPAWN_COLUMN_STRIDE + row * SPAWN_ROW_STRIDE
+
+            # Показать новое значение сразу, запись идет в фоне и откатывается при ошибке
+            self.grid_data[row][col] = new_value
+            self.update_cell(row, col)
+            self.on_mouse_move(event)  # Pass the event to show crosshair at clicked position
+
+            label = f"Спавн {self.row_names[row]} {self.col_names[col]}"
+            target = self.spawn_target()
+            if target == PROCESS_TARGET and process_fleet.active:
+                io_executor.submit(process_fleet.write, spawn_address, new_value, 1, label, lane=PROCESS_LANE,
+                                   on_done=lambda results: self.on_fleet_cell_written(row, col, new_value, results))
+                return
+            if target == PROCESS_TARGET:
+                # Быстрые клики по соседним клеткам уходят в процесс одной записью
+                process_write_queue.write(spawn_address, new_value, size=1, label=label,
+                                          on_done=lambda success: io_executor.call_in_ui(
+                                              self.on_cell_written, row, col, new_value,
+                                              None if success else "Не удалось записать в процесс"))
+                return
+            io_executor.submit(self.write_spawn_value, target, spawn_address, new_value, label,
+                               on_done=lambda error: self.on_cell_written(row, col, new_value, error))
+
+    def write_spawn_value(self, target, address, value, label=None):
+        """Записать байт спавна (выполняется в фоновом потоке); возвращает текст ошибки или None"""
+        if target == PROCESS_TARGET and process_fleet.active:
+            return fleet_error(process_fleet.write(address, value, 1, label or f"Спавн {hex(address)}"))
+        with file_io_manager.transaction(label or f"Спавн {hex(address)}"):
+            return self._write_spawn_value(target, address, value)
+
+    def _write_spawn_value(self, target, address, value):
+        if target == PROCESS_TARGET:
+            if not file_io_manager.find_pvz_process():
+                return "PlantsVsZombies.exe не запущен"
+        elif not os.path.exists(target):
+            return "EXE файл не найден"
+        # write_file_data создает бэкап перед изменением
+        if not file_io_manager.write_data(target, address, value, size=1):
+            return "Не удалось записать в процесс" if target == PROCESS_TARGET else "Ошибка записи в exe файл"
+        return None
+
+    def on_cell_written(self, row, col, value, error):
+        """Откатить клетку, если запись не удалась (вызывается в потоке Tk)"""
+        if error is None:
+            self.spawn_table.mark_cell_written(row, col, value)
+            return
+        if self.grid_data[row][col] == value:
+            self.grid_data[row][col] = 1 - value
+            self.update_cell(row, col)
+        if hasattr(self, 'coord_label'):
+            self.coord_label.config(text=error)
+
+    def on_fleet_cell_written(self, row, col, value, results):
+        """Итог записи клетки в несколько экземпляров (вызывается в потоке Tk)"""
+        error = fleet_error(results)
+        if results and not results[0].ok:
+            # Сетка показывает основной экземпляр: откатить клетку
+            self.on_cell_written(row, col, value, error)
+            return
+        self.spawn_table.mark_cell_written(row, col, value)
+        if error and hasattr(self, 'coord_label'):
+            self.coord_label.config(text=error)
+
+    def spawn_layout_writes(self):
+        """Записи (адрес, байт, подпись) всей сетки для write_memory_batch; None, если таблица не найдена"""
+        base_address = self.spawn_base_address()
+        if base_address is None:
+            return None
+        return self.spawn_table.writes(base_address, self.spawn_table.layout(), "Сетка спавна")
 
-            if global_mode == "process":
-                write_success = self.write_spawn_value_to_process(spawn_address, new_value)
-            else:
-                write_success = self.write_spawn_value_to_exe(spawn_address, new_value)
+    def push_layout(self):
+        """Записать всю сетку во все выбранные экземпляры игры одной пакетной записью на экземпляр"""
+        if self.current_mode() != "process":
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text="Запись сетки в игры работает только в режиме процесса")
+            return
+        writes = self.spawn_layout_writes()
+        if writes is None:
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text="Адрес таблицы спавна не найден в этой версии EXE")
+            return
+        io_executor.submit(process_fleet.write_batch, writes, label="Сетка спавна", lane=PROCESS_LANE,
+                           on_done=self.on_layout_pushed)
 
-            # Обновить клетку только если запись прошла успешно
-            if write_success:
-                self.grid_data[row][col] = new_value
-                self.update_cell(row, col)
-                self.on_mouse_move(event)  # Pass the event to show crosshair at clicked position
+    def on_layout_pushed(self, results):
+        """Показать итог записи сетки по экземплярам (вызывается в потоке Tk)"""
+        if hasattr(self, 'coord_label'):
+            self.coord_label.config(text=fleet_error(results) or f"Сетка записана в экземпляры: {len(results)}")
 
+    @instrumentation.timed("spawn.update_cell", "ui")
     def update_cell(self, row, col):
         """Обновить цвет одной клетки"""
         # Добавить отступы для позиционирования клетки
@@ -403,6 +637,7 @@ class AdventureSpawnEditor:
         # Обновить клетку
         self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="gray", width=1)
 
+    @instrumentation.timed("spawn.mouse_move", "ui")
     def on_mouse_move(self, event=None):
         """Обработчик движения мыши - отображение креста курсора"""
         # Удалить старый крест
@@ -429,45 +664,28 @@ class AdventureSpawnEditor:
             self.canvas.delete(line)
         self.crosshair_lines.clear()
 
+    @instrumentation.timed("spawn.write_process", "ui")
     def write_spawn_value_to_process(self, address, value):
         """Записать значение в адрес спавна в процессе"""
         try:
-            import ctypes
-            import psutil
-            process_id = None
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] == 'PlantsVsZombies.exe':
-                    process_id = proc.info['pid']
-                    break
-
-            if process_id:
-                process_handle = ctypes.windll.kernel32.OpenProcess(0x1F0FFF, False, process_id)
-
-                if process_handle:
-                    buffer = struct.pack('<B', value)
-                    bytes_written = ctypes.c_size_t()
-
-                    process_address = address + 0x400000
-
-                    if ctypes.windll.kernel32.WriteProcessMemory(process_handle,ctypes.c_void_p(process_address),buffer,1,ctypes.byref(bytes_written)):
-                        return True
-                    else:
-                        return False
-                else:
-                    if hasattr(self, 'coord_label'):
-                        self.coord_label.config(text="Не удалось подключиться к процессу")
-                    return False
-            else:
+            if not file_io_manager.find_pvz_process():
                 if hasattr(self, 'coord_label'):
                     self.coord_label.config(text="PlantsVsZombies.exe не запущен")
                 return False
 
+            if file_io_manager.write_memory_data(address, value, size=1):
+                return True
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text="Не удалось записать в процесс")
+            return False
+
         except Exception as e:
             if hasattr(self, 'coord_label'):
                 self.coord_label.config(text=f"Ошибка записи спавна: {e}")
             print(f"Error writing spawn value: {e}")
             return False
 
+    @instrumentation.timed("spawn.write_exe", "ui")
     def write_spawn_value_to_exe(self, address, value):
         """Записать значение в адрес спавна в exe файл"""
         try:
@@ -475,17 +693,8 @@ class AdventureSpawnEditor:
             if not os.path.exists(exe_path):
                 return False
 
-            # Создать бэкап перед изменением
-            backup_path = exe_path + '.backup'
-            shutil.copy2(exe_path, backup_path)
-
-            with open(exe_path, 'r+b') as f:
-                file_address = address
-                f.seek(file_address)
-
-                data = struct.pack('<B', value)
-                f.write(data)
-                return True
+            # write_file_data создает бэкап перед изменением
+            return file_io_manager.write_file_data(exe_path, address, value, size=1)
 
         except Exception as e:
             if hasattr(self, 'coord_label'):
@@ -493,6 +702,16 @@ class AdventureSpawnEditor:
             print(f"Error writing to exe file: {e}")
             return False
 
+    def on_process_event(self, event, pid):
+        """Игра запущена или закрыта (вызывается в потоке Tk)"""
+        if self.current_mode() != "process":
+            return
+        if event == PROCESS_ATTACHED:
+            self.refresh_grid()
+            self.refresh_spawn_checkbox()
+        elif hasattr(self, 'coord_label'):
+            self.coord_label.config(text="PlantsVsZombies.exe закрыт")
+
     def on_global_mode_changed(self):
         """Обработчик изменения глобального режима редактирования"""
         # Update status label to show current mode
@@ -545,32 +764,39 @@ class AdventureSpawnEditor:
             # Обновить сетку для загрузки данных из EXE файла
             self.refresh_grid()
 
+    @instrumentation.timed("spawn.toggle", "ui")
     def on_spawn_checkbox_changed(self):
         """Обработчик изменения состояния чекбокса спавна"""
-        address = 0x00D6A3
+        address = address_relocator.translate(SPAWN_TOGGLE_ADDRESS)
+        if address is None:
+            if hasattr(self, 'coord_label'):
+                self.coord_label.config(text="Адрес спавна не найден в этой версии EXE")
+            return
         if self.spawn_checkbox_var.get():
             new_value = 0xEB
         else:
             new_value = 0x7D
 
         # Записать значение в зависимости от режима редактирования
-        # Get global mode from main menu
-        if hasattr(self, 'main_menu') and hasattr(self.main_menu, 'global_edit_mode_var'):
-            global_mode = self.main_menu.global_edit_mode_var.get()
-        else:
-            global_mode = "process"  # Default fallback
-
-        if global_mode == "process":
-            self.write_spawn_value_to_process(address, new_value)
-        else:
-            self.write_spawn_value_to_exe(address, new_value)
+        label = "Спавн приключений " + ("вкл" if new_value == 0xEB else "выкл")
+        target = self.spawn_target()
+        io_executor.submit(self.write_spawn_value, target, address, new_value, label, lane=target_lane(target),
+                           on_done=self.on_spawn_toggle_written)
+
+    def on_spawn_toggle_written(self, error):
+        """Вернуть чекбокс к фактическому состоянию, если запись не удалась (вызывается в потоке Tk)"""
+        if error is None:
+            return
+        if hasattr(self, 'coord_label'):
+            self.coord_label.config(text=error)
+        self.refresh_spawn_checkbox()
 
     def get_grid_data(self):
         """Получить данные сетки"""
-        return self.grid_data.copy()
+        return self.spawn_table.tolist()
 
     def set_grid_data(self, data):
         """Установить данные сетки"""
         if len(data) == self.grid_height and len(data[0]) == self.grid_width:
-            self.grid_data = [row[:] for row in data]
+            self.spawn_table.cells[:] = data
             self.draw_grid()
\ No newline at end of file
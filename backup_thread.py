@@ -1,5 +1,6 @@
 import threading
 from file_io_utils import file_io_manager
+from instrumentation import instrumentation
 
 
 class BackupThread(threading.Thread):
@@ -11,6 +12,7 @@ class BackupThread(threading.Thread):
         self.backup_path = backup_path
         self.progress_callback = progress_callback
 
+    @instrumentation.timed("backup.thread", "backup")
     def run(self):
         """Main thread method using optimized batch operations"""
         try:
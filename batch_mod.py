@@ -0,0 +1,281 @@
+"""
+Batch mod for PvZModTool
+Applies one set of address edits, byte patches and spawn layouts to the EXE of many projects
+in parallel, one all-or-nothing transaction per project
+
+The mod is a JSON file:
+    {
+        "label": "Release 1.2",
+        "values": {"Category": {"Name": 100}},
+        "patches": {"Disable Sun Limit": true, "Disable Money Limit": false},
+        "spawn_preset": "Normal (117, 73)",
+        "spawn_grid": ["0110...", ...]
+    }
+every key is optional; patches map to true (apply) or false (restore the original bytes), and
+spawn_grid has one string of 0/1 per row of the adventure spawn table.
+
+Usage:
+    python batch_mod.py mod.json projects/en projects/de projects/test
+    python batch_mod.py mod.json --projects-from release_projects.txt --workers 8
+"""
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import addresses
+from address_table import coalesce_ranges, parse_address
+from relocation import address_relocator
+from spawn_table import SpawnTable, SPAWN_BASE_ADDRESS, GRID_HEIGHT, GRID_WIDTH
+from write_log import WriteLog, LOG_FILE_NAME
+
+
+EXE_NAME = "PlantsVsZombies.exe"
+
+
+class ModSpec(NamedTuple):
+    label: str
+    values: List[Tuple[str, str, int]]  # (category, name, value)
+    patches: Dict[str, bool]  # Patch name -> apply (True) or restore the original bytes (False)
+    spawn_preset: Optional[str]
+    spawn_grid: Optional[List[List[int]]]  # [row][column] -> 0 or 1
+
+
+class ProjectResult(NamedTuple):
+    project: str
+    written: int  # Writes that changed bytes
+    unchanged: int  # Writes whose bytes were already in place
+    unresolved: List[str]  # Edits whose address was not found in this build
+    bytes_written: int
+    seconds: float
+    error: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchReport(NamedTuple):
+    results: List[ProjectResult]
+    seconds: float
+
+    @property
+    def failed(self) -> List[ProjectResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def projects_per_second(self) -> float:
+        return len(self.results) / self.seconds if self.seconds > 0 else 0.0
+
+
+def load_mod(mod_path: str) -> ModSpec:
+    """Read and validate a mod file; ValueError names the first unknown entry"""
+    with open(mod_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return parse_mod(data, os.path.splitext(os.path.basename(mod_path))[0])
+
+
+def parse_mod(data: Dict, default_label: str = "Batch mod") -> ModSpec:
+    values = []
+    for category, table in data.get("values", {}).items():
+        if category not in addresses.categories:
+            raise ValueError(f"Unknown category {category}")
+        for name, value in table.items():
+            if name not in addresses.categories[category]:
+                raise ValueError(f"Unknown address {category}: {name}")
+            size = addresses.sizes.get(category, 4)
+            if not 0 <= int(value) < 1 << (8 * size):
+                raise ValueError(f"{category}: {name} = {value} does not fit in {size} bytes")
+            values.append((category, name, int(value)))
+
+    patches = {}
+    for name, apply in data.get("patches", {}).items():
+        if not isinstance(addresses.multi_byte_replacements.get(name), dict):
+            raise ValueError(f"Unknown patch {name}")
+        patches[name] = bool(apply)
+
+    spawn_preset = data.get("spawn_preset")
+    if spawn_preset is not None and spawn_preset not in addresses.spawn_rate_values:
+        raise ValueError(f"Unknown spawn rate preset {spawn_preset}")
+
+    spawn_grid = None
+    if data.get("spawn_grid") is not None:
+        rows = data["spawn_grid"]
+        if len(rows) != GRID_HEIGHT or any(len(row) != GRID_WIDTH for row in rows):
+            raise ValueError(f"spawn_grid must be {GRID_HEIGHT} rows of {GRID_WIDTH} cells")
+        spawn_grid = [[1 if int(cell) else 0 for cell in row] for row in rows]
+
+    return ModSpec(data.get("label") or default_label, values, patches, spawn_preset, spawn_grid)
+
+
+def mod_writes(mod: ModSpec) -> Tuple[List[Tuple[int, bytes, str]], List[str]]:
+    """(offset, bytes, label) writes of the mod in the build address_relocator is loaded for,
+    and the names of edits that could not be located in it.
+
+    An address whose own signature was not found counts as unresolved even when it could be
+    inferred from a nearby one: a batch writes into EXEs nobody looks at before release.
+    """
+    writes, unresolved = [], []
+    table = address_relocator.table
+    missing = set(table.missing) if table is not None else set()
+
+    def add(address: int, data: bytes, label: str):
+        located = None if address in missing else address_relocator.translate(address)
+        if located is None:
+            unresolved.append(label)
+        else:
+            writes.append((located, data, label))
+
+    for category, name, value in mod.values:
+        size = addresses.sizes.get(category, 4)
+        for address in parse_address(addresses.categories[category][name]):
+            add(address, value.to_bytes(size, byteorder='little'), f"{category}: {name}")
+    for name, apply in mod.patches.items():
+        info = addresses.multi_byte_replacements[name]
+        add(info["addresses"], info["replacement_bytes"] if apply else info["original_bytes"], name)
+    if mod.spawn_preset is not None:
+        for address_str, value in addresses.spawn_rate_values[mod.spawn_preset].items():
+            add(int(address_str, 16), bytes([value]), mod.spawn_preset)
+    if mod.spawn_grid is not None:
+        base_address = None if SPAWN_BASE_ADDRESS in missing else address_relocator.translate(SPAWN_BASE_ADDRESS)
+        if base_address is None:
+            unresolved.append("Spawn grid")
+        else:
+            # Cells are written straight from the located base, like the spawn editor does
+            grid = SpawnTable()
+            grid.cells[:] = mod.spawn_grid
+            writes.extend(grid.writes(base_address, grid.layout(), "Spawn grid"))
+    return writes, unresolved
+
+
+def apply_to_project(project_path: str, mod: ModSpec, strict: bool = False) -> ProjectResult:
+    """Apply mod to the project's EXE as one transaction (runs in a worker process).
+
+    The new image is written to a copy that replaces the EXE only when every write is in
+    place, so a failing project is left untouched. The changed bytes are appended to the
+    project's write log as one record, like an edit made in the tool.
+    """
+    start = time.perf_counter()
+    exe_path = os.path.join(project_path, EXE_NAME)
+
+    def failed(error: str, unresolved: Optional[List[str]] = None) -> ProjectResult:
+        return ProjectResult(project_path, 0, 0, unresolved or [], 0, time.perf_counter() - start, error)
+
+    if not os.path.isfile(exe_path):
+        return failed(f"{EXE_NAME} not found")
+    previous_table = address_relocator.table
+    try:
+        table = address_relocator.load_for_exe(exe_path)
+        # No signature located: the offsets of addresses.py mean nothing in this file
+        if table is None or not table.identified:
+            return failed("Cannot identify the EXE build: no signature found")
+        writes, unresolved = mod_writes(mod)
+    finally:
+        address_relocator.table = previous_table
+    if strict and unresolved:
+        return failed(f"{len(unresolved)} edits not found in this build", unresolved)
+
+    try:
+        with open(exe_path, 'rb') as f:
+            image = bytearray(f.read())
+        changes = []  # (offset, old, new, label)
+        for offset, data, label in writes:
+            end = offset + len(data)
+            if end > len(image):
+                return failed(f"{label} at {hex(offset)} is past the end of the EXE", unresolved)
+            old = bytes(image[offset:end])
+            if old != data:
+                image[offset:end] = data
+                changes.append((offset, old, data, label))
+
+        spans = coalesce_ranges([(offset, len(new)) for offset, _, new, _ in changes], max_gap=0)
+        if spans:
+            temp_path = exe_path + ".batch"
+            shutil.copyfile(exe_path, temp_path)
+            with open(temp_path, 'r+b') as f:
+                for span_start, span_end in spans:
+                    f.seek(span_start)
+                    f.write(image[span_start:span_end])
+            os.replace(temp_path, exe_path)
+            project_log = WriteLog()
+            project_log.open(os.path.join(project_path, LOG_FILE_NAME), exe_path)
+            project_log.on_commit(mod.label, [(exe_path, offset, old, new) for offset, old, new, _ in changes])
+    except OSError as e:
+        return failed(str(e), unresolved)
+    return ProjectResult(project_path, len(changes), len(writes) - len(changes), unresolved,
+                         sum(span_end - span_start for span_start, span_end in spans),
+                         time.perf_counter() - start, None)
+
+
+def run_batch(projects: List[str], mod: ModSpec, workers: Optional[int] = None, strict: bool = False,
+              on_result: Optional[Callable[[ProjectResult], None]] = None) -> BatchReport:
+    """Apply mod to every project, workers processes at a time (default: one per core).
+
+    Results come back in the order of projects; on_result sees each one as it finishes.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    by_project: Dict[str, ProjectResult] = {}
+    if workers == 1 or len(projects) == 1:
+        for project in projects:
+            by_project[project] = apply_to_project(project, mod, strict)
+            if on_result:
+                on_result(by_project[project])
+    else:
+        with ProcessPoolExecutor(min(workers, len(projects))) as pool:
+            futures = {pool.submit(apply_to_project, project, mod, strict): project for project in projects}
+            for future in as_completed(futures):
+                project = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = ProjectResult(project, 0, 0, [], 0, 0.0, f"Worker failed: {e}")
+                by_project[project] = result
+                if on_result:
+                    on_result(result)
+    return BatchReport([by_project[project] for project in projects], time.perf_counter() - start)
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Apply one mod to the EXE of many projects")
+    parser.add_argument("mod", help="Mod file (JSON)")
+    parser.add_argument("projects", nargs="*", help="Project folders")
+    parser.add_argument("--projects-from", help="Text file with one project folder per line")
+    parser.add_argument("--workers", type=int, help="Projects processed at once (default: one per core)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Leave a project untouched if any edit is not found in its build")
+    args = parser.parse_args(argv)
+
+    projects = list(args.projects)
+    if args.projects_from:
+        with open(args.projects_from, 'r', encoding='utf-8') as f:
+            projects.extend(line.strip() for line in f if line.strip())
+    if not projects:
+        parser.error("no project folders given")
+    try:
+        mod = load_mod(args.mod)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load mod: {e}")
+        return 1
+
+    def show(result: ProjectResult):
+        if result.ok:
+            skipped = f", {len(result.unresolved)} not found" if result.unresolved else ""
+            print(f"{result.project}: {result.written} writes, {result.unchanged} already set{skipped} "
+                  f"({result.seconds * 1000:.0f} ms)")
+        else:
+            print(f"{result.project}: FAILED - {result.error}")
+
+    report = run_batch(projects, mod, args.workers, args.strict, on_result=show)
+    written = sum(result.bytes_written for result in report.results)
+    print(f"{mod.label}: {len(report.results) - len(report.failed)}/{len(report.results)} projects, "
+          f"{written} bytes in {report.seconds:.2f} s ({report.projects_per_second:.1f} projects/s)")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
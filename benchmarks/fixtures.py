@@ -0,0 +1,176 @@
+"""
+Benchmark fixtures for PvZModTool
+Synthetic PvZ-sized EXE, simulated process backend and a realistic project tree
+"""
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import addresses
+from pe_sections import parse_section_map, HEADER_READ_SIZE
+
+
+EXE_SIZE = 0x2A0000 + 0x10000  # Same order as PlantsVsZombies.exe 1.0.0.1051 (~2.6 MB)
+IMAGE_BASE = 0x400000
+
+# name, rva, size; raw offset == rva like the retail EXE
+SECTIONS = [
+    (".text", 0x1000, 0x1FF000),
+    (".rdata", 0x200000, 0x90000),
+    (".data", 0x290000, 0x20000),
+]
+
+
+def build_synthetic_exe(path: str, seed: int = 1051) -> str:
+    """Write a PE32 file laid out like the retail EXE, with the original patch bytes in place"""
+    size = SECTIONS[-1][1] + SECTIONS[-1][2]
+    data = bytearray(size)
+
+    # Deterministic filler so coalesced reads are not just zeros
+    state = seed
+    filler = bytearray(0x10000)
+    for i in range(0, len(filler), 4):
+        state = (state * 1103515245 + 12345) & 0xFFFFFFFF
+        struct.pack_into('<I', filler, i, state)
+    for offset in range(0x1000, size, len(filler)):
+        chunk = filler[:size - offset]
+        data[offset:offset + len(chunk)] = chunk
+
+    data[0:2] = b'MZ'
+    struct.pack_into('<I', data, 0x3C, 0x80)
+    data[0x80:0x84] = b'PE\0\0'
+    struct.pack_into('<HHIIIHH', data, 0x84, 0x14C, len(SECTIONS), 0, 0, 0, 0xE0, 0x102)
+    optional_header = 0x98
+    struct.pack_into('<H', data, optional_header, 0x10B)
+    struct.pack_into('<I', data, optional_header + 16, 0x1000)  # Entry point
+    struct.pack_into('<I', data, optional_header + 28, IMAGE_BASE)
+    struct.pack_into('<II', data, optional_header + 32, 0x1000, 0x1000)  # Section/file alignment
+    struct.pack_into('<I', data, optional_header + 60, 0x1000)  # Size of headers
+    table = optional_header + 0xE0
+    for i, (name, rva, section_size) in enumerate(SECTIONS):
+        struct.pack_into('<8sIIII', data, table + i * 40, name.encode(), section_size, rva, section_size, rva)
+
+    for info in addresses.multi_byte_replacements.values():
+        address = info["addresses"]
+        data[address:address + len(info["original_bytes"])] = info["original_bytes"]
+
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+class SimulatedProcessBackend:
+    """In-memory stand-in for Win32ProcessBackend built from an EXE image.
+
+    Counts calls so benchmarks can report syscall volume, and can add a fixed
+    per-call latency to mimic ReadProcessMemory/WriteProcessMemory cost.
+    """
+
+    def __init__(self, exe_path: str, pid: int = 4242, latency: float = 0.0):
+        with open(exe_path, 'rb') as f:
+            image = f.read()
+        section_map = parse_section_map(image[:HEADER_READ_SIZE])
+        self.regions: List[List] = []  # [va, bytearray, writable]
+        self.regions.append([section_map.image_base, bytearray(image[:section_map.size_of_headers]), False])
+        for section in section_map.sections:
+            memory = bytearray(max(section.virtual_size, section.raw_size))
+            raw = image[section.raw_offset:section.raw_offset + section.raw_size]
+            memory[:len(raw)] = raw
+            self.regions.append([section_map.image_base + section.virtual_address, memory, section.name == ".data"])
+        self.pids = [pid]
+        self.instances: Dict[int, List[List]] = {}  # Extra pid -> its own regions, see add_instance
+        self.latency = latency
+        self.counters: Dict[str, int] = {"find": 0, "alive": 0, "open": 0, "close": 0, "read": 0, "write": 0}
+
+    def reset_counters(self):
+        for key in self.counters:
+            self.counters[key] = 0
+
+    def _delay(self):
+        if self.latency:
+            # Busy wait, sleep() granularity is far coarser than a syscall
+            import time
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+
+    def add_region(self, address: int, size: int, writable: bool = True) -> bytearray:
+        """Map zeroed memory at address, e.g. a heap for memory diff benchmarks"""
+        memory = bytearray(size)
+        self.regions.append([address, memory, writable])
+        return memory
+
+    def add_instance(self, pid: int) -> List[List]:
+        """Start another game instance with its own copy of the current memory"""
+        self.instances[pid] = [[base, bytearray(memory), writable] for base, memory, writable in self.regions]
+        self.pids.append(pid)
+        return self.instances[pid]
+
+    def _region(self, address: int, size: int, handle: Optional[int] = None) -> Optional[tuple]:
+        for base, memory, _ in self.instances.get(handle, self.regions):
+            if base <= address and address + size <= base + len(memory):
+                return memory, address - base
+        return None
+
+    def find_processes(self, name: str = 'PlantsVsZombies.exe') -> List[int]:
+        self.counters["find"] += 1
+        return list(self.pids)
+
+    def is_running(self, pid: int, name: str = 'PlantsVsZombies.exe') -> bool:
+        self.counters["alive"] += 1
+        return pid in self.pids
+
+    def open(self, pid: int) -> Optional[int]:
+        self.counters["open"] += 1
+        return pid if pid in self.pids else None
+
+    def close(self, handle: int):
+        self.counters["close"] += 1
+
+    def read(self, handle: int, address: int, size: int) -> Optional[bytes]:
+        self.counters["read"] += 1
+        self._delay()
+        found = self._region(address, size, handle)
+        if found is None:
+            return None
+        memory, offset = found
+        return bytes(memory[offset:offset + size])
+
+    def write(self, handle: int, address: int, data: bytes) -> bool:
+        self.counters["write"] += 1
+        self._delay()
+        found = self._region(address, len(data), handle)
+        if found is None:
+            return False
+        memory, offset = found
+        memory[offset:offset + len(data)] = data
+        return True
+
+
+    def writable_regions(self, handle: int) -> List[Tuple[int, int]]:
+        return sorted((base, len(memory)) for base, memory, writable in self.instances.get(handle, self.regions)
+                      if writable)
+
+
+def build_project_tree(root: str, exe_source: str, files: int = 2000, backups: int = 3) -> str:
+    """Create a project folder like an extracted .pak project, including old backup_* folders"""
+    import shutil
+    os.makedirs(root, exist_ok=True)
+    shutil.copy2(exe_source, os.path.join(root, "PlantsVsZombies.exe"))
+
+    payload = bytes(range(256)) * 16  # 4 KiB
+    folders = ["images", "reanim", "particles", "sounds", "properties", "data", "compiled/reanim", "compiled/particles"]
+    for i in range(files):
+        folder = os.path.join(root, folders[i % len(folders)])
+        os.makedirs(folder, exist_ok=True)
+        # Mix of small and medium resources
+        size = len(payload) * (1 + (i % 7))
+        with open(os.path.join(folder, f"resource_{i:05d}.bin"), 'wb') as f:
+            f.write((payload * (1 + (i % 7)))[:size])
+
+    for b in range(backups):
+        backup = os.path.join(root, f"backup_2024010{b}_120000")
+        os.makedirs(backup, exist_ok=True)
+        with open(os.path.join(backup, "PlantsVsZombies.exe"), 'wb') as f:
+            f.write(b'\0' * 1024)
+    return root
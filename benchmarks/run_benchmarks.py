@@ -0,0 +1,520 @@
+"""
+Benchmark runner for PvZModTool
+Runs the hot paths headless against benchmarks.fixtures and compares results to baseline.json
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --quick --filter spawn
+    python -m benchmarks.run_benchmarks --update-baseline
+
+--update-baseline only adds cases the baseline does not have yet; the numbers of existing
+cases are kept, so a slowdown cannot be absorbed by re-recording. --replace-baseline
+rewrites every case (e.g. on new hardware) and should say why in the commit.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import address_table  # noqa: E402
+from adventure_spawn import AdventureSpawnEditor  # noqa: E402
+from benchmarks.fixtures import SimulatedProcessBackend, build_project_tree, build_synthetic_exe  # noqa: E402
+from file_io_utils import file_io_manager, PROCESS_TARGET  # noqa: E402
+from fingerprint import fingerprint_service  # noqa: E402
+from spawn_table import SpawnTable  # noqa: E402
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_VERSION = 1
+DEFAULT_TOLERANCE = 0.25  # Allowed slowdown relative to the baseline
+
+
+class _ModeVar:
+    """Stand-in for the main menu's tk.StringVar"""
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def get(self) -> str:
+        return self.value
+
+
+class _MainMenuStub:
+    def __init__(self, mode: str):
+        self.global_edit_mode_var = _ModeVar(mode)
+
+
+def make_spawn_editor(project_path: str, mode: str) -> AdventureSpawnEditor:
+    """AdventureSpawnEditor without any Tk widgets, enough for load/save"""
+    editor = AdventureSpawnEditor.__new__(AdventureSpawnEditor)
+    editor.project_path = project_path
+    editor.main_menu = _MainMenuStub(mode)
+    editor.spawn_table = SpawnTable()
+    editor.grid_width = editor.spawn_table.width
+    editor.grid_height = editor.spawn_table.height
+    editor.grid_data = editor.spawn_table.cells
+    return editor
+
+
+class BenchmarkContext:
+    """Fixture files shared by all cases of one run"""
+
+    def __init__(self, root: str, quick: bool):
+        self.root = root
+        self.quick = quick
+        self.exe_path = build_synthetic_exe(os.path.join(root, "fixture.exe"))
+        self.project_path = os.path.join(root, "project")
+        build_project_tree(self.project_path, self.exe_path, files=300 if quick else 2000)
+        self.project_exe = os.path.join(self.project_path, "PlantsVsZombies.exe")
+        self.backend = SimulatedProcessBackend(self.exe_path)
+        file_io_manager.set_process_backend(self.backend)
+        file_io_manager.set_exe_path(self.project_exe)
+
+    def reset(self):
+        """Drop every cache so each round starts cold unless a case warms it itself"""
+        file_io_manager.clear_cache()
+        file_io_manager.close_process_handle()
+        self.backend.reset_counters()
+
+    def close(self):
+        file_io_manager.close_process_handle()
+        file_io_manager.set_exe_path(None)
+        fingerprint_service.forget(self.project_exe)
+
+
+# --- Cases: each returns (setup, run) where run() returns the number of operations ---
+
+def case_read_file_cold(ctx: BenchmarkContext):
+    addresses = list(range(0x1000, 0x2A0000, 0x1000))
+
+    def run():
+        file_io_manager.clear_cache()
+        for address in addresses:
+            file_io_manager.read_file_data(ctx.project_exe, address, 4)
+        return len(addresses)
+    return run
+
+
+def case_read_file_warm(ctx: BenchmarkContext):
+    addresses = list(range(0x1000, 0x2A0000, 0x1000))
+    for address in addresses:
+        file_io_manager.read_file_data(ctx.project_exe, address, 4)
+
+    def run():
+        for address in addresses:
+            file_io_manager.read_file_data(ctx.project_exe, address, 4)
+        return len(addresses)
+    return run
+
+
+def case_write_file(ctx: BenchmarkContext):
+    count = 50 if ctx.quick else 200
+    addresses = [0x290000 + i * 0x10 for i in range(count)]
+
+    def run():
+        for i, address in enumerate(addresses):
+            file_io_manager.write_file_data(ctx.project_exe, address, i & 0xFF, size=1)
+        return len(addresses)
+    return run
+
+
+def case_spawn_load_exe(ctx: BenchmarkContext):
+    editor = make_spawn_editor(ctx.project_path, "exe")
+
+    def run():
+        file_io_manager.clear_cache()
+        editor.load_spawn_values_from_exe()
+        return editor.grid_width * editor.grid_height
+    return run
+
+
+def case_spawn_load_process(ctx: BenchmarkContext):
+    editor = make_spawn_editor(ctx.project_path, "process")
+
+    def run():
+        file_io_manager.clear_cache()
+        editor.load_spawn_values_from_process()
+        return editor.grid_width * editor.grid_height
+    return run
+
+
+def _spawn_cells(editor: AdventureSpawnEditor):
+    from adventure_spawn import SPAWN_BASE_ADDRESS, SPAWN_COLUMN_STRIDE, SPAWN_ROW_STRIDE
+    return [(SPAWN_BASE_ADDRESS + col * SPAWN_COLUMN_STRIDE + row * SPAWN_ROW_STRIDE, (row + col) & 1)
+            for row in range(editor.grid_height) for col in range(editor.grid_width)]
+
+
+def case_spawn_save_exe(ctx: BenchmarkContext):
+    editor = make_spawn_editor(ctx.project_path, "exe")
+    cells = _spawn_cells(editor)
+    if ctx.quick:
+        cells = cells[:200]
+
+    def run():
+        for address, value in cells:
+            editor.write_spawn_value_to_exe(address, value)
+        return len(cells)
+    return run
+
+
+def case_spawn_save_process(ctx: BenchmarkContext):
+    editor = make_spawn_editor(ctx.project_path, "process")
+    cells = _spawn_cells(editor)
+
+    def run():
+        for address, value in cells:
+            editor.write_spawn_value_to_process(address, value)
+        return len(cells)
+    return run
+
+
+def case_spawn_save_process_queued(ctx: BenchmarkContext):
+    from write_queue import ProcessWriteQueue
+    editor = make_spawn_editor(ctx.project_path, "process")
+    cells = _spawn_cells(editor)
+    queue = ProcessWriteQueue(flush_delay=None)
+
+    def run():
+        pending = [queue.write(address, value, size=1) for address, value in cells]
+        queue.flush()
+        return sum(1 for write in pending if write.success)
+    return run
+
+
+def case_spawn_bulk_exe(ctx: BenchmarkContext):
+    """Every zombie on, then off, for all of world 2: the changed cells only, one batch into the EXE"""
+    from spawn_table import world_columns
+    editor = make_spawn_editor(ctx.project_path, "exe")
+    editor.apply_spawn_table(editor.read_spawn_table(ctx.project_exe)[0])
+    base_address = editor.spawn_base_address()
+    rounds = [0]
+
+    def run():
+        rounds[0] += 1
+        editor.spawn_table.set(slice(None), world_columns(2), rounds[0] % 2)
+        change = editor.spawn_table.pending()
+        written, _ = editor.write_spawn_batch(ctx.project_exe, editor.spawn_table.writes(base_address, change), "bulk")
+        if written:
+            editor.spawn_table.mark_written(change)
+        return len(change)
+    return run
+
+
+def case_spawn_layout_fleet(ctx: BenchmarkContext):
+    """Whole spawn grid written into four instances, one batch per instance"""
+    from process_fleet import ProcessFleet
+    editor = make_spawn_editor(ctx.project_path, "process")
+    for row, col in [(row, col) for row in range(editor.grid_height) for col in range(editor.grid_width)][::3]:
+        editor.grid_data[row][col] = 1
+    for pid in range(5000, 5003):
+        if pid not in ctx.backend.pids:
+            ctx.backend.add_instance(pid)
+    fleet = ProcessFleet(file_io_manager)
+    fleet.select(list(ctx.backend.pids))
+    writes = editor.spawn_layout_writes()
+
+    def run():
+        results = fleet.write_batch(writes)
+        return len(writes) * sum(1 for result in results if result.ok)
+    return run
+
+
+def case_launch_apply(ctx: BenchmarkContext):
+    """Startup batch of every patch plus the spawn grid, once the image is mapped"""
+    import addresses
+    import startup_mod
+    editor = make_spawn_editor(ctx.project_path, "process")
+    writes = startup_mod.patch_writes(addresses.multi_byte_replacements) + editor.spawn_layout_writes()
+    pid = file_io_manager.find_pvz_process()
+
+    def run():
+        report = startup_mod.apply_when_mapped(pid, writes, time.perf_counter())
+        return report.written
+    return run
+
+
+def case_rpc_read_many(ctx: BenchmarkContext):
+    """A thousand data-section reads in one RPC through a local daemon"""
+    from rpc_daemon import RpcClient, RpcServer
+    # Outside ctx.root: the listener unlinks its socket at exit, after the fixture folder is gone
+    address = (r"\\.\pipe\PvZModToolBench" if sys.platform == "win32"
+               else os.path.join(tempfile.gettempdir(), f"pvzmodtool_bench_{os.getpid()}.sock"))
+    # A key of its own, the benchmark must not replace the session key of a running daemon
+    authkey = os.urandom(32)
+    server = RpcServer(file_io_manager, address=address, authkey=authkey)
+    server.start()
+    client = RpcClient(address, authkey=authkey)
+    section = next(section for section in file_io_manager.section_map().sections if section.name == ".data")
+    reads = [(section.raw_offset + i * 4, 4) for i in range(1000)]
+
+    def run():
+        return sum(1 for data in client.read_many(reads) if data is not None)
+    return run
+
+
+def case_snapshot_exe(ctx: BenchmarkContext):
+    entries = list(address_table.iter_entries())
+
+    def run():
+        file_io_manager.clear_cache()
+        address_table.snapshot(ctx.project_exe, entries)
+        return len(entries)
+    return run
+
+
+def case_snapshot_process(ctx: BenchmarkContext):
+    entries = list(address_table.iter_entries())
+
+    def run():
+        file_io_manager.clear_cache()
+        address_table.snapshot(PROCESS_TARGET, entries)
+        return len(entries)
+    return run
+
+
+def case_spawn_refresh_snapshot(ctx: BenchmarkContext):
+    """Grid refresh plus a lookup of every data-section entry, all served by one section snapshot"""
+    from process_snapshot import process_snapshot
+    editor = make_spawn_editor(ctx.project_path, "process")
+    section_map = file_io_manager.section_map()
+    entries = [entry for entry in address_table.iter_entries()
+               if section_map.section_name(entry.address) in process_snapshot.sections]
+
+    def run():
+        editor.read_spawn_table(PROCESS_TARGET)
+        values = [process_snapshot.read_int(entry.address, entry.size) for entry in entries]
+        return 1 + len(values)
+    return run
+
+
+def case_preset_apply_exe(ctx: BenchmarkContext):
+    import addresses
+    presets = list(addresses.spawn_rate_values)
+
+    def run():
+        total = 0
+        for preset in presets:
+            total += address_table.apply_preset(ctx.project_exe, preset)[1]
+        return total
+    return run
+
+
+def case_preset_apply_process(ctx: BenchmarkContext):
+    import addresses
+    presets = list(addresses.spawn_rate_values)
+
+    def run():
+        total = 0
+        for preset in presets:
+            total += address_table.apply_preset(PROCESS_TARGET, preset)[1]
+        return total
+    return run
+
+
+def case_batch_backup(ctx: BenchmarkContext):
+    destination = os.path.join(ctx.root, "backup_target")
+
+    def run():
+        shutil.rmtree(destination, ignore_errors=True)
+        file_io_manager.batch_file_backup(ctx.project_path, destination)
+        return file_io_manager._count_files_in_directory(destination)
+    return run
+
+
+def case_mod_batch(ctx: BenchmarkContext):
+    """Every patch plus the spawn grid into 8 project EXEs, 4 worker processes"""
+    import addresses
+    import batch_mod
+    projects = []
+    for index in range(8):
+        project = os.path.join(ctx.root, "batch", f"project_{index}")
+        os.makedirs(project, exist_ok=True)
+        shutil.copyfile(ctx.exe_path, os.path.join(project, batch_mod.EXE_NAME))
+        projects.append(project)
+    grid = ["01" * (batch_mod.GRID_WIDTH // 2)] * batch_mod.GRID_HEIGHT
+    rounds = [0]
+
+    def run():
+        # Alternate applying and restoring so every round changes bytes
+        rounds[0] += 1
+        patches = {name: rounds[0] % 2 == 1 for name in addresses.multi_byte_replacements}
+        mod = batch_mod.parse_mod({"patches": patches, "spawn_grid": grid})
+        report = batch_mod.run_batch(projects, mod, workers=4)
+        return len(report.results) - len(report.failed)
+    return run
+
+
+def case_exe_audit(ctx: BenchmarkContext):
+    """Values and patch states of 32 EXEs into a CSV table, 4 worker processes"""
+    import exe_audit
+    folder = os.path.join(ctx.root, "audit")
+    for index in range(32):
+        os.makedirs(os.path.join(folder, f"build_{index}"), exist_ok=True)
+        shutil.copyfile(ctx.exe_path, os.path.join(folder, f"build_{index}", "PlantsVsZombies.exe"))
+    output = os.path.join(ctx.root, "audit.csv")
+
+    def run():
+        return exe_audit.write_csv(exe_audit.audit(exe_audit.find_exes(folder), workers=4), output)[0]
+    return run
+
+
+CASES: Dict[str, Callable] = {
+    "file.read.cold": case_read_file_cold,
+    "file.read.warm": case_read_file_warm,
+    "file.write": case_write_file,
+    "spawn.load.exe": case_spawn_load_exe,
+    "spawn.load.process": case_spawn_load_process,
+    "spawn.save.exe": case_spawn_save_exe,
+    "spawn.save.process": case_spawn_save_process,
+    "spawn.save.process.queued": case_spawn_save_process_queued,
+    "spawn.bulk.exe": case_spawn_bulk_exe,
+    "spawn.layout.fleet": case_spawn_layout_fleet,
+    "launch.apply": case_launch_apply,
+    "rpc.read_many": case_rpc_read_many,
+    "table.snapshot.exe": case_snapshot_exe,
+    "table.snapshot.process": case_snapshot_process,
+    "spawn.refresh.snapshot": case_spawn_refresh_snapshot,
+    "preset.apply.exe": case_preset_apply_exe,
+    "preset.apply.process": case_preset_apply_process,
+    "backup.batch": case_batch_backup,
+    "mod.batch": case_mod_batch,
+    "audit.exes": case_exe_audit,
+}
+
+
+def run_case(ctx: BenchmarkContext, factory: Callable, rounds: int) -> Dict:
+    ctx.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run = factory(ctx)
+        timings = []
+        ops = 0
+        syscalls = None
+        for _ in range(rounds):
+            ctx.backend.reset_counters()
+            start = time.perf_counter()
+            ops = run()
+            timings.append(time.perf_counter() - start)
+            syscalls = dict(ctx.backend.counters)
+    best = min(timings)
+    return {
+        "seconds": best,
+        "median_seconds": statistics.median(timings),
+        "rounds": rounds,
+        "ops": ops,
+        "ops_per_second": ops / best if best > 0 else None,
+        "syscalls": syscalls,
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Names of cases slower than baseline * (1 + tolerance)"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("cases", {}).get(name)
+        if reference is None:
+            continue
+        result["baseline_seconds"] = reference["seconds"]
+        result["ratio"] = result["seconds"] / reference["seconds"] if reference["seconds"] else None
+        if result["ratio"] is not None and result["ratio"] > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PvZModTool benchmarks")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Add cases missing from the baseline, keeping the stored numbers of the others")
+    parser.add_argument("--replace-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a case counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--quick", action="store_true", help="Smaller fixtures and fewer rounds")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=None, help="Rounds per case (best round is reported)")
+    args = parser.parse_args(argv)
+
+    rounds = args.rounds or (3 if args.quick else 7)
+    selected = {name: factory for name, factory in CASES.items() if args.filter in name}
+
+    root = tempfile.mkdtemp(prefix="pvz_bench_")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx = BenchmarkContext(root, args.quick)
+        results = {}
+        try:
+            for name, factory in selected.items():
+                results[name] = run_case(ctx, factory, rounds)
+                print(f"{name:28s} {results[name]['seconds'] * 1000:10.3f} ms", file=sys.stderr)
+        finally:
+            ctx.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "cases": results,
+    }
+
+    regressions = []
+    baseline = None if args.replace_baseline else load_baseline(args.baseline)
+    if baseline is not None:
+        if baseline.get("quick") != args.quick:
+            print("Baseline was recorded with a different --quick setting, not comparing", file=sys.stderr)
+        else:
+            regressions = compare(results, baseline, args.tolerance)
+    report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.replace_baseline or (args.update_baseline and baseline is None):
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    elif args.update_baseline:
+        added = [name for name in results if name not in baseline.get("cases", {})]
+        if baseline.get("quick") != args.quick:
+            print("Not updating a baseline recorded with a different --quick setting", file=sys.stderr)
+        elif added:
+            for name in added:
+                baseline["cases"][name] = results[name]
+            with open(args.baseline, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(baseline, indent=2) + "\n")
+            print(f"Added {', '.join(added)} to {args.baseline}", file=sys.stderr)
+
+    for name in regressions:
+        result = results[name]
+        print(f"REGRESSION {name}: {result['seconds'] * 1000:.3f} ms vs "
+              f"{result['baseline_seconds'] * 1000:.3f} ms baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
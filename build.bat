@@ -2,6 +2,7 @@
 REM Build script to compile program, copy folders, create archive, and clean up
 
 REM Step 1: Compile main.py to single executable without console
+pip install -r requirements.txt pyinstaller
 pyinstaller --onefile --noconsole main.py
 
 REM Step 2: Prepare build output folder
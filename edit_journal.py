@@ -0,0 +1,303 @@
+"""
+Edit journal for PvZModTool
+Undo/redo history of byte-level deltas kept in one compact append-only buffer
+"""
+import os
+import struct
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+
+# target id, offset, length, then length old bytes and length new bytes
+ENTRY_HEADER = struct.Struct('<HII')
+DEFAULT_MAX_MEMORY = 8 * 1024 * 1024  # Journal bytes kept in memory before spilling or dropping
+DEFAULT_MAX_SPILL = 256 * 1024 * 1024  # Journal bytes kept on disk before the oldest steps are dropped
+
+
+class EditJournal:
+    """Undo/redo history for FileIOManager writes.
+
+    Every write is one entry (target, offset, old bytes, new bytes) appended to a byte
+    buffer; entries are grouped into steps, one per write or one per transaction().
+    The buffer is a single virtual stream: positions below _memory_start live in the
+    spill file (or were dropped), the rest in memory.
+    """
+
+    def __init__(self, max_memory: int = DEFAULT_MAX_MEMORY, spill_path: Optional[str] = None,
+                 max_spill: int = DEFAULT_MAX_SPILL):
+        self.max_memory = max_memory
+        self.max_spill = max_spill
+        self.spill_path = spill_path
+        self._buffer = bytearray()
+        self._memory_start = 0  # Virtual position of _buffer[0]
+        self._positions = array('Q')  # Virtual position of each entry
+        self._steps = array('Q')  # Index of the first entry of each step
+        self._labels: List[str] = []  # Label of each step
+        self._first_step = 0  # Steps before this were dropped
+        self._cursor = 0  # Steps applied; undo reverts step _cursor - 1
+        self._step_serial = 0  # Identifies the newest step, so a transaction only extends its own
+        self._targets: List[str] = []
+        self._target_ids = {}
+        self._lock = threading.RLock()
+        # One undo or redo at a time. Taken before the target locks, which record() never does,
+        # so it cannot invert the lock order of writers (target lock, then _lock)
+        self._replay_lock = threading.Lock()
+        self._local = threading.local()  # Per-thread transaction and replay state
+        self._commit_listeners: List[Callable] = []
+
+    def add_commit_listener(self, listener: Callable):
+        """Register listener(label, entries) called once per committed step.
+
+        entries is a list of (target, offset, old bytes, new bytes) in write order.
+        Undo and redo commit too, undo with old and new swapped.
+        """
+        self._commit_listeners.append(listener)
+
+    def _notify_commit(self, label: str, entries: List[Tuple[str, int, bytes, bytes]]):
+        for listener in self._commit_listeners:
+            try:
+                listener(label, entries)
+            except Exception as e:
+                print(f"Error in journal commit listener: {e}")
+
+    # --- recording ---
+
+    def _target_id(self, target: str) -> int:
+        target_id = self._target_ids.get(target)
+        if target_id is None:
+            target_id = self._target_ids[target] = len(self._targets)
+            self._targets.append(target)
+        return target_id
+
+    @property
+    def recording(self) -> bool:
+        """False while this thread is undoing or redoing, those writes are not recorded"""
+        return not getattr(self._local, 'replaying', False)
+
+    @contextmanager
+    def transaction(self, label: str):
+        """Group every write made by this thread inside the block into one undo step"""
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            self._local.label = label
+            self._local.step_serial = None
+            self._local.pending = []
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0 and self._local.pending:
+                pending, self._local.pending = self._local.pending, []
+                self._notify_commit(label, pending)
+
+    def record(self, target: str, offset: int, old: bytes, new: bytes, label: Optional[str] = None):
+        """Append one delta; starts a new step unless a transaction of this thread already has one"""
+        if not self.recording or old == new:
+            return
+        with self._lock:
+            self._truncate_redo()
+            in_transaction = getattr(self._local, 'depth', 0) > 0
+            if not in_transaction or self._local.step_serial != self._step_serial:
+                # New step, unless this transaction's step is still the newest one
+                self._steps.append(len(self._positions))
+                self._labels.append(self._local.label if in_transaction else (label or hex(offset)))
+                self._step_serial += 1
+                if in_transaction:
+                    self._local.step_serial = self._step_serial
+                self._cursor = len(self._steps)
+            self._positions.append(self._memory_start + len(self._buffer))
+            self._buffer += ENTRY_HEADER.pack(self._target_id(target), offset, len(old))
+            self._buffer += old
+            self._buffer += new
+            if len(self._buffer) > self.max_memory:
+                self._shrink()
+            step_label = self._labels[-1]
+        if in_transaction:
+            self._local.pending.append((target, offset, old, new))
+        else:
+            self._notify_commit(step_label, [(target, offset, old, new)])
+
+    def _truncate_redo(self):
+        """A new edit after undo discards the redo steps"""
+        if self._cursor == len(self._steps):
+            return
+        first_entry = self._steps[self._cursor]
+        position = self._positions[first_entry]
+        del self._positions[first_entry:]
+        del self._steps[self._cursor:]
+        del self._labels[self._cursor:]
+        self._step_serial += 1
+        if position >= self._memory_start:
+            del self._buffer[position - self._memory_start:]
+        else:
+            # Redo steps reached into the spill file
+            self._buffer.clear()
+            self._memory_start = position
+            with open(self.spill_path, 'r+b') as f:
+                f.truncate(position)
+
+    def _shrink(self):
+        """Move (or drop) the oldest applied steps until the buffer fits in max_memory"""
+        # Only steps that are already applied and not the newest one leave memory
+        keep_from = len(self._buffer) - self.max_memory // 2
+        step = self._first_step
+        while step < self._cursor - 1:
+            position = self._positions[self._steps[step + 1]]
+            if position - self._memory_start > keep_from:
+                break
+            step += 1
+        cut = self._positions[self._steps[step]] - self._memory_start
+        if cut <= 0:
+            return
+        if self.spill_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+                with open(self.spill_path, 'ab') as f:
+                    if f.tell() != self._memory_start:
+                        f.truncate(self._memory_start)
+                        f.seek(self._memory_start)
+                    f.write(self._buffer[:cut])
+            except OSError as e:
+                print(f"Error spilling edit journal: {e}")
+                self._first_step = step
+        else:
+            self._first_step = step
+        del self._buffer[:cut]
+        self._memory_start += cut
+        if self.spill_path and self._memory_start > self.max_spill:
+            # Drop the oldest spilled steps, their bytes stay in the file until it is cleared
+            while self._first_step < step and self._positions[self._steps[self._first_step]] < self._memory_start - self.max_spill:
+                self._first_step += 1
+
+    # --- reading entries ---
+
+    def _read_range(self, start: int, end: int) -> bytes:
+        if start >= self._memory_start:
+            return bytes(self._buffer[start - self._memory_start:end - self._memory_start])
+        with open(self.spill_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(min(end, self._memory_start) - start)
+        if end > self._memory_start:
+            data += self._buffer[:end - self._memory_start]
+        return data
+
+    def _step_entries(self, step: int) -> List[Tuple[str, int, bytes, bytes]]:
+        first = self._steps[step]
+        last = self._steps[step + 1] if step + 1 < len(self._steps) else len(self._positions)
+        end = self._positions[last] if last < len(self._positions) else self._memory_start + len(self._buffer)
+        data = self._read_range(self._positions[first], end)
+        entries = []
+        position = 0
+        for _ in range(first, last):
+            target_id, offset, length = ENTRY_HEADER.unpack_from(data, position)
+            position += ENTRY_HEADER.size
+            old = data[position:position + length]
+            new = data[position + length:position + 2 * length]
+            position += 2 * length
+            entries.append((self._targets[target_id], offset, old, new))
+        return entries
+
+    # --- undo / redo ---
+
+    def can_undo(self) -> bool:
+        return self._cursor > self._first_step
+
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._steps)
+
+    def undo_label(self) -> Optional[str]:
+        return self._labels[self._cursor - 1] if self.can_undo() else None
+
+    def redo_label(self) -> Optional[str]:
+        return self._labels[self._cursor] if self.can_redo() else None
+
+    def _apply(self, manager, entries, undo: bool) -> Tuple[bool, Optional[str]]:
+        """Write one side of each entry after checking the target still holds the other side.
+
+        The entries of each target go out as one manager.write_batch (one backup of an EXE,
+        not one per entry), in replay order so overlapping entries settle correctly. All or
+        nothing: if a write fails, what already landed is written back.
+        """
+        ordered = reversed(entries) if undo else entries
+        plan = {}  # target -> [(offset, replacement, expected)] in replay order
+        for target, offset, old, new in ordered:
+            expected, replacement = (new, old) if undo else (old, new)
+            current = manager.read_data(target, offset, len(expected))
+            if current != expected:
+                return False, f"{hex(offset)} изменен после записи"
+            plan.setdefault(target, []).append((offset, replacement, expected))
+        self._local.replaying = True
+        try:
+            landed = []  # (target, [(offset, expected, None)]) to write back on failure
+            for target, writes in plan.items():
+                results = manager.write_batch(target, [(offset, replacement, None) for offset, replacement, _ in writes])
+                landed.append((target, [(offset, expected, None)
+                                        for (offset, _, expected), written in zip(writes, results) if written]))
+                if not all(results):
+                    for landed_target, restore in reversed(landed):
+                        if restore:
+                            manager.write_batch(landed_target, restore[::-1])
+                    return False, f"Ошибка записи {hex(writes[results.index(False)][0])}"
+        finally:
+            self._local.replaying = False
+        return True, None
+
+    def _replay(self, manager, undo: bool) -> Tuple[bool, Optional[str]]:
+        """Undo or redo one step, atomically: the target and the cursor both change or neither does.
+
+        The step's targets are locked first and _lock second, the order writers take them in
+        record(), then the history is checked to be the one the step was read from before
+        anything is written; no edit can be recorded until the cursor has moved.
+        """
+        with self._replay_lock:
+            with self._lock:
+                if not (self.can_undo() if undo else self.can_redo()):
+                    return False, "Нечего отменять" if undo else "Нечего повторять"
+                step = self._cursor - 1 if undo else self._cursor
+                entries = self._step_entries(step)
+                label = self._labels[step]
+                state = (self._step_serial, len(self._positions))
+            with manager.lock_targets(target for target, _, _, _ in entries), self._lock:
+                if (self._step_serial, len(self._positions)) != state:
+                    # An edit was recorded while the targets were being locked, nothing written
+                    return False, "История изменилась, повторите " + ("отмену" if undo else "повтор")
+                success, error = self._apply(manager, entries, undo)
+                if not success:
+                    return success, error
+                self._cursor = step if undo else step + 1
+        if undo:
+            self._notify_commit(f"Отмена: {label}",
+                                [(target, offset, new, old) for target, offset, old, new in reversed(entries)])
+        else:
+            self._notify_commit(f"Повтор: {label}", entries)
+        return True, None
+
+    def undo(self, manager) -> Tuple[bool, Optional[str]]:
+        """Revert the newest applied step; returns (success, error message)"""
+        return self._replay(manager, undo=True)
+
+    def redo(self, manager) -> Tuple[bool, Optional[str]]:
+        """Reapply the next undone step; returns (success, error message)"""
+        return self._replay(manager, undo=False)
+
+    def clear(self):
+        with self._lock:
+            self._buffer.clear()
+            self._memory_start = 0
+            del self._positions[:]
+            del self._steps[:]
+            self._labels.clear()
+            self._first_step = 0
+            self._cursor = 0
+            if self.spill_path and os.path.exists(self.spill_path):
+                try:
+                    os.remove(self.spill_path)
+                except OSError as e:
+                    print(f"Error removing journal spill file: {e}")
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._buffer)
@@ -0,0 +1,163 @@
+"""
+EXE audit for PvZModTool
+Walks a folder tree of PvZ builds and reports, for every EXE, the value of every entry of
+addresses.py and the state of every byte patch, one CSV row per EXE and entry
+
+Usage:
+    python exe_audit.py archive/ -o audit.csv
+    python exe_audit.py archive/ -o audit.csv --workers 16 --pattern "PlantsVsZombies*.exe"
+"""
+import csv
+import fnmatch
+import hashlib
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import address_table
+from patch_catalog import patch_catalog, classify
+from relocation import address_relocator, build_id
+
+
+DEFAULT_PATTERN = "*.exe"
+CHUNK_SIZE = 8  # EXEs handed to a worker at a time
+NOT_FOUND = "not_found"  # State of an entry whose address was not located in the build
+
+KIND_VALUE = "value"
+KIND_PATCH = "patch"
+CSV_COLUMNS = ("exe", "fingerprint", "build", "kind", "category", "name", "offset", "value", "state")
+
+# kind, category, name, offset in this EXE (None if not located), value, state
+AuditRow = Tuple[str, str, str, Optional[int], str, str]
+
+
+class AuditResult(NamedTuple):
+    exe_path: str
+    fingerprint: Optional[str]  # Content hash, equal for byte-identical EXEs
+    build: Optional[str]  # relocation.build_id, shared by every EXE made from the same build
+    rows: List[AuditRow]
+    error: Optional[str]
+
+
+def find_exes(root: str, pattern: str = DEFAULT_PATTERN) -> List[str]:
+    """Paths of the files under root matching pattern (case-insensitive), sorted"""
+    pattern = pattern.lower()
+    found = []
+    for directory, _, names in os.walk(root):
+        found.extend(os.path.join(directory, name) for name in names if fnmatch.fnmatch(name.lower(), pattern))
+    return sorted(found)
+
+
+def _audit_image(data) -> List[AuditRow]:
+    """Rows for the mapped EXE in the build address_relocator is loaded for.
+
+    An entry whose own signature was not found is not_found rather than read at an offset
+    inferred from its neighbours, so the report never shows a value nobody located.
+    """
+    missing = set(address_relocator.table.missing)
+
+    def locate(address: int) -> Optional[int]:
+        return None if address in missing else address_relocator.translate(address)
+
+    rows = []
+    for entry in address_table.iter_entries():
+        address = locate(entry.address)
+        if address is None or address + entry.size > len(data):
+            rows.append((KIND_VALUE, entry.category, entry.name, None, "", NOT_FOUND))
+            continue
+        value = int.from_bytes(data[address:address + entry.size], byteorder='little')
+        rows.append((KIND_VALUE, entry.category, entry.name, address, str(value), ""))
+    for patch in patch_catalog.patches:
+        address = locate(patch.address)
+        size = len(patch.original_bytes)
+        if address is None or address + size > len(data):
+            rows.append((KIND_PATCH, "", patch.name, None, "", NOT_FOUND))
+            continue
+        current = data[address:address + size]
+        rows.append((KIND_PATCH, "", patch.name, address, current.hex().upper(), classify(patch, current)))
+    return rows
+
+
+def audit_exe(exe_path: str) -> AuditResult:
+    """Values and patch states of one EXE, read through a read-only mapping (runs in a worker process)"""
+    previous_table = address_relocator.table
+    try:
+        build = build_id(exe_path)
+        table = address_relocator.load_for_exe(exe_path)
+        # No signature located: raw offsets would report bytes of whatever lives there
+        if table is None or not table.identified:
+            return AuditResult(exe_path, None, build, [], "Cannot identify the EXE build: no signature found")
+        with open(exe_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            fingerprint = hashlib.blake2b(data, digest_size=16).hexdigest()
+            rows = _audit_image(data)
+        return AuditResult(exe_path, fingerprint, build, rows, None)
+    except (OSError, ValueError) as e:
+        return AuditResult(exe_path, None, None, [], str(e))
+    finally:
+        address_relocator.table = previous_table
+
+
+def audit(exe_paths: List[str], workers: Optional[int] = None) -> Iterator[AuditResult]:
+    """audit_exe for every path, workers processes at a time (default: one per core), in input order"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(exe_paths) <= 1:
+        yield from map(audit_exe, exe_paths)
+        return
+    with ProcessPoolExecutor(min(workers, len(exe_paths))) as pool:
+        yield from pool.map(audit_exe, exe_paths, chunksize=CHUNK_SIZE)
+
+
+def write_csv(results: Iterator[AuditResult], output_path: str) -> Tuple[int, Dict[str, Dict[str, int]]]:
+    """Stream results into a CSV table; returns (EXEs written, {patch name: {state: count}})"""
+    exes = 0
+    patch_states: Dict[str, Dict[str, int]] = {}
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for result in results:
+            exes += 1
+            if result.error is not None:
+                print(f"{result.exe_path}: {result.error}")
+                writer.writerow((result.exe_path, result.fingerprint or "", result.build or "",
+                                 "error", "", "", "", "", result.error))
+                continue
+            for kind, category, name, offset, value, state in result.rows:
+                writer.writerow((result.exe_path, result.fingerprint, result.build, kind, category, name,
+                                 "" if offset is None else hex(offset), value, state))
+                if kind == KIND_PATCH:
+                    counts = patch_states.setdefault(name, {})
+                    counts[state] = counts.get(state, 0) + 1
+    return exes, patch_states
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Report address values and patch states of many PvZ EXEs")
+    parser.add_argument("root", help="Folder searched recursively for EXEs")
+    parser.add_argument("-o", "--output", default="audit.csv", help="CSV file to write (default: audit.csv)")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"File name pattern (default: {DEFAULT_PATTERN})")
+    parser.add_argument("--workers", type=int, help="EXEs read at once (default: one per core)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    exe_paths = find_exes(args.root, args.pattern)
+    if not exe_paths:
+        print(f"No files matching {args.pattern} under {args.root}")
+        return 1
+    try:
+        exes, patch_states = write_csv(audit(exe_paths, args.workers), args.output)
+    except OSError as e:
+        print(f"Cannot write {args.output}: {e}")
+        return 1
+    seconds = time.perf_counter() - start
+    for name, counts in sorted(patch_states.items()):
+        print(f"{name}: " + ", ".join(f"{state} {count}" for state, count in sorted(counts.items())))
+    print(f"Audited {exes} EXEs in {seconds:.2f} s ({exes / seconds:.0f} EXEs/s), written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
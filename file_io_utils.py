@@ -5,59 +5,406 @@ Consolidated file operations with improved performance and reduced code duplicat
 import os
 import shutil
 import struct
-import ctypes
-from typing import Optional, Union, Tuple, Dict, Any
-import psutil
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Optional, Union, Tuple, Dict, Any, List
+from pe_sections import section_map_cache, DEFAULT_IMAGE_BASE
+from fingerprint import fingerprint_service
+from process_backend import Win32ProcessBackend
+from process_discovery import ProcessDiscovery, PROCESS_DETACHED
+from instrumentation import instrumentation
+from edit_journal import EditJournal
 
 
-class FileIOManager:
-    """Unified file I/O manager with optimized operations"""
+# Target name for the running game, used wherever a file path would name an EXE
+PROCESS_TARGET = "<process>"
+VERSION_CHECK_INTERVAL = 0.25  # Seconds reads trust the last check for outside changes of a file
+JOURNAL_PAGE_SIZE = 0x1000  # Process bytes read at once for the undo journal
+JOURNAL_PAGE_LIFETIME = 0.25  # Seconds such a page stands in for the game's memory (the game writes too)
+
+
+class ReadWriteLock:
+    """Many readers or one writer; waiting writers block new readers so they are not starved"""
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._lock:
+            if not (self._writer or self._waiting_writers):
+                # Uncontended: skip the condition machinery
+                self._readers += 1
+                return
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._lock:
+            self._readers -= 1
+            if not self._readers and self._waiting_writers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class FileIOManager:
+    """Unified file I/O manager with optimized operations.
+
+    Safe to share between threads: reads run in parallel, writes to the same target
+    are serialized, and caches and the process handle are swapped under locks.
+    """
+
+    def __init__(self, backend=None, journal=None, pid: Optional[int] = None):
+        self._backend = backend or Win32ProcessBackend()
+        self.journal = journal or EditJournal()  # Undo/redo history of every write
         self._process_handle = None
         self._current_process_id = None
         self._file_cache = {}  # Cache for frequently accessed files
         self._memory_cache = {}  # Cache for memory reads
+        self._exe_path = None  # EXE whose section table maps file offsets to process addresses
+        self._file_versions = {}  # Fingerprint each file had when its cache entries were read
+        self._file_checked = {}  # monotonic() of the last version check of each file
+        self._section_map = (float('-inf'), None)  # (monotonic() of the lookup, section_map())
+        # Page file offset -> (monotonic() of the read, bytes) of process memory, kept up to date
+        # by our own writes; guarded by the PROCESS_TARGET lock
+        self._journal_pages: Dict[int, Tuple[float, bytearray]] = {}
+        self._write_listeners = []  # Called with (target, address, size) after each write
+        self._cache_lock = threading.Lock()  # Guards the caches, _file_versions and _cache_generation
+        self._cache_generation = 0  # Bumped on every invalidation, reads only cache data read under one generation
+        self._handle_lock = ReadWriteLock()  # Readers use the handle, writers replace or close it
+        self._target_locks = {}  # target -> RLock ordering writes to that target
+        # Cached PID of the game (only pid when given), attach/detach events
+        self.discovery = ProcessDiscovery(self._backend, pinned_pid=pid)
+        self.discovery.add_listener(self._on_process_event)
+
+    def for_instance(self, pid: int) -> 'FileIOManager':
+        """A manager with its own handle, caches and journal that only targets process pid"""
+        manager = FileIOManager(self._backend, pid=pid)
+        manager.set_exe_path(self._exe_path)
+        return manager
+
+    def set_process_backend(self, backend):
+        """Swap the process backend (e.g. a simulated one for benchmarks)"""
+        with self._handle_lock.write():
+            self._close_handle_locked()
+            self._backend = backend
+        self.discovery.set_backend(backend)
+
+    def _on_process_event(self, event: str, pid: int):
+        """Discovery listener: drop the handle (and cached reads) of a game that exited"""
+        if event == PROCESS_DETACHED and self._current_process_id == pid:
+            with self._handle_lock.write():
+                if self._current_process_id == pid:
+                    self._close_handle_locked()
+
+    def transaction(self, label: str):
+        """Group the writes this thread makes inside the block into one undo step"""
+        return self.journal.transaction(label)
+
+    def undo(self) -> Tuple[bool, Optional[str]]:
+        """Revert the last write or transaction; returns (success, error message)"""
+        return self.journal.undo(self)
+
+    def redo(self) -> Tuple[bool, Optional[str]]:
+        """Reapply the last undone write or transaction; returns (success, error message)"""
+        return self.journal.redo(self)
+
+    def _target_lock(self, target: str) -> threading.RLock:
+        lock = self._target_locks.get(target)
+        if lock is None:
+            with self._cache_lock:
+                lock = self._target_locks.setdefault(target, threading.RLock())
+        return lock
+
+    @contextmanager
+    def lock_targets(self, targets):
+        """Hold off every other writer of targets for the block; this thread can still write them"""
+        with ExitStack() as stack:
+            for target in sorted(set(targets)):
+                stack.enter_context(self._target_lock(target))
+            yield
+
+    def _cache_get(self, cache: Dict, key) -> Tuple[Optional[bytes], int]:
+        """Cached value (or None) and the generation to pass to _cache_put after a miss.
+
+        Lock-free: a single dict lookup is atomic, and the generation is read first so a
+        write landing in between makes the later _cache_put a no-op.
+        """
+        generation = self._cache_generation
+        return cache.get(key), generation
+
+    def _cache_put(self, cache: Dict, key, data: bytes, generation: int):
+        """Cache data unless something was invalidated since it was read"""
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                cache[key] = data
+
+    def add_write_listener(self, listener):
+        """Register a callback notified after every successful write.
+
+        target is the file path for EXE writes and PROCESS_TARGET for process writes.
+        """
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, target: str, address: int, size: int):
+        for listener in self._write_listeners:
+            try:
+                listener(target, address, size)
+            except Exception as e:
+                print(f"Error in write listener: {e}")
+
+    def read_data(self, target: str, address: int, size: int = 4) -> Optional[bytes]:
+        """Read from the EXE at target, or from the game when target is PROCESS_TARGET"""
+        if target == PROCESS_TARGET:
+            return self.read_memory_data(address, size)
+        return self.read_file_data(target, address, size)
+
+    def write_data(self, target: str, address: int, data: Union[int, bytes], size: int = 4) -> bool:
+        """Write to the EXE at target, or to the game when target is PROCESS_TARGET"""
+        if target == PROCESS_TARGET:
+            return self.write_memory_data(address, data, size)
+        return self.write_file_data(target, address, data, size)
+
+    def _check_file_version(self, file_path: str, max_age: float = 0.0):
+        """Drop cached reads of a file that was changed outside this manager.
+
+        Reads pass max_age=VERSION_CHECK_INTERVAL, so a run of reads (a table snapshot, the
+        address list) stats the file once instead of once per read; writes always check.
+        """
+        now = time.monotonic()
+        if max_age and now - self._file_checked.get(file_path, float('-inf')) < max_age:
+            return
+        version = fingerprint_service.fingerprint(file_path)
+        self._file_checked[file_path] = now
+        if self._file_versions.get(file_path) == version:
+            return
+        with self._cache_lock:
+            if self._file_versions.get(file_path) != version:
+                for key in [key for key in self._file_cache if key[0] == file_path]:
+                    del self._file_cache[key]
+                self._file_versions[file_path] = version
+                self._cache_generation += 1
+
+    def set_exe_path(self, exe_path: Optional[str]):
+        """Set the EXE used to translate file offsets into process addresses"""
+        with self._cache_lock:
+            if exe_path != self._exe_path:
+                self._exe_path = exe_path
+                self._memory_cache.clear()
+                self._cache_generation += 1
+                self._section_map = (float('-inf'), None)
+                self._journal_pages.clear()
+
+    @property
+    def exe_path(self) -> Optional[str]:
+        return self._exe_path
+
+    def section_map(self):
+        """Section table of the EXE set with set_exe_path, or None.
+
+        A lookup made in the last VERSION_CHECK_INTERVAL is reused, so a burst of
+        process writes does not stat the EXE once per write.
+        """
+        if not self._exe_path:
+            return None
+        checked, section_map = self._section_map
+        now = time.monotonic()
+        if now - checked >= VERSION_CHECK_INTERVAL:
+            section_map = section_map_cache.get(self._exe_path)
+            self._section_map = (now, section_map)
+        return section_map
+
+    def file_offset_to_va(self, address: int) -> Optional[int]:
+        """Translate a file offset into a virtual address in the running game"""
+        if self._exe_path:
+            section_map = section_map_cache.get(self._exe_path)
+            if section_map:
+                return section_map.file_offset_to_va(address)
+        return address + DEFAULT_IMAGE_BASE
+
+    def _process_chunks(self, address: int, size: int, section_map=None) -> Optional[List[Tuple[int, int, int]]]:
+        """Split a file range into (file_offset, va, length) chunks contiguous in process memory.
+
+        Batches pass the section_map() they looked up once instead of one lookup per range.
+        """
+        if self._exe_path:
+            if section_map is None:
+                section_map = self.section_map()
+            if section_map:
+                return section_map.split_file_range(address, size)
+        return [(address, address + DEFAULT_IMAGE_BASE, size)]
+
+    def _invalidate_range(self, cache: Dict, address: int, size: int, file_path: Optional[str] = None):
+        """Drop cached reads that overlap [address, address + size)"""
+        end = address + size
+        with self._cache_lock:
+            self._cache_generation += 1
+            for key in list(cache):
+                if file_path is not None and key[0] != file_path:
+                    continue
+                cached_address, cached_size = key[-2], key[-1]
+                if cached_address < end and address < cached_address + cached_size:
+                    del cache[key]
 
-    def _get_process_handle(self) -> Optional[int]:
-        """Get or create process handle with caching"""
-        try:
-            # Find PVZ process
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] == 'PlantsVsZombies.exe':
-                    process_id = proc.info['pid']
-                    break
-            else:
+    def _close_handle_locked(self):
+        """Close the cached handle; caller holds the handle write lock"""
+        if self._process_handle:
+            try:
+                self._backend.close(self._process_handle)
+            except:
+                pass
+        self._process_handle = None
+        self._current_process_id = None
+        self._journal_pages.clear()
+        with self._cache_lock:
+            self._memory_cache.clear()
+            self._cache_generation += 1
+
+    def _read_chunks(self, process_handle, chunks) -> Optional[bytes]:
+        """One ReadProcessMemory per (file_offset, va, length) chunk, joined; None if any failed"""
+        parts = []
+        for _, process_address, length in chunks:
+            part = self._backend.read(process_handle, process_address, length)
+            instrumentation.count("memory.read.syscall", length)
+            if part is None:
                 return None
-
-            # Return cached handle if process hasn't changed
+            parts.append(part)
+        return b''.join(parts)
+
+    def _journal_old_bytes(self, process_handle, address: int, size: int, chunks) -> Optional[bytes]:
+        """Process bytes at [address, address + size) before a write, for the undo journal.
+
+        Read a page at a time and patched by our own writes, so a burst of small writes (a
+        spawn table saved cell by cell) costs one read per page rather than one per write.
+        Caller holds the PROCESS_TARGET lock.
+        """
+        page_start = address - address % JOURNAL_PAGE_SIZE
+        if address + size <= page_start + JOURNAL_PAGE_SIZE:
+            now = time.monotonic()
+            page = self._journal_pages.get(page_start)
+            if page is None or now - page[0] >= JOURNAL_PAGE_LIFETIME:
+                page_chunks = self._process_chunks(page_start, JOURNAL_PAGE_SIZE)
+                data = self._read_chunks(process_handle, page_chunks) if page_chunks else None
+                page = (now, bytearray(data)) if data is not None else None
+                if page is not None:
+                    self._journal_pages[page_start] = page
+            if page is not None:
+                offset = address - page_start
+                return bytes(page[1][offset:offset + size])
+        return self._read_chunks(process_handle, chunks)
+
+    def _update_journal_pages(self, address: int, data: bytes, written: bool):
+        """Put our write into the journal pages it touches, or forget them if it may have failed partway"""
+        if not self._journal_pages:
+            return
+        end = address + len(data)
+        page_start = address - address % JOURNAL_PAGE_SIZE
+        if end <= page_start + JOURNAL_PAGE_SIZE:
+            # The usual small write, inside one page
+            page = self._journal_pages.get(page_start)
+            if page is not None:
+                if written:
+                    page[1][address - page_start:end - page_start] = data
+                else:
+                    del self._journal_pages[page_start]
+            return
+        for page_start in range(page_start, end, JOURNAL_PAGE_SIZE):
+            page = self._journal_pages.get(page_start)
+            if page is None:
+                continue
+            if not written:
+                del self._journal_pages[page_start]
+                continue
+            start = max(address, page_start)
+            stop = min(end, page_start + JOURNAL_PAGE_SIZE)
+            page[1][start - page_start:stop - page_start] = data[start - address:stop - address]
+
+    def _open_handle(self, process_id: int):
+        """Replace the cached handle with one for process_id, unless another thread already did"""
+        with self._handle_lock.write():
             if self._current_process_id == process_id and self._process_handle:
-                return self._process_handle
+                return
+            self._close_handle_locked()
+            self._process_handle = self._backend.open(process_id)
+            self._current_process_id = process_id
 
-            # Close old handle if exists
-            if self._process_handle:
-                try:
-                    ctypes.windll.kernel32.CloseHandle(self._process_handle)
-                except:
-                    pass
+    def _process_handle_lease(self, rescan: bool = True) -> '_HandleLease':
+        """Yield the process handle (or None); it is not closed or replaced until the block exits.
 
-            # Open new handle
-            self._process_handle = ctypes.windll.kernel32.OpenProcess(0x1F0FFF, False, process_id)
-            self._current_process_id = process_id
+        With rescan=False an already open handle is used without checking the process list.
+        """
+        return _HandleLease(self, rescan)
 
-            return self._process_handle if self._process_handle else None
+    def _acquire_handle(self, rescan: bool) -> Tuple[Optional[int], bool]:
+        """Take the handle read lock for a lease; returns (handle, lock held)"""
+        if not rescan:
+            self._handle_lock.acquire_read()
+            if self._process_handle:
+                return self._process_handle, True
+            self._handle_lock.release_read()
 
-        except Exception as e:
-            print(f"Error getting process handle: {e}")
-            return None
+        # Outside the locks, a detach event closes the handle under the write lock
+        process_id = self.discovery.current_pid()
+        if process_id is None:
+            return None, False
 
+        self._handle_lock.acquire_read()
+        try:
+            # Return cached handle if process hasn't changed
+            if self._current_process_id == process_id and self._process_handle:
+                instrumentation.cache("process.handle", True)
+            else:
+                instrumentation.cache("process.handle", False)
+                self._handle_lock.release_read()
+                try:
+                    self._open_handle(process_id)
+                except Exception as e:
+                    print(f"Error getting process handle: {e}")
+                finally:
+                    self._handle_lock.acquire_read()
+        except BaseException:
+            self._handle_lock.release_read()
+            raise
+        return self._process_handle or None, True
+
+    @instrumentation.timed("file.read", "io")
     def read_file_data(self, file_path: str, address: int, size: int = 4) -> Optional[Union[int, bytes]]:
         """Unified file reading with caching and optimization"""
         try:
             # Check cache first
-            cache_key = f"{file_path}_{address}_{size}"
-            if cache_key in self._file_cache:
-                return self._file_cache[cache_key]
+            self._check_file_version(file_path, VERSION_CHECK_INTERVAL)
+            cache_key = (file_path, address, size)
+            cached, generation = self._cache_get(self._file_cache, cache_key)
+            if cached is not None:
+                instrumentation.cache("file.read", True)
+                return cached
+            instrumentation.cache("file.read", False)
 
             with open(file_path, 'rb') as f:
                 f.seek(address)
@@ -67,86 +414,108 @@ class FileIOManager:
                     return None
 
                 # Cache the result
-                self._file_cache[cache_key] = data
+                self._cache_put(self._file_cache, cache_key, data, generation)
+                instrumentation.add_bytes("file.read", size)
                 return data
 
         except Exception as e:
             print(f"Error reading file {file_path} at {hex(address)}: {e}")
             return None
 
+    @instrumentation.timed("file.write", "io")
     def write_file_data(self, file_path: str, address: int, data: Union[int, bytes], size: int = 4) -> bool:
         """Unified file writing with backup creation"""
         try:
-            # Create backup
-            backup_path = file_path + '.backup'
-            shutil.copy2(file_path, backup_path)
+            if isinstance(data, int):
+                if size == 4:
+                    data_bytes = struct.pack('<I', data)
+                elif size == 2:
+                    data_bytes = struct.pack('<H', data)
+                elif size == 1:
+                    data_bytes = struct.pack('<B', data)
+                else:
+                    raise ValueError(f"Unsupported size: {size}")
+            else:
+                data_bytes = data
 
-            with open(file_path, 'r+b') as f:
-                f.seek(address)
+            # Writes to one file run one at a time: backup, write, invalidate, notify
+            with self._target_lock(file_path):
+                # Pick up changes made outside this manager before mixing in our own
+                self._check_file_version(file_path)
 
-                if isinstance(data, int):
-                    if size == 4:
-                        data_bytes = struct.pack('<I', data)
-                    elif size == 2:
-                        data_bytes = struct.pack('<H', data)
-                    elif size == 1:
-                        data_bytes = struct.pack('<B', data)
-                    else:
-                        raise ValueError(f"Unsupported size: {size}")
-                else:
-                    data_bytes = data
+                # Create backup
+                backup_path = file_path + '.backup'
+                with instrumentation.span("file.write.backup", "io"):
+                    shutil.copy2(file_path, backup_path)
 
-                f.write(data_bytes)
-                # Clear cache after successful write
-                cache_key = f"{file_path}_{address}_{len(data_bytes)}"
-                if cache_key in self._file_cache:
-                    del self._file_cache[cache_key]
-                return True
+                try:
+                    with open(file_path, 'r+b') as f:
+                        f.seek(address)
+                        old_bytes = f.read(len(data_bytes)) if self.journal.recording else None
+                        f.seek(address)
+                        f.write(data_bytes)
+                finally:
+                    # Clear cache after the write, reads racing with it will not cache what they saw
+                    self._invalidate_range(self._file_cache, address, len(data_bytes), file_path)
+                instrumentation.add_bytes("file.write", len(data_bytes))
+                if old_bytes is not None and len(old_bytes) == len(data_bytes):
+                    self.journal.record(file_path, address, old_bytes, data_bytes)
+
+                self._notify_write(file_path, address, len(data_bytes))
+                version = fingerprint_service.fingerprint(file_path)
+                with self._cache_lock:
+                    self._file_versions[file_path] = version
+                    self._file_checked[file_path] = time.monotonic()
+            return True
 
         except Exception as e:
             print(f"Error writing to file {file_path} at {hex(address)}: {e}")
             return False
 
+    @instrumentation.timed("memory.read", "process")
     def read_memory_data(self, address: int, size: int = 4) -> Optional[Union[int, bytes]]:
         """Unified memory reading with caching"""
         try:
             # Check cache first
-            cache_key = f"mem_{address}_{size}"
-            if cache_key in self._memory_cache:
-                return self._memory_cache[cache_key]
-
-            process_handle = self._get_process_handle()
-            if not process_handle:
+            cache_key = (address, size)
+            cached, generation = self._cache_get(self._memory_cache, cache_key)
+            if cached is not None:
+                instrumentation.cache("memory.read", True)
+                return cached
+            instrumentation.cache("memory.read", False)
+
+            chunks = self._process_chunks(address, size)
+            if chunks is None:
+                print(f"Address range {hex(address)}+{size} is not mapped into the process")
                 return None
 
-            buffer = ctypes.create_string_buffer(size)
-            bytes_read = ctypes.c_size_t()
-
-            process_address = address + 0x400000
+            with self._process_handle_lease() as process_handle:
+                if not process_handle:
+                    return None
 
-            if ctypes.windll.kernel32.ReadProcessMemory(
-                process_handle, ctypes.c_void_p(process_address),
-                buffer, size, ctypes.byref(bytes_read)
-            ):
-                result = buffer.raw[:bytes_read.value]
+                # One ReadProcessMemory per section the range touches
+                parts = []
+                for _, process_address, length in chunks:
+                    part = self._backend.read(process_handle, process_address, length)
+                    instrumentation.count("memory.read.syscall", length)
+                    if part is None:
+                        return None
+                    parts.append(part)
 
-                # Cache the result
-                self._memory_cache[cache_key] = result
-                return result
+            result = b''.join(parts)
 
-            return None
+            # Cache the result
+            self._cache_put(self._memory_cache, cache_key, result, generation)
+            return result
 
         except Exception as e:
             print(f"Error reading memory at {hex(address)}: {e}")
             return None
 
+    @instrumentation.timed("memory.write", "process")
     def write_memory_data(self, address: int, data: Union[int, bytes], size: int = 4) -> bool:
         """Unified memory writing"""
         try:
-            process_handle = self._get_process_handle()
-            if not process_handle:
-                return False
-
             if isinstance(data, int):
                 if size == 4:
                     data_bytes = struct.pack('<I', data)
@@ -159,25 +528,255 @@ class FileIOManager:
             else:
                 data_bytes = data
 
-            bytes_written = ctypes.c_size_t()
-            process_address = address + 0x400000
+            chunks = self._process_chunks(address, len(data_bytes))
+            if chunks is None:
+                print(f"Address range {hex(address)}+{len(data_bytes)} is not mapped into the process")
+                return False
 
-            if ctypes.windll.kernel32.WriteProcessMemory(
-                process_handle, ctypes.c_void_p(process_address),
-                data_bytes, len(data_bytes), ctypes.byref(bytes_written)
-            ):
-                # Clear cache after successful write
-                cache_key = f"mem_{address}_{len(data_bytes)}"
-                if cache_key in self._memory_cache:
-                    del self._memory_cache[cache_key]
-                return bytes_written.value == len(data_bytes)
+            with self._target_lock(PROCESS_TARGET), self._process_handle_lease() as process_handle:
+                if not process_handle:
+                    return False
 
-            return False
+                # Old bytes for the undo journal, read through the same lease as the write
+                old_bytes = None
+                if self.journal.recording:
+                    old_bytes = self._journal_old_bytes(process_handle, address, len(data_bytes), chunks)
+                written = False
+                try:
+                    # One WriteProcessMemory per section the range touches
+                    for file_offset, process_address, length in chunks:
+                        start = file_offset - address
+                        instrumentation.count("memory.write.syscall", length)
+                        if not self._backend.write(process_handle, process_address, data_bytes[start:start + length]):
+                            return False
+                    written = True
+                finally:
+                    # Clear cache after writing, even a partial write changes memory
+                    self._invalidate_range(self._memory_cache, address, len(data_bytes))
+                    self._update_journal_pages(address, data_bytes, written)
+
+                if old_bytes is not None:
+                    self.journal.record(PROCESS_TARGET, address, old_bytes, data_bytes)
+
+            # Outside the handle lease, so listeners may read the process themselves
+            self._notify_write(PROCESS_TARGET, address, len(data_bytes))
+            return True
 
         except Exception as e:
             print(f"Error writing memory at {hex(address)}: {e}")
             return False
 
+    def read_memory_raw(self, address: int, size: int, rescan: bool = False) -> Optional[bytes]:
+        """Uncached process read through the open handle, for loops that poll live values"""
+        chunks = self._process_chunks(address, size)
+        if chunks is None:
+            return None
+        with self._process_handle_lease(rescan) as process_handle:
+            if not process_handle:
+                return None
+            parts = []
+            for _, process_address, length in chunks:
+                part = self._backend.read(process_handle, process_address, length)
+                instrumentation.count("memory.read.syscall", length)
+                if part is None:
+                    return None
+                parts.append(part)
+        return b''.join(parts)
+
+    def write_memory_raw(self, address: int, data: bytes, rescan: bool = False) -> bool:
+        """Process write through the open handle that is not journaled (e.g. re-asserting frozen values)"""
+        chunks = self._process_chunks(address, len(data))
+        if chunks is None:
+            return False
+        with self._target_lock(PROCESS_TARGET), self._process_handle_lease(rescan) as process_handle:
+            if not process_handle:
+                return False
+            written = False
+            try:
+                for file_offset, process_address, length in chunks:
+                    start = file_offset - address
+                    instrumentation.count("memory.write.syscall", length)
+                    if not self._backend.write(process_handle, process_address, data[start:start + length]):
+                        return False
+                written = True
+            finally:
+                self._invalidate_range(self._memory_cache, address, len(data))
+                self._update_journal_pages(address, data, written)
+        self._notify_write(PROCESS_TARGET, address, len(data))
+        return True
+
+    def writable_regions(self) -> Optional[List[Tuple[int, int]]]:
+        """(virtual address, size) of the game's committed writable memory, None if not running"""
+        with self._process_handle_lease() as process_handle:
+            if not process_handle:
+                return None
+            return self._backend.writable_regions(process_handle)
+
+    def read_memory_va(self, va: int, size: int, rescan: bool = False) -> Optional[bytes]:
+        """Uncached read at a virtual address, for memory outside the EXE image (heap, stack)"""
+        with self._process_handle_lease(rescan) as process_handle:
+            if not process_handle:
+                return None
+            instrumentation.count("memory.read.syscall", size)
+            return self._backend.read(process_handle, va, size)
+
+    def write_batch(self, target: str, writes: List[Tuple[int, bytes, Optional[str]]], max_gap: int = 0) -> List[bool]:
+        """write_memory_batch or write_file_batch depending on target"""
+        if target == PROCESS_TARGET:
+            return self.write_memory_batch(writes, max_gap)
+        return self.write_file_batch(target, writes, max_gap)
+
+    @instrumentation.timed("file.write_batch", "io")
+    def write_file_batch(self, file_path: str, writes: List[Tuple[int, bytes, Optional[str]]],
+                         max_gap: int = 0) -> List[bool]:
+        """File counterpart of write_memory_batch: one backup, then one read and one write per merged span.
+
+        Overlapping writes apply in list order, each is journaled as its own entry. All or
+        nothing: the spans are written into a copy that replaces the file only once every
+        span is in place, so the result is True for every write, or False for every write
+        and the file untouched.
+        """
+        if not writes:
+            return []
+        spans = []  # [start, end, [write indices]]
+        for index in sorted(range(len(writes)), key=lambda index: writes[index][0]):
+            address, data = writes[index][0], writes[index][1]
+            if spans and address - spans[-1][1] <= max_gap:
+                spans[-1][1] = max(spans[-1][1], address + len(data))
+                spans[-1][2].append(index)
+            else:
+                spans.append([address, address + len(data), [index]])
+
+        temp_path = file_path + '.batch'
+        try:
+            with self._target_lock(file_path):
+                self._check_file_version(file_path)
+                with instrumentation.span("file.write.backup", "io"):
+                    shutil.copy2(file_path, file_path + '.backup')
+                    shutil.copy2(file_path, temp_path)
+                # Read every span first so a span past the end fails the batch before anything is written
+                entries = []
+                buffers = []
+                with open(temp_path, 'r+b') as f:
+                    for start, end, indices in spans:
+                        f.seek(start)
+                        buffer = bytearray(f.read(end - start))
+                        if len(buffer) != end - start:
+                            raise ValueError(f"range {hex(start)}-{hex(end)} is past the end of the file")
+                        for index in sorted(indices):  # Submission order, later writes win
+                            address, data, label = writes[index]
+                            offset = address - start
+                            entries.append((address, bytes(buffer[offset:offset + len(data)]), data, label))
+                            buffer[offset:offset + len(data)] = data
+                        buffers.append((start, buffer))
+                    for start, buffer in buffers:
+                        f.seek(start)
+                        f.write(buffer)
+                os.replace(temp_path, file_path)
+                for start, buffer in buffers:
+                    self._invalidate_range(self._file_cache, start, len(buffer), file_path)
+                instrumentation.add_bytes("file.write", sum(len(buffer) for _, buffer in buffers))
+                for address, old, new, label in entries:
+                    self.journal.record(file_path, address, old, new, label)
+                for start, buffer in buffers:
+                    self._notify_write(file_path, start, len(buffer))
+                version = fingerprint_service.fingerprint(file_path)
+                with self._cache_lock:
+                    self._file_versions[file_path] = version
+                    self._file_checked[file_path] = time.monotonic()
+        except Exception as e:
+            print(f"Error writing file batch to {file_path}: {e}")
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return [False] * len(writes)
+        return [True] * len(writes)
+
+    @instrumentation.timed("memory.write_batch", "process")
+    def write_memory_batch(self, writes: List[Tuple[int, bytes, Optional[str]]], max_gap: int = 0) -> List[bool]:
+        """Write (address, data, label) items with one read and one write per merged span.
+
+        Writes closer than max_gap bytes are merged, the gap bytes are read back and written
+        unchanged. Overlapping writes apply in list order. Each write is journaled as its own
+        entry (labelled, or joining the caller's transaction). Returns success per write.
+        """
+        results = [False] * len(writes)
+        section_map = self.section_map()
+        spans = []  # [start, end, [write indices]]
+        for index in sorted(range(len(writes)), key=lambda index: writes[index][0]):
+            address, data = writes[index][0], writes[index][1]
+            if self._process_chunks(address, len(data), section_map) is None:
+                print(f"Address range {hex(address)}+{len(data)} is not mapped into the process")
+                continue
+            if spans and address - spans[-1][1] <= max_gap:
+                spans[-1][1] = max(spans[-1][1], address + len(data))
+                spans[-1][2].append(index)
+            else:
+                spans.append([address, address + len(data), [index]])
+
+        written_spans = []
+        recording = self.journal.recording
+        try:
+            with self._target_lock(PROCESS_TARGET), self._process_handle_lease() as process_handle:
+                if not process_handle:
+                    return results
+                for start, end, indices in spans:
+                    chunks = self._process_chunks(start, end - start, section_map)
+                    if chunks is None:
+                        continue
+                    indices.sort()  # Submission order, later writes win
+                    # Read the span when gap bytes must be preserved or old bytes journaled
+                    if recording or len(indices) > 1:
+                        parts = []
+                        for _, process_address, length in chunks:
+                            part = self._backend.read(process_handle, process_address, length)
+                            instrumentation.count("memory.read.syscall", length)
+                            if part is None:
+                                break
+                            parts.append(part)
+                        if len(parts) != len(chunks):
+                            continue
+                        buffer = bytearray(b''.join(parts))
+                    else:
+                        buffer = bytearray(end - start)
+
+                    entries = []
+                    for index in indices:
+                        address, data, label = writes[index]
+                        offset = address - start
+                        entries.append((address, bytes(buffer[offset:offset + len(data)]), data, label))
+                        buffer[offset:offset + len(data)] = data
+
+                    success = False
+                    try:
+                        for file_offset, process_address, length in chunks:
+                            offset = file_offset - start
+                            instrumentation.count("memory.write.syscall", length)
+                            if not self._backend.write(process_handle, process_address, bytes(buffer[offset:offset + length])):
+                                break
+                        else:
+                            success = True
+                    finally:
+                        self._invalidate_range(self._memory_cache, start, end - start)
+                        self._update_journal_pages(start, bytes(buffer), success)
+                    if not success:
+                        continue
+                    for index in indices:
+                        results[index] = True
+                    if recording:
+                        for address, old, new, label in entries:
+                            self.journal.record(PROCESS_TARGET, address, old, new, label)
+                    written_spans.append((start, end))
+        except Exception as e:
+            print(f"Error writing memory batch: {e}")
+
+        for start, end in written_spans:
+            self._notify_write(PROCESS_TARGET, start, end - start)
+        return results
+
+    @instrumentation.timed("backup.batch", "backup")
     def batch_file_backup(self, source_path: str, dest_path: str, progress_callback=None) -> bool:
         """Optimized batch file backup with progress tracking"""
         try:
@@ -230,33 +829,52 @@ class FileIOManager:
 
     def clear_cache(self):
         """Clear all caches"""
-        self._file_cache.clear()
-        self._memory_cache.clear()
+        with self._cache_lock:
+            self._file_cache.clear()
+            self._memory_cache.clear()
+            self._cache_generation += 1
 
     def close_process_handle(self):
         """Close process handle"""
-        if self._process_handle:
-            try:
-                ctypes.windll.kernel32.CloseHandle(self._process_handle)
-                self._process_handle = None
-                self._current_process_id = None
-            except:
-                pass
+        with self._handle_lock.write():
+            self._close_handle_locked()
 
     def find_pvz_process(self) -> Optional[int]:
-        """Find PVZ process ID"""
-        try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] == 'PlantsVsZombies.exe':
-                    return proc.info['pid']
-            return None
-        except Exception as e:
-            print(f"Error finding PVZ process: {e}")
-            return None
+        """Find PVZ process ID (cached by the discovery service, cheap to call per click)"""
+        return self.discovery.current_pid()
+
+
+def _rehash_written_pages(target: str, address: int, size: int):
+    """Write listener: page hashes are kept for files only"""
+    if target != PROCESS_TARGET:
+        fingerprint_service.notify_write(target, address, size)
+
+
+class _HandleLease:
+    """Context manager behind FileIOManager._process_handle_lease; a class because it is
+    entered on every process read and write, where a generator costs a few microseconds"""
+
+    __slots__ = ('_manager', '_rescan', '_locked')
+
+    def __init__(self, manager: FileIOManager, rescan: bool):
+        self._manager = manager
+        self._rescan = rescan
+        self._locked = False
+
+    def __enter__(self) -> Optional[int]:
+        handle, self._locked = self._manager._acquire_handle(self._rescan)
+        return handle
+
+    def __exit__(self, *exc_info):
+        if self._locked:
+            self._locked = False
+            self._manager._handle_lock.release_read()
+        return False
 
 
 # Global instance
 file_io_manager = FileIOManager()
+file_io_manager.add_write_listener(_rehash_written_pages)
 
 
 # Legacy function wrappers for backward compatibility
@@ -321,12 +939,5 @@ def write_memory_bytes(process_handle: int, address: int, data: bytes) -> bool:
 
 
 def find_pvz_process() -> Optional[int]:
-    """Find PVZ process ID"""
-    try:
-        for proc in psutil.process_iter(['pid', 'name']):
-            if proc.info['name'] == 'PlantsVsZombies.exe':
-                return proc.info['pid']
-        return None
-    except Exception as e:
-        print(f"Error finding PVZ process: {e}")
-        return None
+    """Legacy wrapper for finding the PVZ process ID"""
+    return file_io_manager.find_pvz_process()
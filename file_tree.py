@@ -0,0 +1,316 @@
+"""
+Project file tree for PvZModTool
+A ttk.Treeview over the project folder: directories are listed with os.scandir only when
+expanded, listings are cached per directory mtime, big directories are inserted a page at
+a time as the user scrolls, and expanded directories are re-listed incrementally when
+they change on disk
+"""
+import os
+import threading
+import time
+from tkinter import *
+from tkinter import ttk
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from instrumentation import instrumentation
+from io_executor import io_executor, TREE_LANE
+
+
+PAGE_SIZE = 500  # Rows inserted at a time into a big directory
+POLL_INTERVAL_MS = 2000  # How often expanded directories are checked for changes
+LOADING_SUFFIX = "\0loading"  # iid suffix of the dummy child that makes a directory expandable
+MORE_SUFFIX = "\0more"  # iid suffix of the "more entries" row at the end of a partly shown directory
+
+
+class EntryInfo(NamedTuple):
+    name: str
+    path: str
+    is_dir: bool
+    size: int
+    mtime: float
+
+
+def _sort_key(entry: EntryInfo):
+    return not entry.is_dir, entry.name.casefold()
+
+
+class StatCache:
+    """os.scandir listings, each kept with the directory's mtime at the time it was read.
+
+    A directory's mtime changes when entries are added, removed or renamed, so one stat()
+    tells whether a cached listing is still good. A file rewritten in place (the EXE) does
+    not move it, refresh_files() re-stats the file entries the tree shows.
+    """
+
+    def __init__(self):
+        self._listings: Dict[str, Tuple[int, List[EntryInfo]]] = {}  # path -> (mtime_ns, sorted entries)
+        self._lock = threading.Lock()
+
+    def listing(self, path: str) -> Optional[List[EntryInfo]]:
+        """Sorted entries of path (directories first), None if it cannot be read"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.forget(path)
+            return None
+        cached = self._listings.get(path)
+        if cached is not None and cached[0] == mtime:
+            instrumentation.cache("tree.listing", True)
+            return cached[1]
+        instrumentation.cache("tree.listing", False)
+        entries = []
+        try:
+            with instrumentation.span("tree.scandir", "io"), os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir()
+                        # Free on Windows, where scandir already returned it
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append(EntryInfo(entry.name, entry.path, is_dir, 0 if is_dir else info.st_size,
+                                             info.st_mtime))
+        except OSError as e:
+            print(f"Error listing {path}: {e}")
+            return None
+        entries.sort(key=_sort_key)
+        with self._lock:
+            self._listings[path] = (mtime, entries)
+        return entries
+
+    def refresh_files(self, path: str, count: int) -> Optional[List[EntryInfo]]:
+        """Re-stat the files among the first count entries of path's listing.
+
+        Returns the updated listing if a size or mtime moved, else None.
+        """
+        cached = self._listings.get(path)
+        if cached is None:
+            return None
+        mtime, entries = cached
+        updated = None
+        for index, entry in enumerate(entries[:count]):
+            if entry.is_dir:
+                continue
+            try:
+                info = os.stat(entry.path)
+            except OSError:
+                continue  # Removed: the directory's mtime moved, the next listing drops it
+            if info.st_size != entry.size or info.st_mtime != entry.mtime:
+                if updated is None:
+                    updated = list(entries)
+                updated[index] = entry._replace(size=info.st_size, mtime=info.st_mtime)
+        if updated is None:
+            return None
+        with self._lock:
+            if self._listings.get(path) is cached:
+                self._listings[path] = (mtime, updated)
+        return updated
+
+    def changed(self, path: str) -> bool:
+        """True if path was never listed or its mtime moved since"""
+        cached = self._listings.get(path)
+        try:
+            return cached is None or os.stat(path).st_mtime_ns != cached[0]
+        except OSError:
+            return True
+
+    def forget(self, path: str):
+        """Drop path and everything below it"""
+        prefix = os.path.join(path, "")
+        with self._lock:
+            for key in [key for key in self._listings if key == path or key.startswith(prefix)]:
+                del self._listings[key]
+
+
+def _format_size(size: int) -> str:
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+def _row_values(entry: EntryInfo) -> Tuple[str, str]:
+    size = "" if entry.is_dir else _format_size(entry.size)
+    return size, time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.mtime))
+
+
+class ProjectTree:
+    """Lazily expanded tree of a project folder, iids are the entries' paths"""
+
+    def __init__(self, parent, root_path: str, stat_cache: Optional[StatCache] = None):
+        self.root_path = root_path
+        self.stat_cache = stat_cache or StatCache()
+        self._entries: Dict[str, List[EntryInfo]] = {}  # Loaded directory -> listing its rows were built from
+        self._shown: Dict[str, int] = {}  # Loaded directory -> rows inserted so far (a prefix of the listing)
+        self._page_check_pending = False
+
+        self.frame = Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=("size", "modified"), selectmode=BROWSE)
+        self.tree.heading("#0", text="Имя")
+        self.tree.heading("size", text="Размер")
+        self.tree.heading("modified", text="Изменен")
+        self.tree.column("#0", width=220)
+        self.tree.column("size", width=80, anchor=E, stretch=False)
+        self.tree.column("modified", width=120, stretch=False)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        self.load(root_path)
+        self.frame.after(POLL_INTERVAL_MS, self.poll)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _iid(self, path: str) -> str:
+        """Treeview parent of path's children: the root folder is the tree's root"""
+        return "" if path == self.root_path else path
+
+    # --- loading ---
+
+    def load(self, path: str):
+        """List path in the background and fill its rows"""
+        io_executor.submit(self.stat_cache.listing, path, key=f"tree:{path}", lane=TREE_LANE,
+                           on_done=lambda entries: self.show_listing(path, entries))
+
+    def on_open(self, event=None):
+        path = self.tree.focus()
+        if path and path not in self._entries:
+            self.load(path)
+
+    def on_select(self, event=None):
+        """Clicking the "more" row loads the next page"""
+        for iid in self.tree.selection():
+            if iid.endswith(MORE_SUFFIX):
+                self.insert_page(iid[:-len(MORE_SUFFIX)])
+
+    @instrumentation.timed("tree.show_listing", "ui")
+    def show_listing(self, path: str, entries: Optional[List[EntryInfo]]):
+        """Build or update path's rows from a listing (called on the Tk thread)"""
+        parent = self._iid(path)
+        if parent and not self.tree.exists(parent):
+            return  # Removed while it was being listed
+        if entries is None:
+            self._forget(path)
+            if parent:
+                self.tree.delete(*self.tree.get_children(parent))
+            return
+        if path not in self._entries:
+            self.tree.delete(*self.tree.get_children(parent))
+            self._entries[path] = entries
+            self._shown[path] = 0
+            self.insert_page(path)
+        else:
+            self.update_listing(path, entries)
+
+    def _insert_row(self, parent: str, index, entry: EntryInfo):
+        self.tree.insert(parent, index, iid=entry.path, text=entry.name, values=_row_values(entry))
+        if entry.is_dir:
+            # Makes the directory expandable, replaced by the listing when opened
+            self.tree.insert(entry.path, END, iid=entry.path + LOADING_SUFFIX, text="Загрузка...")
+
+    def insert_page(self, path: str):
+        """Insert the next PAGE_SIZE rows of path and move the "more" row after them"""
+        parent = self._iid(path)
+        entries = self._entries[path]
+        start = self._shown[path]
+        for entry in entries[start:start + PAGE_SIZE]:
+            self._insert_row(parent, END, entry)
+        self._shown[path] = min(len(entries), start + PAGE_SIZE)
+        self._update_more_row(path)
+
+    def _update_more_row(self, path: str):
+        parent = self._iid(path)
+        more = path + MORE_SUFFIX
+        if self.tree.exists(more):
+            self.tree.delete(more)
+        remaining = len(self._entries[path]) - self._shown[path]
+        if remaining > 0:
+            self.tree.insert(parent, END, iid=more, text=f"... еще {remaining}")
+
+    def on_scroll(self, first, last):
+        """yscrollcommand: keep the scrollbar in sync and fill pages whose "more" row came into view"""
+        self.scrollbar.set(first, last)
+        if not self._page_check_pending and any(self._shown[path] < len(entries)
+                                                for path, entries in self._entries.items()):
+            self._page_check_pending = True
+            self.frame.after_idle(self.load_visible_pages)
+
+    def load_visible_pages(self):
+        self._page_check_pending = False
+        for path in list(self._entries):
+            more = path + MORE_SUFFIX
+            if self.tree.exists(more) and self.tree.bbox(more):
+                self.insert_page(path)
+
+    # --- incremental refresh ---
+
+    def _forget(self, path: str):
+        prefix = os.path.join(path, "")
+        for key in [key for key in self._entries if key == path or key.startswith(prefix)]:
+            del self._entries[key]
+            del self._shown[key]
+        self.stat_cache.forget(path)
+
+    def update_listing(self, path: str, entries: List[EntryInfo]):
+        """Apply a new listing to rows already shown: delete, update and insert only what changed"""
+        parent = self._iid(path)
+        old = {entry.path: entry for entry in self._entries[path]}
+        new = {entry.path: entry for entry in entries}
+        shown_rows = [iid for iid in self.tree.get_children(parent) if not iid.endswith(MORE_SUFFIX)]
+        removed = [iid for iid in shown_rows if iid not in new]
+        if removed:
+            for iid in removed:
+                self._forget(iid)
+            self.tree.delete(*removed)
+        # Rows stay a prefix of the listing: extend it to the last kept row
+        position = {entry.path: index for index, entry in enumerate(entries)}
+        kept = [iid for iid in shown_rows if iid in new]
+        if self._shown[path] >= len(old):
+            shown = len(entries)
+        else:
+            shown = max([position[iid] + 1 for iid in kept] + [min(self._shown[path], len(entries))])
+        kept = set(kept)
+        for index, entry in enumerate(entries[:shown]):
+            if entry.path not in kept:
+                self._insert_row(parent, index, entry)
+            elif old[entry.path] != entry:
+                self.tree.item(entry.path, values=_row_values(entry))
+        self._entries[path] = entries
+        self._shown[path] = shown
+        self._update_more_row(path)
+
+    def _open_paths(self) -> Dict[str, int]:
+        """Loaded directories whose rows are visible (the root and expanded ones) -> rows shown"""
+        return {path: self._shown[path] for path in self._entries
+                if path == self.root_path or (self.tree.exists(path) and self.tree.item(path, "open"))}
+
+    def poll(self):
+        self.refresh()
+        self.frame.after(POLL_INTERVAL_MS, self.poll)
+
+    def refresh(self):
+        """Re-list expanded directories whose mtime moved and re-stat their shown files
+        (the check runs in the background)"""
+        io_executor.submit(self._changed_listings, self._open_paths(), key="tree.poll", lane=TREE_LANE,
+                           on_done=self.show_changed)
+
+    def _changed_listings(self, paths: Dict[str, int]) -> Dict[str, Optional[List[EntryInfo]]]:
+        listings = {}
+        for path, shown in paths.items():
+            if self.stat_cache.changed(path):
+                listings[path] = self.stat_cache.listing(path)
+            else:
+                entries = self.stat_cache.refresh_files(path, shown)
+                if entries is not None:
+                    listings[path] = entries
+        return listings
+
+    def show_changed(self, listings: Dict[str, Optional[List[EntryInfo]]]):
+        for path, entries in listings.items():
+            if path in self._entries:
+                self.show_listing(path, entries)
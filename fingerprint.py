@@ -0,0 +1,208 @@
+"""
+EXE fingerprinting for PvZModTool
+Hashes the EXE in fixed-size pages so a write only rehashes the pages it touched
+"""
+import atexit
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from array import array
+from typing import Dict, Optional
+
+
+PAGE_SIZE = 0x1000
+SIDECAR_SUFFIX = ".pages"
+SIDECAR_MAGIC = b'PVZP'
+SIDECAR_VERSION = 1
+# magic, version, page size, file size, mtime_ns
+SIDECAR_HEADER = struct.Struct('<4sIIQq')
+
+
+class ExeFingerprint:
+    """Page-hash vector of one file, stored next to it"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.sidecar_path = file_path + SIDECAR_SUFFIX
+        self.pages = array('I')
+        self.file_size = 0
+        self._stamp = None  # (mtime_ns, size) the page hashes correspond to
+        self._digest: Optional[str] = None
+        self._written_stamp = None  # (mtime_ns, size) right after our last write, pages already rehashed
+        self.dirty = False  # Pages changed since the sidecar was saved
+
+    def _stat_stamp(self):
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_sidecar(self, stamp) -> bool:
+        try:
+            with open(self.sidecar_path, 'rb') as f:
+                header = f.read(SIDECAR_HEADER.size)
+                magic, version, page_size, file_size, mtime_ns = SIDECAR_HEADER.unpack(header)
+                if (magic, version, page_size) != (SIDECAR_MAGIC, SIDECAR_VERSION, PAGE_SIZE):
+                    return False
+                if (mtime_ns, file_size) != stamp:
+                    return False
+                pages = array('I')
+                pages.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return False
+        if len(pages) != (file_size + PAGE_SIZE - 1) // PAGE_SIZE:
+            return False
+        self.pages = pages
+        self.file_size = file_size
+        self._stamp = stamp
+        self._digest = None
+        return True
+
+    def save(self):
+        try:
+            with open(self.sidecar_path, 'wb') as f:
+                f.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, SIDECAR_VERSION, PAGE_SIZE,
+                                            self.file_size, self._stamp[0]))
+                f.write(self.pages.tobytes())
+            self.dirty = False
+        except OSError as e:
+            print(f"Error saving page hashes for {self.file_path}: {e}")
+
+    def rehash(self):
+        """Hash every page of the file"""
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+        view = memoryview(data)
+        self.pages = array('I', (zlib.crc32(view[i:i + PAGE_SIZE]) for i in range(0, len(data), PAGE_SIZE)))
+        self.file_size = len(data)
+        self._stamp = self._stat_stamp()
+        self._digest = None
+        self._written_stamp = None
+        self.save()
+
+    def refresh(self) -> bool:
+        """Bring the hashes up to date; returns True if the file changed behind our back"""
+        stamp = self._stat_stamp()
+        if stamp == self._stamp:
+            return False
+        if stamp == self._written_stamp:
+            # Only our own writes since the last refresh, their pages are already rehashed
+            self._stamp = stamp
+            self._written_stamp = None
+            return False
+        if self._stamp is None and self._load_sidecar(stamp):
+            return False
+        self.rehash()
+        return True
+
+    def update_range(self, offset: int, size: int):
+        """Rehash only the pages overlapping [offset, offset + size) after a write we made.
+
+        Records the stamp the write left (an fstat of the handle already open) so the next
+        refresh() adopts it without a rehash only if nobody wrote since. Does not save the
+        sidecar, FingerprintService.flush() writes it once.
+        """
+        if self._stamp is None:
+            self.refresh()
+            return
+        if offset + size > self.file_size:
+            # The file grew, page boundaries no longer line up
+            self.rehash()
+            return
+
+        first = offset // PAGE_SIZE
+        last = (offset + size - 1) // PAGE_SIZE
+        with open(self.file_path, 'rb') as f:
+            f.seek(first * PAGE_SIZE)
+            data = f.read((last - first + 1) * PAGE_SIZE)
+            stat = os.fstat(f.fileno())
+        view = memoryview(data)
+        for page in range(first, last + 1):
+            start = (page - first) * PAGE_SIZE
+            self.pages[page] = zlib.crc32(view[start:start + PAGE_SIZE])
+        self._digest = None
+        self._written_stamp = (stat.st_mtime_ns, stat.st_size)
+        self.dirty = True
+
+    @property
+    def digest(self) -> str:
+        """Fingerprint of the whole file derived from the page-hash vector"""
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            hasher.update(struct.pack('<Q', self.file_size))
+            hasher.update(self.pages.tobytes())
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def changed_pages(self, other: 'ExeFingerprint'):
+        """Indices of pages that differ from another fingerprint of the same layout"""
+        count = max(len(self.pages), len(other.pages))
+        return [i for i in range(count)
+                if i >= len(self.pages) or i >= len(other.pages) or self.pages[i] != other.pages[i]]
+
+
+class FingerprintService:
+    """Keeps one up-to-date fingerprint per file; safe to call from several threads"""
+
+    def __init__(self):
+        self._fingerprints: Dict[str, ExeFingerprint] = {}
+        self._lock = threading.Lock()
+
+    def _get_locked(self, file_path: str) -> ExeFingerprint:
+        file_path = os.path.abspath(file_path)
+        fingerprint = self._fingerprints.get(file_path)
+        if fingerprint is None:
+            fingerprint = ExeFingerprint(file_path)
+            self._fingerprints[file_path] = fingerprint
+        fingerprint.refresh()
+        return fingerprint
+
+    def get(self, file_path: str) -> ExeFingerprint:
+        with self._lock:
+            return self._get_locked(file_path)
+
+    def fingerprint(self, file_path: str) -> Optional[str]:
+        """Current fingerprint of file_path, or None if it cannot be read"""
+        try:
+            with self._lock:
+                return self._get_locked(file_path).digest
+        except OSError as e:
+            print(f"Error fingerprinting {file_path}: {e}")
+            return None
+
+    def notify_write(self, file_path: str, offset: int, size: int):
+        """Write listener: rehash the pages touched by a write (process writes are not tracked)"""
+        with self._lock:
+            fingerprint = self._fingerprints.get(os.path.abspath(file_path))
+            if fingerprint is None:
+                return
+            try:
+                fingerprint.update_range(offset, size)
+            except OSError as e:
+                print(f"Error updating page hashes for {file_path}: {e}")
+
+    def forget(self, file_path: str):
+        with self._lock:
+            fingerprint = self._fingerprints.pop(os.path.abspath(file_path), None)
+            if fingerprint is not None:
+                self._save_locked(fingerprint)
+
+    def _save_locked(self, fingerprint: ExeFingerprint):
+        if not fingerprint.dirty:
+            return
+        try:
+            fingerprint.refresh()  # Stamp of the last write, not of the last load
+            fingerprint.save()
+        except OSError as e:
+            print(f"Error saving page hashes for {fingerprint.file_path}: {e}")
+
+    def flush(self):
+        """Save the sidecars of files written since they were last saved"""
+        with self._lock:
+            for fingerprint in self._fingerprints.values():
+                self._save_locked(fingerprint)
+
+
+# Global instance
+fingerprint_service = FingerprintService()
+atexit.register(fingerprint_service.flush)
@@ -0,0 +1,145 @@
+"""
+Value freezer for PvZModTool
+Pins process addresses to values and re-asserts them from a background thread
+"""
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import address_table
+from address_table import coalesce_ranges
+from file_io_utils import file_io_manager
+from instrumentation import instrumentation
+
+
+DEFAULT_INTERVAL = 0.1  # Seconds between drift checks
+RESCAN_INTERVAL = 1.0  # Seconds between process list scans while the game is not attached
+# Frozen values further apart than this are checked with separate reads
+MAX_READ_GAP = 0x100
+
+
+class FrozenValue(NamedTuple):
+    address: int
+    data: bytes
+    label: str
+
+
+class ValueFreezer:
+    """Keeps frozen values in the running game.
+
+    Each tick reads every coalesced span of frozen values once through the open process
+    handle and writes only the values that drifted, merged into contiguous runs.
+    """
+
+    def __init__(self, manager=file_io_manager, interval: float = DEFAULT_INTERVAL):
+        self.manager = manager
+        self.interval = interval
+        self._values: Dict[int, FrozenValue] = {}
+        self._spans: List[Tuple[int, int, List[FrozenValue]]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._next_rescan = 0.0
+        self.writes = 0  # Values re-asserted since start, for the status line
+
+    # --- freeze list ---
+
+    def freeze(self, address: int, value, size: int = 4, label: Optional[str] = None):
+        """Pin address to value (an int of size bytes, or raw bytes)"""
+        data = value if isinstance(value, bytes) else int(value).to_bytes(size, byteorder='little')
+        with self._lock:
+            self._values[address] = FrozenValue(address, data, label or address_table.label_for(address, len(data)) or hex(address))
+            self._rebuild_spans()
+        self.start()
+        self._wake.set()
+
+    def freeze_label(self, label: str, value) -> bool:
+        """Pin a named address ("Category: Name" or just "Name"); False if the build has no such address"""
+        _, spans = address_table.address_labels()
+        for start, end, name in spans:
+            if label == name or name.endswith(f": {label}"):
+                self.freeze(start, value, end - start, name)
+                return True
+        return False
+
+    def unfreeze(self, address: int):
+        with self._lock:
+            self._values.pop(address, None)
+            self._rebuild_spans()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._rebuild_spans()
+
+    def frozen(self) -> List[FrozenValue]:
+        with self._lock:
+            return sorted(self._values.values())
+
+    def is_frozen(self, address: int) -> bool:
+        return address in self._values
+
+    def _rebuild_spans(self):
+        values = sorted(self._values.values())
+        spans = []
+        for start, end in coalesce_ranges([(value.address, len(value.data)) for value in values], MAX_READ_GAP):
+            spans.append((start, end, [value for value in values if start <= value.address < end]))
+        self._spans = spans
+
+    # --- background loop ---
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ValueFreezer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run(self):
+        while self._running:
+            with self._lock:
+                spans = self._spans
+            if spans:
+                self.tick(spans)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def tick(self, spans=None) -> int:
+        """Check every frozen value once; returns how many were rewritten"""
+        spans = self._spans if spans is None else spans
+        rewritten = 0
+        with instrumentation.span("freezer.tick", "process"):
+            for start, end, values in spans:
+                current = self.manager.read_memory_raw(start, end - start)
+                if current is None:
+                    # No open handle: scan the process list, but only occasionally while the game is not running
+                    now = time.monotonic()
+                    if now < self._next_rescan:
+                        break
+                    self._next_rescan = now + RESCAN_INTERVAL
+                    current = self.manager.read_memory_raw(start, end - start, rescan=True)
+                    if current is None:
+                        break
+                drifted = [value for value in values
+                           if current[value.address - start:value.address - start + len(value.data)] != value.data]
+                if not drifted:
+                    continue
+                # Write drifted values that touch each other as one run, never the gap bytes between them
+                for run_start, run_end in coalesce_ranges([(value.address, len(value.data)) for value in drifted], 0):
+                    run = bytearray(current[run_start - start:run_end - start])
+                    for value in drifted:
+                        if run_start <= value.address < run_end:
+                            run[value.address - run_start:value.address - run_start + len(value.data)] = value.data
+                    if self.manager.write_memory_raw(run_start, bytes(run)):
+                        rewritten += sum(1 for value in drifted if run_start <= value.address < run_end)
+        self.writes += rewritten
+        return rewritten
+
+
+# Global instance
+value_freezer = ValueFreezer()
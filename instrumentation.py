@@ -0,0 +1,236 @@
+"""
+Instrumentation for PvZModTool
+Per-operation counters, bytes moved, cache hit rates and latency histograms, exported as a
+Chrome trace (chrome://tracing, Perfetto) and a plain-text summary table
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+# Latency histogram buckets are powers of two in microseconds: <1us, <2us, ..., <2^(BUCKETS-1)us
+HISTOGRAM_BUCKETS = 24
+# Trace events kept in memory, older ones are dropped first
+MAX_TRACE_EVENTS = 200000
+
+
+class OperationStats:
+    """Aggregated numbers for one operation name"""
+
+    __slots__ = ("count", "total_seconds", "max_seconds", "bytes", "hits", "misses", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add_latency(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.histogram[bucket] += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound in seconds of the histogram bucket containing the given fraction"""
+        total = sum(self.histogram)
+        if not total:
+            return None
+        threshold = fraction * total
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= threshold:
+                return (1 << bucket) / 1e6
+        return (1 << (HISTOGRAM_BUCKETS - 1)) / 1e6
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total_seconds * 1000,
+            "max_ms": self.max_seconds * 1000,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "histogram_us": {f"<{1 << bucket}": count for bucket, count in enumerate(self.histogram) if count},
+        }
+
+
+class _NullSpan:
+    """Span used while instrumentation is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("owner", "name", "category", "args", "start")
+
+    def __init__(self, owner: 'Instrumentation', name: str, category: str, args: Optional[Dict]):
+        self.owner = owner
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.owner._record_span(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class Instrumentation:
+    """Collects hot-path statistics; every entry point is a single flag check while disabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stats: Dict[str, OperationStats] = {}
+        self._events = deque(maxlen=MAX_TRACE_EVENTS)
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+            self._origin = time.perf_counter()
+
+    def _get_stats(self, name: str) -> OperationStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = OperationStats()
+        return stats
+
+    def _record_span(self, name: str, category: str, start: float, end: float, args: Optional[Dict]):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._get_stats(name).add_latency(end - start)
+            self._events.append(event)
+
+    def span(self, name: str, category: str = "app", **args):
+        """Context manager timing a block as one trace event"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args or None)
+
+    def timed(self, name: str, category: str = "app"):
+        """Decorator timing every call of a function as one trace event"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._record_span(name, category, start, time.perf_counter(), None)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, bytes_moved: int = 0):
+        """Count an operation that is not timed on its own, optionally with bytes moved"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._get_stats(name)
+            stats.count += 1
+            stats.bytes += bytes_moved
+
+    def add_bytes(self, name: str, bytes_moved: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._get_stats(name).bytes += bytes_moved
+
+    def cache(self, name: str, hit: bool):
+        """Record a cache lookup result for name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._get_stats(name)
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+
+    def export_chrome_trace(self, path: str) -> int:
+        """Write the collected events as Chrome trace-event JSON; returns the number of events"""
+        with self._lock:
+            events = list(self._events)
+            counters = {name: stats.as_dict() for name, stats in self._stats.items()}
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": thread_names[tid]}}
+            for tid in {event["tid"] for event in events} if tid in thread_names
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                       "otherData": {"stats": counters}}, f)
+        return len(events)
+
+    def summary_table(self) -> str:
+        """Fixed-width table of every operation seen so far"""
+        rows = self.snapshot()
+        header = f"{'operation':32s} {'count':>8s} {'total ms':>10s} {'mean us':>9s} {'p50<us':>8s} " \
+                 f"{'p99<us':>8s} {'max ms':>8s} {'bytes':>12s} {'hit %':>6s}"
+        lines = [header, "-" * len(header)]
+        with self._lock:
+            percentiles = {name: (stats.percentile(0.5), stats.percentile(0.99)) for name, stats in self._stats.items()}
+        for name, row in rows.items():
+            p50, p99 = percentiles.get(name, (None, None))
+            lookups = row["hits"] + row["misses"]
+            timed = sum(row["histogram_us"].values())
+            lines.append(
+                f"{name:32s} {row['count']:8d} {row['total_ms']:10.2f} "
+                f"{(row['total_ms'] * 1000 / timed) if timed else 0:9.1f} "
+                f"{(p50 or 0) * 1e6:8.0f} {(p99 or 0) * 1e6:8.0f} {row['max_ms']:8.2f} "
+                f"{row['bytes']:12d} {(100 * row['hits'] / lookups) if lookups else 0:6.1f}"
+            )
+        return "\n".join(lines)
+
+
+# Global instance
+instrumentation = Instrumentation()
+if os.environ.get("PVZ_TRACE"):
+    instrumentation.enable()
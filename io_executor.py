@@ -0,0 +1,160 @@
+"""
+Background I/O executor for PvZModTool
+Runs reads and writes off the Tk thread and hands results back to it through one queue
+drained by a single after() pump
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from file_io_utils import PROCESS_TARGET
+from instrumentation import instrumentation
+
+
+# Lanes are separate worker pools, so a slow job in one never holds up another.
+# EXE reads and writes: one worker, UI writes land in the order they were submitted
+IO_LANE = "io"
+# Reads and writes of the running game: one worker, a hung ReadProcessMemory stalls only the game
+PROCESS_LANE = "process"
+# Jobs that take seconds (memory capture, signature scan, undo of a large step)
+SLOW_LANE = "slow"
+# Project tree listings and its change poll
+TREE_LANE = "tree"
+LANE_WORKERS = {IO_LANE: 1, PROCESS_LANE: 1, SLOW_LANE: 2, TREE_LANE: 1}
+PUMP_INTERVAL_MS = 15
+MAX_CALLBACKS_PER_PUMP = 200  # Keep a flood of results from starving the event loop
+
+
+class IOJob:
+    """Handle of a submitted job; cancel() drops its result even if it already ran"""
+
+    def __init__(self, key: Optional[str], on_done: Optional[Callable], on_error: Optional[Callable]):
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class IOExecutor:
+    """Worker pool for blocking I/O with Tk-safe result delivery.
+
+    Jobs submitted with a key supersede earlier jobs with the same key, so a result
+    for an address that is no longer selected never reaches the UI.
+    """
+
+    def __init__(self, lane_workers: Optional[Dict[str, int]] = None):
+        self._lane_workers = dict(LANE_WORKERS if lane_workers is None else lane_workers)
+        self._pools: Dict[str, ThreadPoolExecutor] = {}  # Started on first use
+        self._results = queue.SimpleQueue()  # (callback, args) to run on the Tk thread
+        self._latest: Dict[str, IOJob] = {}
+        self._lock = threading.Lock()
+        self._root = None
+
+    def attach(self, root):
+        """Start delivering results on root's event loop"""
+        self._root = root
+        self._pump()
+
+    def submit(self, func: Callable, *args, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None, key: Optional[str] = None, lane: str = IO_LANE,
+               **kwargs) -> IOJob:
+        """Run func(*args, **kwargs) on a worker of lane; on_done(result) or on_error(exception) run on the Tk thread"""
+        job = IOJob(key, on_done, on_error)
+        with self._lock:
+            if key is not None:
+                previous = self._latest.get(key)
+                self._latest[key] = job
+            else:
+                previous = None
+            pool = self._pools.get(lane)
+            if pool is None:
+                pool = self._pools[lane] = ThreadPoolExecutor(max_workers=self._lane_workers.get(lane, 1),
+                                                              thread_name_prefix=f"PvZIO-{lane}")
+        if previous is not None:
+            previous.cancel()
+        job.future = pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def cancel(self, key: str):
+        """Cancel the pending job for key, if any"""
+        with self._lock:
+            job = self._latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def call_in_ui(self, func: Callable, *args):
+        """Run func(*args) on the Tk thread; safe to call from any thread"""
+        self._results.put((func, args))
+
+    def _run(self, job: IOJob, func: Callable, args, kwargs):
+        if job.cancelled:
+            return
+        try:
+            with instrumentation.span(f"job {job.key or getattr(func, '__name__', 'call')}", "io"):
+                result = func(*args, **kwargs)
+        except Exception as e:
+            if job.on_error is not None:
+                self._results.put((self._deliver, (job, job.on_error, e)))
+            else:
+                print(f"Error in background job {job.key or func}: {e}")
+            return
+        if job.on_done is not None:
+            self._results.put((self._deliver, (job, job.on_done, result)))
+        else:
+            self._results.put((self._forget, (job,)))
+
+    def _forget(self, job: IOJob):
+        if job.key is not None:
+            with self._lock:
+                if self._latest.get(job.key) is job:
+                    del self._latest[job.key]
+
+    def _deliver(self, job: IOJob, callback: Callable, value):
+        self._forget(job)
+        if not job.cancelled:
+            callback(value)
+
+    def drain(self, limit: Optional[int] = None) -> int:
+        """Run queued UI callbacks on the calling thread; returns how many ran"""
+        ran = 0
+        while limit is None or ran < limit:
+            try:
+                func, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in UI callback {func}: {e}")
+            ran += 1
+        return ran
+
+    def _pump(self):
+        self.drain(MAX_CALLBACKS_PER_PUMP)
+        try:
+            self._root.after(PUMP_INTERVAL_MS, self._pump)
+        except Exception:
+            # Root window destroyed
+            self._root = None
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def target_lane(target: str) -> str:
+    """Lane for a job that reads or writes target, the game or an EXE"""
+    return PROCESS_LANE if target == PROCESS_TARGET else IO_LANE
+
+
+# Global instance
+io_executor = IOExecutor()
@@ -1,11 +1,31 @@
 from tkinter import *
-from tkinter import filedialog, messagebox, ttk
-import os, subprocess, threading, sys
+from tkinter import filedialog, messagebox, simpledialog, ttk
+import os, subprocess, threading, sys, atexit
 from project_manager import ProjectManager
 from backup_thread import BackupThread
 from adventure_spawn import AdventureSpawnEditor
-from file_io_utils import file_io_manager
+from file_io_utils import file_io_manager, PROCESS_TARGET
 import addresses
+import address_table
+import signatures
+from relocation import address_relocator
+from patch_catalog import patch_catalog, PATCH_APPLIED, PATCH_FOREIGN
+from instrumentation import instrumentation
+from stall_monitor import StallMonitor, DEFAULT_THRESHOLD
+from io_executor import io_executor, target_lane, PROCESS_LANE, SLOW_LANE
+from process_discovery import PROCESS_ATTACHED
+from write_log import write_log, LOG_FILE_NAME
+from freezer import value_freezer
+from file_tree import ProjectTree
+from process_fleet import process_fleet, failed_pids
+import startup_mod
+from rpc_daemon import rpc_server
+from project_index import project_index, CHANGE_ADDED, CHANGE_REMOVED
+
+# Порог зависания интерфейса в секундах (0 - монитор выключен), задается флагом --stall-threshold
+stall_threshold = DEFAULT_THRESHOLD
+# Обслуживать сессию для скриптов через rpc_daemon (флаг --rpc)
+rpc_enabled = False
 
 class StartMenu():
     def __init__(self, project_manager):
@@ -36,13 +56,64 @@ class MainMenu():
         self.root.title("PvZ Modding Tool - Main Menu")
         self.root.geometry("900x600")
 
+        # Результаты фоновых операций ввода-вывода доставляются в поток Tk
+        io_executor.attach(self.root)
+
+        # Старые шаги истории отмены выгружаются на диск, файл удаляется при выходе
+        file_io_manager.journal.spill_path = os.path.join(signatures.CACHE_DIR, f"journal_{os.getpid()}.bin")
+        atexit.register(file_io_manager.journal.clear)
+
+        # Все подтвержденные правки проекта пишутся в журнал для воспроизведения (write_log.py replay)
+        write_log.open(os.path.join(project_path, LOG_FILE_NAME))
+
+        # Индекс проекта: файлы, хеши, последние значения EXE - известны сразу, без пересканирования
+        project_index.open(project_path)
+        atexit.register(project_index.close)
+        self.index_lock = threading.Lock()  # Один обход проекта за раз
+
+        menubar = Menu(self.root)
+
+        # Меню проекта: поиск по индексу файлов и сравнение с бэкапами
+        project_menu = Menu(menubar, tearoff=0)
+        project_menu.add_command(label="Найти файлы...", command=self.search_project_files)
+        project_menu.add_command(label="Изменения с бэкапа...", command=self.show_changes_since_backup)
+        project_menu.add_command(label="Обновить индекс", command=self.refresh_project_index)
+        menubar.add_cascade(label="Проект", menu=project_menu)
+
+        # Меню правки: отмена и повтор записей в EXE и процесс
+        self.edit_menu = Menu(menubar, tearoff=0, postcommand=self.update_edit_menu)
+        self.edit_menu.add_command(label="Отменить", accelerator="Ctrl+Z", command=self.undo)
+        self.edit_menu.add_command(label="Повторить", accelerator="Ctrl+Y", command=self.redo)
+        menubar.add_cascade(label="Правка", menu=self.edit_menu)
+        self.root.bind_all("<Control-z>", lambda event: self.undo())
+        self.root.bind_all("<Control-y>", lambda event: self.redo())
+
+        # Меню диагностики: профилирование горячих путей
+        diagnostics_menu = Menu(menubar, tearoff=0)
+        self.profiling_var = BooleanVar(value=instrumentation.enabled)
+        diagnostics_menu.add_checkbutton(label="Профилирование", variable=self.profiling_var,
+                                         command=self.on_profiling_toggled)
+        diagnostics_menu.add_command(label="Экспорт трассировки...", command=self.export_trace)
+        diagnostics_menu.add_command(label="Сводка", command=self.show_profile_summary)
+        diagnostics_menu.add_command(label="Сбросить статистику", command=instrumentation.reset)
+        diagnostics_menu.add_command(label="Зависания интерфейса", command=self.show_stall_report)
+        # Поиск новых адресов: снимки памяти игры и байты, изменившиеся между ними
+        self.memory_captures = []
+        diagnostics_menu.add_separator()
+        diagnostics_menu.add_command(label="Снимок памяти", command=self.capture_memory)
+        diagnostics_menu.add_command(label="Сравнить снимки", command=lambda: self.compare_memory_captures())
+        diagnostics_menu.add_command(label="Сравнить снимки по изменению...", command=self.compare_memory_captures_by_delta)
+        diagnostics_menu.add_command(label="Удалить снимки", command=self.clear_memory_captures)
+        menubar.add_cascade(label="Диагностика", menu=diagnostics_menu)
+        self.root.config(menu=menubar)
+
         # Frame to hold Listbox and Notebook side by side
         main_frame = Frame(self.root)
         main_frame.pack(fill=BOTH, expand=True)
 
-        # Listbox on the left
-        self.listbox = Listbox(main_frame)
-        self.listbox.pack(side=LEFT, fill=BOTH, expand=True)
+        # Дерево файлов проекта слева: папки читаются при раскрытии, изменения на диске подхватываются
+        self.file_tree = ProjectTree(main_frame, project_path)
+        self.file_tree.pack(side=LEFT, fill=BOTH, expand=True)
 
         # Notebook on the right
         self.notebook = ttk.Notebook(main_frame)
@@ -78,8 +149,23 @@ class MainMenu():
         self.select_exe_button = Button(mode_frame, text="Выбрать EXE", command=self.select_exe_file)
         self.select_exe_button.pack(side=LEFT, padx=5)
 
+        # Результат проверки EXE по базе сигнатур CFF Explorer
+        self.exe_info_label = Label(tab1, text="", fg="gray")
+        self.exe_info_label.pack(padx=10, fill=X)
+
+        # Экземпляры игры, в которые идут правки режима процесса (первый выбранный - основной, с отменой)
+        instances_frame = Frame(tab1)
+        instances_frame.pack(pady=5, padx=10, fill=X)
+        Label(instances_frame, text="Экземпляры игры:").pack(side=LEFT, padx=5)
+        self.instances_listbox = Listbox(instances_frame, selectmode=MULTIPLE, height=4, exportselection=False)
+        self.instances_listbox.pack(side=LEFT, fill=X, expand=True, padx=5)
+        self.instances_listbox.bind("<<ListboxSelect>>", self.on_instances_selected)
+        self.instance_pids = []
+        Button(instances_frame, text="Обновить", command=self.refresh_instances).pack(side=LEFT, padx=5)
+
         self.exe_file_path = project_manager.project_path + "/PlantsVsZombies.exe"
         print(self.exe_file_path)
+        self.attach_exe(self.exe_file_path)
         # Create address editor in tab2
         self.address_editor = AddressEditor(tab2, self)
 
@@ -90,6 +176,16 @@ class MainMenu():
         # Create spawn rate presets editor in tab3
         self.spawn_rate_editor = AdventureSpawnEditor(tab3, self.project_path, self)
 
+        # Правки режима процесса, которые пишутся одним пакетом сразу после запуска игры из инструмента
+        startup_frame = LabelFrame(tab1, text="При запуске игры применить")
+        startup_frame.pack(pady=5, padx=10, fill=X)
+        self.startup_patches_var = BooleanVar(value=False)
+        self.startup_freeze_var = BooleanVar(value=False)
+        self.startup_spawn_var = BooleanVar(value=False)
+        Checkbutton(startup_frame, text="Отмеченные патчи", variable=self.startup_patches_var).pack(side=LEFT, padx=5)
+        Checkbutton(startup_frame, text="Замороженные значения", variable=self.startup_freeze_var).pack(side=LEFT, padx=5)
+        Checkbutton(startup_frame, text="Сетку спавна", variable=self.startup_spawn_var).pack(side=LEFT, padx=5)
+
         # Add buttons for general actions in tab1
         Button(tab1, text="Launch PlantsVsZombies.exe", command=lambda: self.launch_tool(os.path.join(self.project_path, "PlantsVsZombies.exe"), "PlantsVsZombies.exe")).pack(pady=5, fill=X)
         Button(tab1, text="Launch PvZ_Tools_v2.3.4.exe", command=lambda: self.launch_tool(os.path.join(os.getcwd(), "tools", "PvZ_Tools_v2.3.4.exe"), "PvZ_Tools_v2.3.4.exe")).pack(pady=5, fill=X)
@@ -97,8 +193,6 @@ class MainMenu():
         Button(tab1, text="Launch HxD", command=lambda: self.launch_tool(os.path.join(os.getcwd(), "tools", "HxD.exe"), "HxD.exe")).pack(pady=5, fill=X)
         Button(tab1, text="Create Backup", command=self.create_backup).pack(pady=5, fill=X)
 
-        self.populate_listbox()
-
         # Progress bar at the bottom
         self.progress_frame = Frame(self.root)
         self.progress_frame.pack(side=BOTTOM, fill=X, padx=10, pady=10)
@@ -109,50 +203,96 @@ class MainMenu():
         self.progress_bar = ttk.Progressbar(self.progress_frame, orient=HORIZONTAL, length=300, mode='determinate')
         self.progress_bar.pack(fill=X)
 
+        # Сводка из индекса видна сразу, обновление индекса идет в фоне
+        backups = project_index.backups()
+        if project_index.file_count():
+            self.progress_label.config(text=f"Проект: {project_index.file_count()} файлов, бэкапов: {len(backups)}")
+        self.refresh_project_index()
 
-        self.root.mainloop()
+        # Запуск и закрытие игры отслеживаются в фоне, редакторы получают события
+        file_io_manager.discovery.add_listener(self.on_process_event)
+        file_io_manager.discovery.start()
+        self.refresh_instances()
+
+        # Скрипты подключаются к этой же сессии: общий дескриптор процесса, кеш и очередь записи
+        if rpc_enabled and rpc_server.start():
+            print(f"RPC daemon listening on {rpc_server.address}")
+            atexit.register(rpc_server.stop)
+
+        # Сторожевой таймер цикла событий Tk: находит обработчики, блокирующие интерфейс
+        self.stall_monitor = StallMonitor(self.root, threshold=stall_threshold) if stall_threshold > 0 else None
+        if self.stall_monitor:
+            self.stall_monitor.start()
 
-    def populate_listbox(self):
-        self.listbox.delete(0, END)
-        if os.path.isdir(self.project_path):
-            for item in os.listdir(self.project_path):
-                self.listbox.insert(END, item)
+        self.root.mainloop()
 
     def launch_tool(self, default_path, friendly_name):
-        def launch_in_thread():
-            path_to_launch = default_path
-            if not os.path.isfile(path_to_launch):
-                path_to_launch = filedialog.askopenfilename(title=f"Select {friendly_name}")
-                if not path_to_launch:
-                    messagebox.showerror("Error", f"{friendly_name} executable not selected.")
-                    return
+        # Диалоги только в потоке Tk, в рабочем потоке - только запуск и ожидание
+        path_to_launch = default_path
+        if not os.path.isfile(path_to_launch):
+            path_to_launch = filedialog.askopenfilename(title=f"Select {friendly_name}")
+            if not path_to_launch:
+                messagebox.showerror("Error", f"{friendly_name} executable not selected.")
+                return
+
+        # Состояние сетки и патчей берется сейчас, в потоке Tk
+        writes = self.startup_writes() if friendly_name == "PlantsVsZombies.exe" else None
 
+        def launch_in_thread():
             try:
                 cwd = None
                 if friendly_name == "PlantsVsZombies.exe":
                     cwd = os.path.dirname(path_to_launch)
 
-                # Запустить процесс в отдельном потоке
-                process = subprocess.Popen([path_to_launch], cwd=cwd)
-                self.progress_label.config(text=f"{friendly_name} запущен (PID: {process.pid})")
+                if writes is not None:
+                    # PID запущенной игры сразу становится целью правок, выбранные правки пишутся до заставки
+                    process, report = startup_mod.launch(path_to_launch, writes, cwd=cwd, label="Правки при запуске")
+                    io_executor.call_in_ui(self.show_launch_report, friendly_name, report)
+                else:
+                    # Запустить процесс в отдельном потоке
+                    process = subprocess.Popen([path_to_launch], cwd=cwd)
+                    io_executor.call_in_ui(lambda: self.progress_label.config(text=f"{friendly_name} запущен (PID: {process.pid})"))
 
                 # Ожидать завершения процесса в фоне
                 process.wait()
 
                 # Обновить статус после завершения
-                self.root.after(0, lambda: self.progress_label.config(text="Готов к работе"))
+                io_executor.call_in_ui(lambda: self.progress_label.config(text="Готов к работе"))
 
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to launch {friendly_name}: {e}"))
+                io_executor.call_in_ui(messagebox.showerror, "Error", f"Failed to launch {friendly_name}: {e}")
 
         # Запустить в отдельном потоке
         launch_thread = threading.Thread(target=launch_in_thread, daemon=True)
         launch_thread.start()
 
 
+    def startup_writes(self):
+        """Записи (адрес, байты, подпись) правок, отмеченных для применения при запуске игры"""
+        writes = []
+        if self.startup_patches_var.get():
+            names = [name for name, var in self.address_editor.checkbox_vars.items() if var.get() == 1]
+            writes += startup_mod.patch_writes(names)
+        if self.startup_freeze_var.get():
+            writes += startup_mod.freeze_writes(value_freezer.frozen())
+        if self.startup_spawn_var.get():
+            writes += self.spawn_rate_editor.spawn_layout_writes() or []
+        return writes
+
+    def show_launch_report(self, friendly_name, report):
+        """Показать PID запущенной игры и задержку применения правок (вызывается в потоке Tk)"""
+        if not report.total:
+            text = f"{friendly_name} запущен (PID: {report.pid})"
+        elif report.mapped_seconds is None:
+            text = f"{friendly_name} запущен (PID: {report.pid}), правки не применены: образ недоступен"
+        else:
+            text = (f"{friendly_name} запущен (PID: {report.pid}), правки {report.written}/{report.total} "
+                    f"через {report.total_seconds * 1000:.0f} мс (запись {report.apply_seconds * 1000:.1f} мс)")
+        self.progress_label.config(text=text)
+
     def update_progress(self, progress):
         """Обновить прогрессбар (вызывается из потока)"""
-        self.root.after(0, self._update_progress_ui, progress)
+        io_executor.call_in_ui(self._update_progress_ui, progress)
 
     def _update_progress_ui(self, progress):
         """Обновить интерфейс прогрессбара"""
@@ -170,6 +310,7 @@ class MainMenu():
             # Hide progress bar after 2 seconds
             self.root.after(2000, lambda: self.progress_bar.pack_forget())
             self.progress_label.config(text="Готов к работе")
+            self.refresh_project_index()
 
     def create_backup(self):
         import datetime
@@ -197,6 +338,307 @@ class MainMenu():
         if hasattr(self, 'spawn_rate_editor'):
             self.spawn_rate_editor.on_global_mode_changed()
 
+    def on_process_event(self, event, pid):
+        """Слушатель службы обнаружения процесса (вызывается из фонового потока)"""
+        io_executor.call_in_ui(self.show_process_event, event, pid)
+
+    def show_process_event(self, event, pid):
+        """Сообщить редакторам о запуске или закрытии игры (вызывается в потоке Tk)"""
+        if event == PROCESS_ATTACHED:
+            self.progress_label.config(text=f"PlantsVsZombies.exe запущен (PID: {pid})")
+        else:
+            self.progress_label.config(text="PlantsVsZombies.exe закрыт")
+        self.address_editor.on_process_event(event, pid)
+        self.spawn_rate_editor.on_process_event(event, pid)
+        self.refresh_instances()
+
+    def refresh_instances(self):
+        """Перечитать список запущенных экземпляров игры (поиск идет в фоне)"""
+        io_executor.submit(process_fleet.instances, on_done=self.show_instances, lane=PROCESS_LANE)
+
+    def show_instances(self, pids):
+        """Показать экземпляры игры и отметить выбранные (вызывается в потоке Tk)"""
+        self.instance_pids = pids
+        selected = [pid for pid in process_fleet.selected if pid in pids]
+        self.draw_instances(selected)
+        if selected != process_fleet.selected:
+            # Закрытые экземпляры выпадают из выбора
+            io_executor.submit(process_fleet.select, selected, lane=PROCESS_LANE)
+
+    def draw_instances(self, selected):
+        self.instances_listbox.delete(0, END)
+        for index, pid in enumerate(self.instance_pids):
+            main = " (основной)" if selected and pid == selected[0] else ""
+            self.instances_listbox.insert(END, f"PID {pid}{main}")
+            if pid in selected:
+                self.instances_listbox.selection_set(index)
+
+    def on_instances_selected(self, event=None):
+        """Выбрать экземпляры для правок; первый отмеченный ранее остается основным"""
+        chosen = [self.instance_pids[index] for index in self.instances_listbox.curselection()]
+        # Порядок выбора: уже выбранные первыми, затем новые
+        pids = [pid for pid in process_fleet.selected if pid in chosen] + \
+               [pid for pid in chosen if pid not in process_fleet.selected]
+        io_executor.submit(process_fleet.select, pids, on_done=lambda _: self.show_selected_instances(pids),
+                           lane=PROCESS_LANE)
+
+    def show_selected_instances(self, pids):
+        """Подписать основной экземпляр и показать размер выбора (вызывается в потоке Tk)"""
+        self.draw_instances(pids)
+        if len(pids) > 1:
+            self.progress_label.config(text=f"Правки процесса идут в {len(pids)} экземпляров игры")
+        elif pids:
+            self.progress_label.config(text=f"Правки процесса идут в PID {pids[0]}")
+        else:
+            self.progress_label.config(text="Правки процесса идут в первый найденный экземпляр")
+
+    def attach_exe(self, exe_path):
+        """Сделать exe_path целевым EXE: секции PE, релокация адресов, проверка сигнатур"""
+        file_io_manager.set_exe_path(exe_path)
+        write_log.set_exe_path(exe_path)
+        if not os.path.isfile(exe_path):
+            self.exe_info_label.config(text="EXE файл не найден", fg="orange")
+            return
+        # Релокация читает весь EXE - в фоне. Воркер EXE один, так что чтения и записи,
+        # отправленные после, уже идут по таблице релокации этого EXE. Сканирование
+        # сигнатур ничего не меняет и идет в медленной очереди, не задерживая их
+        self.exe_info_label.config(text="Проверка EXE...", fg="gray")
+        io_executor.submit(self.load_relocation, exe_path, key="exe.relocation", on_done=self.show_relocation,
+                           on_error=lambda e: self.exe_info_label.config(text=f"Ошибка проверки EXE: {e}", fg="red"))
+        io_executor.submit(self.inspect_exe, exe_path, key="exe.inspect", on_done=self.show_exe_report,
+                           on_error=lambda e: self.exe_info_label.config(text=f"Ошибка проверки EXE: {e}", fg="red"),
+                           lane=SLOW_LANE)
+
+    def load_relocation(self, exe_path):
+        """Таблица релокации EXE (вызывается в фоне)"""
+        return exe_path, address_relocator.load_for_exe(exe_path)
+
+    def inspect_exe(self, exe_path):
+        """Отчет о сигнатурах EXE (вызывается в фоне)"""
+        return exe_path, signatures.scan_exe(exe_path)
+
+    def show_relocation(self, result):
+        """Предупредить, если сборка EXE не определена (вызывается в потоке Tk)"""
+        exe_path, table = result
+        if exe_path != self.exe_file_path:
+            return
+        if table is None:
+            messagebox.showwarning("Неизвестная сборка EXE",
+                                   f"{os.path.basename(exe_path)}: ни одна сигнатура не найдена, "
+                                   "адреса не могут быть определены. Правки этого EXE отключены.")
+        elif not table.identity:
+            print(f"Addresses relocated for this build, {len(table.missing)} signatures not found")
+
+    def show_exe_report(self, result):
+        """Показать результат проверки EXE на упаковщики/протекторы"""
+        exe_path, report = result
+        if exe_path != self.exe_file_path:
+            return
+        if report.supported:
+            compilers = ", ".join(dict.fromkeys(match.name for match in report.matches)) or "неизвестный компилятор"
+            self.exe_info_label.config(text=f"EXE: {compilers}", fg="green")
+        else:
+            self.exe_info_label.config(text=f"EXE не поддерживается: {report.reason}", fg="red")
+            messagebox.showwarning("Неподдерживаемый EXE",
+                                   f"{os.path.basename(exe_path)}: {report.reason}\n"
+                                   "Патчинг такого файла может повредить его.")
+
+    def update_edit_menu(self):
+        """Показать в меню, что будет отменено или повторено"""
+        undo_label = file_io_manager.journal.undo_label()
+        redo_label = file_io_manager.journal.redo_label()
+        self.edit_menu.entryconfig(0, label=f"Отменить: {undo_label}" if undo_label else "Отменить",
+                                   state=NORMAL if undo_label else DISABLED)
+        self.edit_menu.entryconfig(1, label=f"Повторить: {redo_label}" if redo_label else "Повторить",
+                                   state=NORMAL if redo_label else DISABLED)
+
+    def undo(self):
+        io_executor.submit(file_io_manager.undo, lane=SLOW_LANE,
+                           on_done=lambda result: self.on_journal_applied("Отменено", *result))
+
+    def redo(self):
+        io_executor.submit(file_io_manager.redo, lane=SLOW_LANE,
+                           on_done=lambda result: self.on_journal_applied("Повторено", *result))
+
+    def on_journal_applied(self, action, success, error):
+        """Обновить редакторы после отмены/повтора (вызывается в потоке Tk)"""
+        if not success:
+            self.progress_label.config(text=error)
+            return
+        self.progress_label.config(text=action)
+        if hasattr(self, 'address_editor'):
+            self.address_editor.refresh_current_value()
+            self.address_editor.refresh_checkboxes()
+        if hasattr(self, 'spawn_rate_editor'):
+            self.spawn_rate_editor.refresh_grid()
+            self.spawn_rate_editor.refresh_spawn_checkbox()
+
+    def on_profiling_toggled(self):
+        """Включить или выключить сбор статистики"""
+        if self.profiling_var.get():
+            instrumentation.enable()
+        else:
+            instrumentation.disable()
+
+    def export_trace(self):
+        """Сохранить трассировку в формате Chrome trace-event (chrome://tracing, Perfetto)"""
+        file_path = filedialog.asksaveasfilename(
+            title="Сохранить трассировку",
+            defaultextension=".json",
+            filetypes=[("Chrome trace", "*.json"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            count = instrumentation.export_chrome_trace(file_path)
+            self.progress_label.config(text=f"Трассировка сохранена: {count} событий")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить трассировку: {e}")
+
+    def show_profile_summary(self):
+        """Показать таблицу статистики по операциям"""
+        window = Toplevel(self.root)
+        window.title("Сводка профилирования")
+        text = Text(window, wrap=NONE, font=("Courier New", 9), width=120, height=30)
+        text.pack(fill=BOTH, expand=True)
+        text.insert(END, instrumentation.summary_table())
+        text.config(state=DISABLED)
+
+    def index_project(self, exe_path):
+        """Обновить индекс проекта (выполняется в своем потоке).
+
+        Первый обход хеширует весь проект - гигабайты, поэтому он не занимает воркер
+        io_executor, иначе чтения и записи ждали бы его. Значения EXE снимаются уже там,
+        по порядку с остальными чтениями.
+        """
+        try:
+            with self.index_lock:
+                update = project_index.update()
+        except Exception as e:
+            io_executor.call_in_ui(self.progress_label.config, {"text": f"Ошибка индексации: {e}"})
+            return
+        if update is None:
+            return
+        io_executor.call_in_ui(self.show_index_update, update)
+        if exe_path and os.path.isfile(exe_path):
+            io_executor.submit(self.save_exe_values, exe_path, key="project.values",
+                               on_error=lambda e: self.progress_label.config(text=f"Ошибка индексации: {e}"))
+
+    def save_exe_values(self, exe_path):
+        """Запомнить в индексе значения EXE (выполняется в фоне)"""
+        project_index.record_exe(exe_path)
+        project_index.save_values(address_table.snapshot(exe_path))
+
+    def refresh_project_index(self):
+        """Обновить индекс проекта в фоне: перехешируются только измененные файлы"""
+        threading.Thread(target=self.index_project, args=(self.exe_file_path,),
+                         name="ProjectIndex", daemon=True).start()
+
+    def show_index_update(self, update):
+        """Показать итог обновления индекса (вызывается в потоке Tk)"""
+        if update is None:
+            return
+        self.progress_label.config(
+            text=f"Индекс проекта: {update.files} файлов (новых {update.added}, измененных {update.changed}, "
+                 f"удаленных {update.removed}) за {update.seconds:.2f} с")
+
+    def show_text_window(self, title, report):
+        """Показать текстовый отчет в отдельном окне"""
+        window = Toplevel(self.root)
+        window.title(title)
+        text = Text(window, wrap=NONE, font=("Courier New", 9), width=100, height=30)
+        text.pack(fill=BOTH, expand=True)
+        text.insert(END, report)
+        text.config(state=DISABLED)
+
+    def search_project_files(self):
+        """Найти файлы проекта по части пути (* и ? - шаблоны) без обхода папок"""
+        pattern = simpledialog.askstring("Поиск файлов", "Часть пути или шаблон (например *.xml):", parent=self.root)
+        if not pattern:
+            return
+        found = project_index.search(pattern)
+        lines = [f"{size:>12}  {path}" for path, size, _ in found]
+        self.show_text_window(f"Поиск: {pattern}", "\n".join(lines) or "Ничего не найдено")
+
+    def show_changes_since_backup(self):
+        """Показать файлы проекта, отличающиеся от выбранного бэкапа (по хешам из индекса)"""
+        backups = [name for name, _, _ in project_index.backups()]
+        if not backups:
+            messagebox.showinfo("Изменения с бэкапа", "В индексе проекта нет бэкапов")
+            return
+        backup = simpledialog.askstring("Изменения с бэкапа", "Бэкап:\n" + "\n".join(backups),
+                                        parent=self.root, initialvalue=backups[-1])
+        if not backup:
+            return
+        if backup not in backups:
+            messagebox.showerror("Изменения с бэкапа", f"Бэкап {backup} не найден в индексе")
+            return
+        marks = {CHANGE_ADDED: "+", CHANGE_REMOVED: "-"}
+        lines = [f"{marks.get(change, '*')} {path}" for path, change in project_index.changed_since_backup(backup)]
+        self.show_text_window(f"Изменения с {backup}", "\n".join(lines) or "Нет изменений")
+
+    def show_stall_report(self):
+        """Показать зависания интерфейса, сгруппированные по обработчикам"""
+        window = Toplevel(self.root)
+        window.title("Зависания интерфейса")
+        text = Text(window, wrap=NONE, font=("Courier New", 9), width=120, height=30)
+        text.pack(fill=BOTH, expand=True)
+        if self.stall_monitor:
+            text.insert(END, self.stall_monitor.report())
+        else:
+            text.insert(END, "Монитор зависаний выключен (--stall-threshold 0)")
+        text.config(state=DISABLED)
+
+    def capture_memory(self):
+        """Снять копию записываемой памяти игры (в фоне)"""
+        # numpy загружается только для поиска адресов
+        import memory_diff
+        self.progress_label.config(text="Снимок памяти...")
+        io_executor.submit(memory_diff.capture, key="memory.capture", on_done=self.on_memory_captured, lane=SLOW_LANE,
+                           on_error=lambda e: self.progress_label.config(text=f"Ошибка снимка памяти: {e}"))
+
+    def on_memory_captured(self, capture):
+        """Сохранить снимок памяти (вызывается в потоке Tk)"""
+        if capture is None:
+            self.progress_label.config(text="PlantsVsZombies.exe не запущен")
+            return
+        self.memory_captures.append(capture)
+        self.progress_label.config(
+            text=f"Снимок памяти {len(self.memory_captures)}: {capture.size // (1024 * 1024)} МБ")
+
+    def compare_memory_captures(self, delta=None, width=1):
+        """Показать байты, изменившиеся между всеми последовательными снимками"""
+        if len(self.memory_captures) < 2:
+            messagebox.showinfo("Сравнение памяти", "Нужно минимум два снимка памяти")
+            return
+        import memory_diff
+        captures = list(self.memory_captures)
+        self.progress_label.config(text="Сравнение снимков...")
+        io_executor.submit(lambda: memory_diff.describe(memory_diff.diff(captures, delta=delta, width=width)),
+                           key="memory.compare", on_done=self.show_memory_diff, lane=SLOW_LANE,
+                           on_error=lambda e: self.progress_label.config(text=f"Ошибка сравнения: {e}"))
+
+    def compare_memory_captures_by_delta(self):
+        """Показать значения, менявшиеся между снимками ровно на заданную величину"""
+        delta = simpledialog.askinteger("Сравнение памяти", "Изменение значения между снимками (например 25 или -1):",
+                                        parent=self.root)
+        if delta is None:
+            return
+        width = simpledialog.askinteger("Сравнение памяти", "Размер значения в байтах (1, 2 или 4):",
+                                        parent=self.root, initialvalue=4, minvalue=1, maxvalue=4)
+        if width not in (1, 2, 4):
+            return
+        self.compare_memory_captures(delta, width)
+
+    def show_memory_diff(self, report):
+        """Показать результат сравнения снимков (вызывается в потоке Tk)"""
+        self.progress_label.config(text="Готов к работе")
+        self.show_text_window("Изменения памяти", report)
+
+    def clear_memory_captures(self):
+        self.memory_captures.clear()
+        self.progress_label.config(text="Снимки памяти удалены")
+
     def select_exe_file(self):
         """Выбрать exe файл для редактирования"""
         file_path = filedialog.askopenfilename(
@@ -205,6 +647,7 @@ class MainMenu():
         )
         if file_path:
             self.exe_file_path = file_path
+            self.attach_exe(file_path)
             # Update status in all editors
             if hasattr(self, 'address_editor'):
                 self.address_editor.exe_file_path = file_path
@@ -218,26 +661,11 @@ class AddressEditor:
     def __init__(self, parent_frame, main_menu):
         self.parent = parent_frame
         self.main_menu = main_menu
-        self.process_handle = None
-        self.current_process_id = None
         self.exe_file_path = main_menu.exe_file_path
         self.edit_mode = "exe"  # "process" или "exe"
 
         # Словарь категорий и их адресов
-        self.categories = {
-            "Sun Cost": addresses.sun_cost,
-            "Recharge": addresses.recharge,
-            "Action Rates": addresses.action_rates,
-            "Health & Armor": addresses.health_and_armor,
-            "Projectiles": addresses.projectiles,
-            "Damage": addresses.damage,
-            "First Zombie Arrival": addresses.first_zombie_arrival,
-            "Currency Prices": addresses.currency_prices,
-            "Prize Bags": addresses.prize_bags,
-            "Shop Prices": addresses.shop_prices,
-            "Minigame Flags": addresses.minigame_flags,
-            "Minigame Plants": addresses.minigame_plants,
-        }
+        self.categories = addresses.categories
 
         # Sizes for each category
         self.sizes = addresses.sizes
@@ -290,6 +718,12 @@ class AddressEditor:
         self.refresh_button = Button(button_frame, text="Refresh", command=lambda: self.refresh_current_value())
         self.refresh_button.pack(side=LEFT, padx=5)
 
+        self.freeze_button = Button(button_frame, text="Freeze", command=self.freeze_value)
+        self.freeze_button.pack(side=LEFT, padx=5)
+
+        self.unfreeze_button = Button(button_frame, text="Unfreeze", command=self.unfreeze_value)
+        self.unfreeze_button.pack(side=LEFT, padx=5)
+
         # Frame для предустановок spawn rate
         preset_frame = Frame(self.parent)
         preset_frame.pack(pady=10, padx=10, fill=X)
@@ -318,15 +752,18 @@ class AddressEditor:
         for address_name, address_info in addresses.multi_byte_replacements.items():
             if isinstance(address_info, dict):
                 # Multi-byte replacement - словарь с информацией
-                var = BooleanVar()
+                # 1 - патч применен, 0 - оригинал, -1 - байты не совпадают ни с одним вариантом
+                var = IntVar()
                 self.checkbox_vars[address_name] = var
 
                 # Создать фрейм для каждого multi-byte replacement
                 replacement_frame = Frame(self.checkbox_frame)
                 replacement_frame.pack(fill=X, pady=2)
 
-                cb = Checkbutton(replacement_frame, text=address_name, variable=var, command=lambda name=address_name: self.toggle_multi_byte(name))
+                cb = Checkbutton(replacement_frame, text=address_name, variable=var, tristatevalue=-1,
+                                 command=lambda name=address_name: self.toggle_multi_byte(name))
                 cb.pack(side=LEFT)
+                self.checkbox_widgets[address_name] = cb
 
         # Set initial states
         self.refresh_checkboxes()
@@ -341,6 +778,7 @@ class AddressEditor:
             self.address_combo['values'] = addresses_list
             self.address_combo.set('')  # Сбросить выбор
             self.current_value_label.config(text="Не выбрано")
+            io_executor.cancel("address.value")
 
     def on_global_mode_changed(self):
         """Обработчик изменения глобального режима редактирования"""
@@ -357,27 +795,69 @@ class AddressEditor:
         # Refresh checkboxes when mode changes
         self.refresh_checkboxes()
 
+    @instrumentation.timed("address.refresh_checkboxes", "ui")
     def refresh_checkboxes(self):
-        """Обновить состояния чекбоксов на основе текущих байтов в exe файле"""
-        for address_name, address_info in addresses.multi_byte_replacements.items():
-            if isinstance(address_info, dict):
-                address = address_info["addresses"]
-                original_bytes = address_info["original_bytes"]
-                size = len(original_bytes)
+        """Обновить состояния чекбоксов по текущим байтам (все патчи за один проход)"""
+        if hasattr(self, 'main_menu') and hasattr(self.main_menu, 'global_edit_mode_var'):
+            global_mode = self.main_menu.global_edit_mode_var.get()
+        else:
+            global_mode = "process"  # Default fallback
+
+        if global_mode == "process":
+            target = PROCESS_TARGET
+        else:
+            if not self.exe_file_path:
+                return
+            target = self.exe_file_path
+
+        def check_patches():
+            if target == PROCESS_TARGET and not file_io_manager.find_pvz_process():
+                return None
+            return patch_catalog.check(target)
+
+        io_executor.submit(check_patches, on_done=self.show_patch_states, key="address.patches",
+                           lane=target_lane(target))
 
-                current_bytes = file_io_manager.read_file_data(self.exe_file_path, address, size)
+    def show_patch_states(self, states):
+        """Показать состояния патчей (вызывается в потоке Tk)"""
+        if states is None:
+            return
+        for address_name, state in states.items():
+            if address_name not in self.checkbox_vars or state is None:
+                continue
+            if state == PATCH_FOREIGN:
+                self.checkbox_vars[address_name].set(-1)
+                self.checkbox_widgets[address_name].config(fg="red")
+            else:
+                self.checkbox_vars[address_name].set(1 if state == PATCH_APPLIED else 0)
+                self.checkbox_widgets[address_name].config(fg="black")
+
+    def current_target(self):
+        """Цель записи для текущего режима: путь к EXE или процесс (None, если недоступна)"""
+        if hasattr(self, 'main_menu') and hasattr(self.main_menu, 'global_edit_mode_var'):
+            global_mode = self.main_menu.global_edit_mode_var.get()
+        else:
+            global_mode = "process"  # Default fallback
 
-                if current_bytes and len(current_bytes) == size:
-                    # Check if all bytes match original
-                    is_modified = any(current_bytes[i] != original_bytes[i] for i in range(size))
-                    if address_name in self.checkbox_vars:
-                        self.checkbox_vars[address_name].set(1 if is_modified else 0)
+        if global_mode == "process":
+            return PROCESS_TARGET if self.ensure_process_connected() else None
+        if not self.exe_file_path:
+            self.status_label.config(text="Выберите EXE файл для редактирования", fg="orange")
+            return None
+        return self.exe_file_path
 
+    def resolve_address(self, address):
+        """Перевести адрес из addresses.py в смещение для текущей сборки EXE"""
+        resolved = address_relocator.translate(address)
+        if resolved is None:
+            self.status_label.config(text=f"Адрес {hex(address)} не найден в этой версии EXE", fg="red")
+        return resolved
 
     def on_address_changed(self, event):
         """Обработчик изменения адреса"""
         self.refresh_current_value()
 
+    @instrumentation.timed("address.refresh_value", "ui")
     def refresh_current_value(self):
         """Обновить текущее значение из памяти или exe файла"""
         # Get global mode from parent MainMenu
@@ -410,12 +890,26 @@ class AddressEditor:
             else:
                 address = int(address, 16)
 
-        size = self.sizes.get(category, 4)
-        if global_mode == "process":
-            value = file_io_manager.read_memory_data(address, size)
-        else:
-            value = file_io_manager.read_file_data(self.exe_file_path, address, size)
+        address = self.resolve_address(address)
+        if address is None:
+            return
 
+        size = self.sizes.get(category, 4)
+        target = PROCESS_TARGET if global_mode == "process" else self.exe_file_path
+        selection = (category, address_name)
+        if global_mode == "exe":
+            # Последнее известное значение из индекса проекта, пока идет чтение
+            cached = project_index.value(category, address_name)
+            if cached is not None:
+                self.current_value_label.config(text=f"{cached} (0x{cached:08X}) (из индекса)")
+        # Новый выбор отменяет чтение для предыдущего адреса
+        io_executor.submit(file_io_manager.read_data, target, address, size, key="address.value",
+                           on_done=lambda value: self.show_current_value(selection, value), lane=target_lane(target))
+
+    def show_current_value(self, selection, value):
+        """Показать прочитанное значение, если адрес все еще выбран (вызывается в потоке Tk)"""
+        if selection != (self.category_combo.get(), self.address_combo.get()):
+            return
         if value is not None:
             # Handle bytes objects by converting to integer
             if isinstance(value, bytes):
@@ -428,6 +922,7 @@ class AddressEditor:
             self.current_value_label.config(text="Ошибка чтения")
             self.status_label.config(text="Ошибка чтения из памяти/файла", fg="red")
 
+    @instrumentation.timed("address.apply_value", "ui")
     def apply_value(self):
         """Применить новое значение"""
         # Get global mode from parent MainMenu
@@ -470,59 +965,126 @@ class AddressEditor:
                 else:
                     address = int(address, 16)
 
+            address = self.resolve_address(address)
+            if address is None:
+                return
+
             size = self.sizes.get(category, 4)
-            if global_mode == "process":
-                if file_io_manager.write_memory_data(address, new_value, size=size):
-                    self.status_label.config(text=f"Значение {new_value} записано успешно", fg="green")
-                    self.refresh_current_value()  # Обновить отображение
-                else:
-                    self.status_label.config(text="Ошибка записи в память", fg="red")
-            else:
-                if file_io_manager.write_file_data(self.exe_file_path, address, new_value, size=size):
-                    self.status_label.config(text=f"Значение {new_value} записано в файл успешно", fg="green")
-                    self.refresh_current_value()  # Обновить отображение
-                else:
-                    self.status_label.config(text="Ошибка записи в файл", fg="red")
+            target = PROCESS_TARGET if global_mode == "process" else self.exe_file_path
+            self.status_label.config(text=f"Запись {new_value}...", fg="blue")
+            if target == PROCESS_TARGET and process_fleet.active:
+                label = f"{address_name} = {new_value}"
+                io_executor.submit(process_fleet.write, address, new_value, size, label,
+                                   on_done=lambda results: self.show_fleet_result(label, results),
+                                   on_error=lambda e: self.status_label.config(text=f"Произошла ошибка: {e}", fg="red"),
+                                   lane=PROCESS_LANE)
+                return
+            io_executor.submit(self.write_labeled, f"{address_name} = {new_value}", target, address, new_value, size,
+                               on_done=lambda success: self.show_write_result(global_mode, new_value, success),
+                               on_error=lambda e: self.status_label.config(text=f"Произошла ошибка: {e}", fg="red"),
+                               lane=target_lane(target))
 
         except ValueError:
             messagebox.showerror("Ошибка", "Неверный формат значения. Используйте число или hex (0x...)")
         except Exception as e:
             messagebox.showerror("Ошибка", f"Произошла ошибка: {e}")
 
-    def ensure_process_connected(self):
-        """Убедиться, что подключены к процессу PVZ"""
+    def write_labeled(self, label, target, address, data, size):
+        """Записать значение одним шагом отмены с подписью label (выполняется в фоновом потоке)"""
+        with file_io_manager.transaction(label):
+            return file_io_manager.write_data(target, address, data, size)
+
+    def show_write_result(self, global_mode, new_value, success):
+        """Показать результат записи значения (вызывается в потоке Tk)"""
+        if global_mode == "process":
+            if success:
+                self.status_label.config(text=f"Значение {new_value} записано успешно", fg="green")
+                self.refresh_current_value()  # Обновить отображение
+            else:
+                self.status_label.config(text="Ошибка записи в память", fg="red")
+        else:
+            if success:
+                self.status_label.config(text=f"Значение {new_value} записано в файл успешно", fg="green")
+                self.refresh_current_value()  # Обновить отображение
+            else:
+                self.status_label.config(text="Ошибка записи в файл", fg="red")
+
+    def show_fleet_result(self, action, results):
+        """Показать результат правки в нескольких экземплярах игры (вызывается в потоке Tk)"""
+        failed = failed_pids(results)
+        if failed:
+            pids = ", ".join(str(pid) for pid in failed)
+            self.status_label.config(text=f"{action}: записано в {len(results) - len(failed)} из {len(results)} "
+                                          f"экземпляров, ошибка в PID {pids}", fg="red")
+        else:
+            self.status_label.config(text=f"{action}: записано во все экземпляры ({len(results)})", fg="green")
+        # Значения и патчи показываются по основному экземпляру
+        self.refresh_current_value()
+        self.refresh_checkboxes()
+
+    def selected_address(self):
+        """(имя, адрес в текущей версии, размер) выбранного адреса или None"""
+        category = self.category_combo.get()
+        address_name = self.address_combo.get()
+        if not category or not address_name:
+            messagebox.showerror("Ошибка", "Выберите категорию и адрес")
+            return None
+        address = address_table.parse_address(self.categories[category][address_name])[0]
+        address = self.resolve_address(address)
+        if address is None:
+            return None
+        return address_name, address, self.sizes.get(category, 4)
+
+    def freeze_value(self):
+        """Закрепить значение из поля ввода: фоновый поток возвращает его, если игра его изменит"""
+        if self.main_menu.global_edit_mode_var.get() != "process":
+            self.status_label.config(text="Заморозка работает только в режиме процесса", fg="orange")
+            return
+        if not self.ensure_process_connected():
+            return
+        selected = self.selected_address()
+        if selected is None:
+            return
+        address_name, address, size = selected
+        value_text = self.value_entry.get().strip()
         try:
-            import ctypes
-            import psutil
-
-            # Проверить, запущен ли процесс
-            process_id = file_io_manager.find_pvz_process()
-            if not process_id:
-                self.status_label.config(text="PlantsVsZombies.exe не запущен", fg="red")
-                messagebox.showerror("Ошибка", "Запустите PlantsVsZombies.exe перед изменением значений")
-                return False
-
-            # Если процесс изменился или не подключены
-            if self.current_process_id != process_id or not self.process_handle:
-                # Закрыть старый handle
-                if self.process_handle:
-                    try:
-                        ctypes.windll.kernel32.CloseHandle(self.process_handle)
-                    except:
-                        pass
-
-                # Открыть новый handle
-                self.process_handle = ctypes.windll.kernel32.OpenProcess(0x1F0FFF, False, process_id)  # PROCESS_ALL_ACCESS
-                self.current_process_id = process_id
-
-                if not self.process_handle:
-                    self.status_label.config(text="Не удалось подключиться к процессу", fg="red")
-                    return False
+            value = int(value_text, 16) if value_text.lower().startswith('0x') else int(value_text)
+            value_freezer.freeze(address, value, size, address_name)
+        except (ValueError, OverflowError):
+            messagebox.showerror("Ошибка", "Неверный формат значения. Используйте число или hex (0x...)")
+            return
+        self.status_label.config(text=f"{address_name} заморожено на {value} (всего: {len(value_freezer.frozen())})", fg="green")
 
+    def unfreeze_value(self):
+        """Снять заморозку с выбранного адреса"""
+        selected = self.selected_address()
+        if selected is None:
+            return
+        address_name, address, _ = selected
+        if not value_freezer.is_frozen(address):
+            self.status_label.config(text=f"{address_name} не заморожено", fg="orange")
+            return
+        value_freezer.unfreeze(address)
+        self.status_label.config(text=f"{address_name} разморожено (осталось: {len(value_freezer.frozen())})", fg="green")
+
+    @instrumentation.timed("address.ensure_process", "ui")
+    def ensure_process_connected(self):
+        """Убедиться, что игра запущена (PID хранит служба обнаружения процесса, проверка дешевая)"""
+        if file_io_manager.find_pvz_process():
             return True
-        except Exception as e:
-            self.status_label.config(text=f"Ошибка подключения: {e}", fg="red")
-            return False
+        self.status_label.config(text="PlantsVsZombies.exe не запущен", fg="red")
+        messagebox.showerror("Ошибка", "Запустите PlantsVsZombies.exe перед изменением значений")
+        return False
+
+    def on_process_event(self, event, pid):
+        """Игра запущена или закрыта (вызывается в потоке Tk)"""
+        if self.main_menu.global_edit_mode_var.get() != "process":
+            return
+        if event == PROCESS_ATTACHED:
+            self.status_label.config(text=f"Подключено к PlantsVsZombies.exe (PID: {pid})", fg="green")
+            self.refresh_checkboxes()
+        else:
+            self.status_label.config(text="PlantsVsZombies.exe закрыт", fg="red")
 
     def on_preset_changed(self, event):
         """Обработчик изменения предустановки spawn rate"""
@@ -535,6 +1097,7 @@ class AddressEditor:
                 info_text += f"{addr}: {value}\n"
             self.status_label.config(text=info_text, fg="blue")
 
+    @instrumentation.timed("address.apply_preset", "ui")
     def apply_preset(self):
         """Применить выбранную предустановку spawn rate"""
         # Get global mode from parent MainMenu
@@ -556,38 +1119,35 @@ class AddressEditor:
             messagebox.showerror("Ошибка", "Выберите предустановку")
             return
 
-        preset_values = addresses.spawn_rate_values[preset_name]
-        success_count = 0
-        total_count = len(preset_values)
-
-        # Применить все значения из предустановки
-        for address_str, value in preset_values.items():
-            # Преобразовать строковый адрес в числовой
-            address = int(address_str, 16)
-
-            try:
-                if global_mode == "process":
-                    if file_io_manager.write_memory_data(self.process_handle, address, value, size=1):  # Spawn rate использует байты
-                        success_count += 1
-                    else:
-                        self.status_label.config(text=f"Ошибка записи в память для {address_str}", fg="red")
-                        return
-                else:
-                    if file_io_manager.write_file_data(self.exe_file_path, address, value, size=1):  # Spawn rate использует байты
-                        success_count += 1
-                    else:
-                        self.status_label.config(text=f"Ошибка записи в файл для {address_str}", fg="red")
-                        return
-            except Exception as e:
-                self.status_label.config(text=f"Ошибка применения предустановки: {e}", fg="red")
-                return
-
-        if success_count == total_count:
+        target = PROCESS_TARGET if global_mode == "process" else self.exe_file_path
+        self.status_label.config(text=f"Применение '{preset_name}'...", fg="blue")
+        if target == PROCESS_TARGET and process_fleet.active:
+            # Успех в экземпляре - все значения предустановки записаны
+            io_executor.submit(
+                process_fleet.run,
+                lambda manager: address_table.apply_preset(PROCESS_TARGET, preset_name, manager)[2] is None,
+                on_done=lambda results: self.show_fleet_result(f"Предустановка '{preset_name}'", results),
+                on_error=lambda e: self.status_label.config(text=f"Ошибка применения предустановки: {e}", fg="red"),
+                lane=PROCESS_LANE)
+            return
+        io_executor.submit(
+            address_table.apply_preset, target, preset_name,
+            on_done=lambda result: self.show_preset_result(global_mode, preset_name, *result),
+            on_error=lambda e: self.status_label.config(text=f"Ошибка применения предустановки: {e}", fg="red"),
+            lane=target_lane(target))
+
+    def show_preset_result(self, global_mode, preset_name, written, total_count, failed_address):
+        """Показать результат применения предустановки (вызывается в потоке Tk)"""
+        if failed_address is not None:
+            where = "память" if global_mode == "process" else "файл"
+            self.status_label.config(text=f"Ошибка записи в {where} для {failed_address}", fg="red")
+        elif written == total_count:
             self.status_label.config(text=f"Предустановка '{preset_name}' применена успешно!", fg="green")
             self.refresh_current_value()  # Обновить отображение текущих значений
         else:
             self.status_label.config(text="Ошибка применения предустановки", fg="red")
 
+    @instrumentation.timed("address.toggle_patch", "ui")
     def toggle_multi_byte(self, address_name):
         """Переключить multi-byte replacement"""
         address_info = addresses.multi_byte_replacements.get(address_name)
@@ -595,26 +1155,59 @@ class AddressEditor:
         if not address_info:
             return
 
-        address = address_info["addresses"]
+        address = self.resolve_address(address_info["addresses"])
+        target = self.current_target() if address is not None else None
+        if target is None:
+            # Revert checkbox state
+            self.refresh_checkboxes()
+            return
         original_bytes = address_info["original_bytes"]
         replacement_bytes = address_info["replacement_bytes"]
         size = len(original_bytes)
 
-        is_checked = self.checkbox_vars[address_name].get()
+        is_checked = self.checkbox_vars[address_name].get() == 1
 
-        if not self.exe_file_path:
-            self.status_label.config(text="Выберите EXE файл для редактирования", fg="orange")
+        label = f"{address_name} {'вкл' if is_checked else 'выкл'}"
+        if target == PROCESS_TARGET and process_fleet.active:
+            io_executor.submit(process_fleet.write, address, replacement_bytes if is_checked else original_bytes,
+                               size, label, on_done=lambda results: self.show_fleet_result(label, results),
+                               lane=PROCESS_LANE)
             return
+        io_executor.submit(self.write_labeled, label, target, address,
+                           replacement_bytes if is_checked else original_bytes, size,
+                           on_done=lambda success: self.show_toggle_result(address_name, is_checked, success),
+                           lane=target_lane(target))
 
-        success = file_io_manager.write_file_data(self.exe_file_path, address, replacement_bytes if is_checked else original_bytes, size=size)
-
+    def show_toggle_result(self, address_name, is_checked, success):
+        """Показать результат переключения патча (вызывается в потоке Tk)"""
         if success:
             self.status_label.config(text=f"{address_name} {'включено' if is_checked else 'отключено'}", fg="green")
         else:
             self.status_label.config(text=f"Ошибка применения {address_name}", fg="red")
-            # Revert checkbox state
-            self.checkbox_vars[address_name].set(not is_checked)
+        # Revert checkbox state on failure, clear the foreign marker on success
+        self.refresh_checkboxes()
 
-project_mn = ProjectManager()
-start_menu = StartMenu(project_mn)
-start_menu.root.mainloop()
+def export_trace_at_exit(trace_path):
+    """Записать трассировку и вывести сводку при выходе (флаг --trace)"""
+    count = instrumentation.export_chrome_trace(trace_path)
+    print(instrumentation.summary_table())
+    print(f"Trace with {count} events written to {trace_path}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="PvZ Modding Tool")
+    parser.add_argument("--trace", metavar="FILE", help="Профилировать и сохранить Chrome trace в FILE при выходе")
+    parser.add_argument("--stall-threshold", type=float, metavar="MS", default=DEFAULT_THRESHOLD * 1000,
+                        help="Сообщать о зависаниях интерфейса дольше MS миллисекунд (0 - выключить)")
+    parser.add_argument("--rpc", action="store_true",
+                        help="Открыть сессию для скриптов через локальный канал (см. rpc_daemon.py)")
+    args = parser.parse_args()
+    stall_threshold = args.stall_threshold / 1000
+    rpc_enabled = args.rpc
+    if args.trace:
+        instrumentation.enable()
+        atexit.register(export_trace_at_exit, args.trace)
+
+    project_mn = ProjectManager()
+    start_menu = StartMenu(project_mn)
+    start_menu.root.mainloop()
@@ -0,0 +1,191 @@
+"""
+Memory differ for PvZModTool
+Captures the game's writable memory and finds the bytes that changed between captures,
+to locate values worth adding to addresses.py
+"""
+import bisect
+import itertools
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from file_io_utils import file_io_manager
+from instrumentation import instrumentation
+
+
+READ_CHUNK = 16 * 1024 * 1024  # Bytes per ReadProcessMemory while capturing
+COMPARE_BLOCK = 16 * 1024 * 1024  # Bytes compared at once, bounds the temporary arrays
+
+DIFF_ANY = "any"  # Changed between at least one pair of consecutive captures
+DIFF_EVERY = "every"  # Changed between every pair of consecutive captures
+
+_generations = itertools.count(1)
+
+
+class MemoryCapture:
+    """Copy of the game's writable regions at one moment, as (virtual address, uint8 array) pairs"""
+
+    def __init__(self, regions: List[Tuple[int, np.ndarray]]):
+        self.regions = sorted(regions, key=lambda region: region[0])
+        self.starts = [address for address, _ in self.regions]
+        self.generation = next(_generations)
+        self.timestamp = time.time()
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for _, data in self.regions)
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        return [(address, address + len(data)) for address, data in self.regions]
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        """Bytes of [start, end), which must lie inside one captured region"""
+        address, data = self.regions[bisect.bisect_right(self.starts, start) - 1]
+        return data[start - address:end - address]
+
+
+@instrumentation.timed("memdiff.capture", "process")
+def capture(manager=file_io_manager, regions: Optional[List[Tuple[int, int]]] = None) -> Optional[MemoryCapture]:
+    """Read every writable region of the game (or the given (address, size) regions); None if not running.
+
+    Parts that fail to read (freed between the region query and the read) are left out.
+    """
+    regions = manager.writable_regions() if regions is None else regions
+    if regions is None:
+        return None
+    captured = []
+    for address, size in regions:
+        buffer = np.empty(size, dtype=np.uint8)
+        run_start = None  # Offset where the current run of readable chunks began
+        for offset in range(0, size, READ_CHUNK):
+            length = min(READ_CHUNK, size - offset)
+            data = manager.read_memory_va(address + offset, length)
+            if data is None:
+                if run_start is not None:
+                    captured.append((address + run_start, buffer[run_start:offset]))
+                run_start = None
+                continue
+            buffer[offset:offset + length] = np.frombuffer(data, dtype=np.uint8)
+            if run_start is None:
+                run_start = offset
+        if run_start is not None:
+            captured.append((address + run_start, buffer[run_start:]))
+    return MemoryCapture(captured)
+
+
+class ChangedRanges:
+    """Run-length list of changed bytes: parallel arrays of virtual addresses and lengths"""
+
+    def __init__(self, starts: np.ndarray, lengths: np.ndarray):
+        self.starts = starts
+        self.lengths = lengths
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts.tolist(), self.lengths.tolist())
+
+    @property
+    def total_bytes(self) -> int:
+        return int(self.lengths.sum())
+
+
+def _common_intervals(captures: List[MemoryCapture]) -> List[Tuple[int, int]]:
+    """Address intervals present in every capture"""
+    common = captures[0].intervals()
+    for other in captures[1:]:
+        intervals = other.intervals()
+        merged = []
+        i = j = 0
+        while i < len(common) and j < len(intervals):
+            start = max(common[i][0], intervals[j][0])
+            end = min(common[i][1], intervals[j][1])
+            if start < end:
+                merged.append((start, end))
+            if common[i][1] < intervals[j][1]:
+                i += 1
+            else:
+                j += 1
+        common = merged
+    return common
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end indices of the runs of True in mask"""
+    if not mask.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    edges = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    if mask[0]:
+        edges = np.concatenate(([0], edges))
+    if mask[-1]:
+        edges = np.concatenate((edges, [len(mask)]))
+    return edges[0::2], edges[1::2]
+
+
+def diff(captures: List[MemoryCapture], mode: str = DIFF_EVERY, delta: Optional[int] = None,
+         width: int = 1) -> ChangedRanges:
+    """Ranges whose bytes changed across the captures, compared in order.
+
+    mode DIFF_EVERY keeps bytes that changed between every pair of consecutive captures,
+    DIFF_ANY bytes that changed at least once. With delta, values of width bytes (at
+    width-aligned addresses) must instead change by exactly delta each time, wrapping
+    like the game's unsigned arithmetic.
+    """
+    if len(captures) < 2:
+        raise ValueError("At least two captures are needed")
+    dtype = np.dtype(f'<u{width}')
+    if delta is not None:
+        expected = np.array(delta % (1 << (8 * width)), dtype=dtype)
+
+    starts, ends = [], []
+    block = COMPARE_BLOCK - COMPARE_BLOCK % width
+    for interval_start, interval_end in _common_intervals(captures):
+        if delta is not None:
+            # Whole aligned values only
+            interval_start += -interval_start % width
+            interval_end -= interval_end % width
+        for block_start in range(interval_start, interval_end, block):
+            block_end = min(block_start + block, interval_end)
+            views = [capture.view(block_start, block_end) for capture in captures]
+            if delta is not None:
+                views = [view.view(dtype) for view in views]
+            mask = None
+            for before, after in zip(views, views[1:]):
+                step = (after - before) == expected if delta is not None else after != before
+                if mask is None:
+                    mask = step
+                elif mode == DIFF_ANY:
+                    mask |= step
+                else:
+                    mask &= step
+            run_starts, run_ends = _runs(mask)
+            scale = width if delta is not None else 1
+            starts.append(run_starts * scale + block_start)
+            ends.append(run_ends * scale + block_start)
+
+    starts = np.concatenate(starts).astype(np.int64) if starts else np.empty(0, dtype=np.int64)
+    ends = np.concatenate(ends).astype(np.int64) if ends else np.empty(0, dtype=np.int64)
+    if not len(starts):
+        return ChangedRanges(starts, ends)
+    # Join runs split by a block boundary
+    separate = starts[1:] != ends[:-1]
+    starts = starts[np.concatenate(([True], separate))]
+    ends = ends[np.concatenate((separate, [True]))]
+    return ChangedRanges(starts, ends - starts)
+
+
+def describe(ranges: ChangedRanges, limit: int = 500, manager=file_io_manager) -> str:
+    """Text listing of the ranges with their file offsets and addresses.py names where known"""
+    from address_table import label_for
+    section_map = manager.section_map()
+    lines = [f"{len(ranges)} ranges, {ranges.total_bytes} bytes"]
+    for address, length in itertools.islice(ranges, limit):
+        offset = section_map.va_to_file_offset(address) if section_map else None
+        location = f"  offset {hex(offset)}" if offset is not None else ""
+        label = label_for(offset, length) if offset is not None else None
+        lines.append(f"{hex(address)} +{length}{location}{f'  ({label})' if label else ''}")
+    if len(ranges) > limit:
+        lines.append(f"... {len(ranges) - limit} more")
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""
+Byte patch catalog for PvZModTool
+Classifies every multi-byte patch as original, applied or foreign using coalesced reads
+"""
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import addresses
+from address_table import coalesce_ranges
+from file_io_utils import file_io_manager, PROCESS_TARGET
+from fingerprint import fingerprint_service
+from relocation import address_relocator
+
+
+PATCH_ORIGINAL = "original"
+PATCH_APPLIED = "applied"
+PATCH_FOREIGN = "foreign"  # Matches neither the original nor the replacement bytes
+
+
+class PatchSpec(NamedTuple):
+    name: str
+    address: int
+    original_bytes: bytes
+    replacement_bytes: bytes
+
+
+def classify(patch: PatchSpec, current: bytes) -> str:
+    """State of patch given the bytes currently at its address"""
+    if current == patch.original_bytes:
+        return PATCH_ORIGINAL
+    if current == patch.replacement_bytes:
+        return PATCH_APPLIED
+    return PATCH_FOREIGN
+
+
+class PatchCatalog:
+    """Checks all byte patches of a target in one coalesced read per span.
+
+    EXE span contents are kept between checks and only re-read after a write touches
+    them or the file changes outside the tool. Spans of the game are read on every
+    check, uncached: other tools (PvZ_Tools, trainers) patch its memory too.
+    """
+
+    def __init__(self, replacements: Optional[Dict] = None):
+        replacements = replacements if replacements is not None else addresses.multi_byte_replacements
+        self.patches = [
+            PatchSpec(name, info["addresses"], info["original_bytes"], info["replacement_bytes"])
+            for name, info in replacements.items() if isinstance(info, dict)
+        ]
+        self._spans: Dict[Tuple[str, int, int], bytes] = {}
+        self._versions: Dict[str, Optional[str]] = {}
+        self.last_states: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()  # Guards _spans and _versions, writes notify from any thread
+        self._generation = 0  # Bumped by every write, spans read across a write are not kept
+        file_io_manager.add_write_listener(self.on_write)
+
+    def on_write(self, target: str, address: int, size: int):
+        """Write listener: forget the spans a write touched"""
+        if target == PROCESS_TARGET:
+            return
+        end = address + size
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._spans if key[0] == target and key[1] < end and address < key[2]]:
+                del self._spans[key]
+            tracked = target in self._versions
+        if tracked:
+            version = fingerprint_service.fingerprint(target)
+            with self._lock:
+                self._versions[target] = version
+
+    def _check_version(self, target: str):
+        """Drop all spans of a file that was changed outside the tool"""
+        version = fingerprint_service.fingerprint(target)
+        with self._lock:
+            if self._versions.get(target) != version:
+                for key in [key for key in self._spans if key[0] == target]:
+                    del self._spans[key]
+                self._versions[target] = version
+
+    def _read_span(self, target: str, start: int, end: int) -> Optional[bytes]:
+        if target == PROCESS_TARGET:
+            # Past the read cache too, it only sees our own writes
+            return file_io_manager.read_memory_raw(start, end - start, rescan=True)
+        key = (target, start, end)
+        with self._lock:
+            data = self._spans.get(key)
+            generation = self._generation
+        if data is None:
+            data = file_io_manager.read_data(target, start, end - start)
+            if data is not None:
+                with self._lock:
+                    if generation == self._generation:
+                        self._spans[key] = data
+        return data
+
+    def check(self, target: str) -> Dict[str, Optional[str]]:
+        """Return {patch name: state} for target, None where the bytes could not be read"""
+        if target != PROCESS_TARGET:
+            self._check_version(target)
+
+        located = []
+        for patch in self.patches:
+            address = address_relocator.translate(patch.address)
+            located.append((patch, address))
+
+        spans = coalesce_ranges([(address, len(patch.original_bytes))
+                                 for patch, address in located if address is not None])
+        span_data = [(start, end, self._read_span(target, start, end)) for start, end in spans]
+
+        states = {}
+        for patch, address in located:
+            states[patch.name] = None
+            if address is None:
+                continue
+            size = len(patch.original_bytes)
+            for start, end, data in span_data:
+                if start <= address and address + size <= end:
+                    if data is not None:
+                        states[patch.name] = classify(patch, data[address - start:address - start + size])
+                    break
+
+        self.last_states = states
+        return states
+
+
+# Global instance
+patch_catalog = PatchCatalog()
@@ -0,0 +1,195 @@
+"""
+PE section map for PvZModTool
+Translates between file offsets, RVAs and virtual addresses using the EXE's section table
+"""
+import bisect
+import hashlib
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+# Image base used when no EXE is available to read the real one from
+DEFAULT_IMAGE_BASE = 0x400000
+
+# Enough to cover the DOS header, PE header and any sane section table
+HEADER_READ_SIZE = 0x1000
+
+
+class Section(NamedTuple):
+    name: str
+    virtual_address: int
+    virtual_size: int
+    raw_offset: int
+    raw_size: int
+
+    @property
+    def mapped_size(self) -> int:
+        """Number of file bytes that the loader actually maps into memory"""
+        if self.virtual_size == 0:
+            return self.raw_size
+        return min(self.raw_size, self.virtual_size)
+
+
+class SectionMap:
+    """Sorted section table with O(log n) address translation"""
+
+    def __init__(self, image_base: int, size_of_headers: int, entry_point: int, sections: List[Section],
+                 machine: int = 0x14C):
+        self.machine = machine
+        self.image_base = image_base
+        self.size_of_headers = size_of_headers
+        self.entry_point = entry_point
+        # Headers are mapped 1:1 at the start of the image
+        header = Section("<headers>", 0, size_of_headers, 0, size_of_headers)
+        mapped = [header] + [s for s in sections if s.mapped_size > 0]
+
+        self.sections = sections
+        self._by_offset = sorted(mapped, key=lambda s: s.raw_offset)
+        self._offset_keys = [s.raw_offset for s in self._by_offset]
+        self._offset_ends = [s.raw_offset + s.mapped_size for s in self._by_offset]
+        self._by_rva = sorted(mapped, key=lambda s: s.virtual_address)
+        self._rva_keys = [s.virtual_address for s in self._by_rva]
+
+    def _section_for_offset(self, offset: int) -> Optional[Section]:
+        index = bisect.bisect_right(self._offset_keys, offset) - 1
+        if index < 0:
+            return None
+        if offset < self._offset_ends[index]:
+            return self._by_offset[index]
+        return None
+
+    def _section_for_rva(self, rva: int) -> Optional[Section]:
+        index = bisect.bisect_right(self._rva_keys, rva) - 1
+        if index < 0:
+            return None
+        section = self._by_rva[index]
+        if rva < section.virtual_address + section.mapped_size:
+            return section
+        return None
+
+    def file_offset_to_rva(self, offset: int) -> Optional[int]:
+        section = self._section_for_offset(offset)
+        if section is None:
+            return None
+        return offset - section.raw_offset + section.virtual_address
+
+    def rva_to_file_offset(self, rva: int) -> Optional[int]:
+        section = self._section_for_rva(rva)
+        if section is None:
+            return None
+        return rva - section.virtual_address + section.raw_offset
+
+    def file_offset_to_va(self, offset: int) -> Optional[int]:
+        rva = self.file_offset_to_rva(offset)
+        return None if rva is None else rva + self.image_base
+
+    def va_to_file_offset(self, va: int) -> Optional[int]:
+        return self.rva_to_file_offset(va - self.image_base)
+
+    def section_name(self, offset: int) -> Optional[str]:
+        section = self._section_for_offset(offset)
+        return section.name if section else None
+
+    def split_file_range(self, offset: int, size: int) -> Optional[List[Tuple[int, int, int]]]:
+        """Split a file range at section boundaries.
+
+        Returns (file_offset, va, length) chunks, each contiguous in both the file
+        and the process image, or None if part of the range is not mapped.
+        """
+        # Nearly every range lies in one section: one lookup, no loop
+        index = bisect.bisect_right(self._offset_keys, offset) - 1
+        if index >= 0 and offset + size <= self._offset_ends[index] and size > 0:
+            section = self._by_offset[index]
+            return [(offset, offset - section.raw_offset + section.virtual_address + self.image_base, size)]
+        chunks = []
+        end = offset + size
+        while offset < end:
+            section = self._section_for_offset(offset)
+            if section is None:
+                return None
+            section_end = section.raw_offset + section.mapped_size
+            length = min(end, section_end) - offset
+            va = offset - section.raw_offset + section.virtual_address + self.image_base
+            # Merge with the previous chunk when sections happen to be adjacent in both spaces
+            if chunks and chunks[-1][0] + chunks[-1][2] == offset and chunks[-1][1] + chunks[-1][2] == va:
+                prev_offset, prev_va, prev_length = chunks[-1]
+                chunks[-1] = (prev_offset, prev_va, prev_length + length)
+            else:
+                chunks.append((offset, va, length))
+            offset += length
+        return chunks
+
+
+def parse_section_map(header: bytes) -> SectionMap:
+    """Parse the DOS/PE headers and section table from the start of an EXE"""
+    if header[:2] != b'MZ':
+        raise ValueError("Not an MZ executable")
+    pe_offset = struct.unpack_from('<I', header, 0x3C)[0]
+    if header[pe_offset:pe_offset + 4] != b'PE\0\0':
+        raise ValueError("PE signature not found")
+
+    file_header = pe_offset + 4
+    machine, section_count = struct.unpack_from('<HH', header, file_header)
+    optional_size = struct.unpack_from('<H', header, file_header + 16)[0]
+    optional_header = file_header + 20
+    magic = struct.unpack_from('<H', header, optional_header)[0]
+    entry_point = struct.unpack_from('<I', header, optional_header + 16)[0]
+    if magic == 0x10B:
+        image_base = struct.unpack_from('<I', header, optional_header + 28)[0]
+    elif magic == 0x20B:
+        image_base = struct.unpack_from('<Q', header, optional_header + 24)[0]
+    else:
+        raise ValueError(f"Unknown optional header magic: {hex(magic)}")
+    size_of_headers = struct.unpack_from('<I', header, optional_header + 60)[0]
+
+    sections = []
+    table = optional_header + optional_size
+    for i in range(section_count):
+        entry = table + i * 40
+        if entry + 40 > len(header):
+            raise ValueError("Section table truncated")
+        name, virtual_size, virtual_address, raw_size, raw_offset = struct.unpack_from('<8sIIII', header, entry)
+        sections.append(Section(name.rstrip(b'\0').decode('ascii', 'replace'),
+                                virtual_address, virtual_size, raw_offset, raw_size))
+
+    return SectionMap(image_base, size_of_headers, entry_point, sections, machine)
+
+
+class SectionMapCache:
+    """Section maps cached per EXE header hash, with a stat-based fast path per path"""
+
+    def __init__(self):
+        self._maps: Dict[str, SectionMap] = {}
+        self._paths: Dict[str, Tuple[int, int, str]] = {}
+
+    def get(self, exe_path: str) -> Optional[SectionMap]:
+        """Return the section map for exe_path, or None if it is not a readable PE file"""
+        try:
+            stat = os.stat(exe_path)
+            known = self._paths.get(exe_path)
+            if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+                return self._maps.get(known[2])
+
+            with open(exe_path, 'rb') as f:
+                header = f.read(HEADER_READ_SIZE)
+            # The section table lives in the headers, so their hash identifies the layout
+            key = hashlib.sha1(header).hexdigest()
+            section_map = self._maps.get(key)
+            if section_map is None:
+                section_map = parse_section_map(header)
+                self._maps[key] = section_map
+            self._paths[exe_path] = (stat.st_mtime_ns, stat.st_size, key)
+            return section_map
+
+        except Exception as e:
+            print(f"Error reading PE sections of {exe_path}: {e}")
+            return None
+
+    def clear(self):
+        self._maps.clear()
+        self._paths.clear()
+
+
+# Global instance
+section_map_cache = SectionMapCache()
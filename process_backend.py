@@ -0,0 +1,109 @@
+"""
+Process memory backend for PvZModTool
+Thin wrapper over the Win32 calls used to find, open, read and write the game process
+"""
+import ctypes
+import ntpath
+from typing import List, Optional, Tuple
+
+import psutil
+
+
+PVZ_PROCESS_NAME = 'PlantsVsZombies.exe'
+PROCESS_ALL_ACCESS = 0x1F0FFF
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+STILL_ACTIVE = 259
+MEM_COMMIT = 0x1000
+PAGE_GUARD = 0x100
+# PAGE_READWRITE, PAGE_WRITECOPY, PAGE_EXECUTE_READWRITE, PAGE_EXECUTE_WRITECOPY
+WRITABLE_PROTECTIONS = 0x04 | 0x08 | 0x40 | 0x80
+MAX_USER_ADDRESS = 0x7FFFFFFF  # The game is 32-bit
+
+
+class MEMORY_BASIC_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ("BaseAddress", ctypes.c_void_p),
+        ("AllocationBase", ctypes.c_void_p),
+        ("AllocationProtect", ctypes.c_ulong),
+        ("RegionSize", ctypes.c_size_t),
+        ("State", ctypes.c_ulong),
+        ("Protect", ctypes.c_ulong),
+        ("Type", ctypes.c_ulong),
+    ]
+
+
+class Win32ProcessBackend:
+    """Process access through kernel32 (Windows only)"""
+
+    def find_processes(self, name: str = PVZ_PROCESS_NAME) -> List[int]:
+        """PIDs of all running processes with the given executable name"""
+        pids = []
+        for proc in psutil.process_iter(['pid', 'name']):
+            if proc.info['name'] == name:
+                pids.append(proc.info['pid'])
+        return pids
+
+    def is_running(self, pid: int, name: str = PVZ_PROCESS_NAME) -> bool:
+        """True if pid is still a live process with the given executable name (no process list walk)"""
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)) or exit_code.value != STILL_ACTIVE:
+                return False
+            # The PID may have been reused by another program
+            path = ctypes.create_unicode_buffer(1024)
+            length = ctypes.c_ulong(len(path))
+            if not kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(length)):
+                return False
+            return ntpath.basename(path.value).lower() == name.lower()
+        finally:
+            kernel32.CloseHandle(handle)
+
+    def open(self, pid: int) -> Optional[int]:
+        handle = ctypes.windll.kernel32.OpenProcess(PROCESS_ALL_ACCESS, False, pid)
+        return handle or None
+
+    def close(self, handle: int):
+        ctypes.windll.kernel32.CloseHandle(handle)
+
+    def read(self, handle: int, address: int, size: int) -> Optional[bytes]:
+        """Read exactly size bytes at a virtual address, None on failure"""
+        buffer = ctypes.create_string_buffer(size)
+        bytes_read = ctypes.c_size_t()
+        if not ctypes.windll.kernel32.ReadProcessMemory(
+            handle, ctypes.c_void_p(address), buffer, size, ctypes.byref(bytes_read)
+        ) or bytes_read.value != size:
+            return None
+        return buffer.raw
+
+    def write(self, handle: int, address: int, data: bytes) -> bool:
+        """Write all of data at a virtual address"""
+        bytes_written = ctypes.c_size_t()
+        if not ctypes.windll.kernel32.WriteProcessMemory(
+            handle, ctypes.c_void_p(address), data, len(data), ctypes.byref(bytes_written)
+        ):
+            return False
+        return bytes_written.value == len(data)
+
+    def writable_regions(self, handle: int) -> List[Tuple[int, int]]:
+        """(address, size) of every committed writable region, from VirtualQueryEx"""
+        regions = []
+        info = MEMORY_BASIC_INFORMATION()
+        address = 0
+        while address < MAX_USER_ADDRESS:
+            if not ctypes.windll.kernel32.VirtualQueryEx(
+                handle, ctypes.c_void_p(address), ctypes.byref(info), ctypes.sizeof(info)
+            ):
+                break
+            base = info.BaseAddress or 0
+            if (info.State == MEM_COMMIT and info.Protect & WRITABLE_PROTECTIONS
+                    and not info.Protect & PAGE_GUARD):
+                if regions and regions[-1][0] + regions[-1][1] == base:
+                    regions[-1] = (regions[-1][0], regions[-1][1] + info.RegionSize)
+                else:
+                    regions.append((base, info.RegionSize))
+            address = base + info.RegionSize
+        return regions
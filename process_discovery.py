@@ -0,0 +1,167 @@
+"""
+Process discovery for PvZModTool
+Caches the game's PID, checks it with one cheap call instead of listing every process,
+and publishes attach/detach events
+"""
+import threading
+import time
+from typing import Callable, List, Optional
+
+from instrumentation import instrumentation
+from process_backend import PVZ_PROCESS_NAME
+
+
+PROCESS_ATTACHED = "attached"
+PROCESS_DETACHED = "detached"
+
+VALIDATE_INTERVAL = 0.25  # Seconds a checked PID is trusted without another check
+MIN_RESCAN_INTERVAL = 0.5  # Lookups while the game is not running scan at most this often
+BACKGROUND_INTERVAL = 2.0  # Seconds between checks of the background thread
+
+
+class ProcessDiscovery:
+    """Knows whether the game runs and under which PID.
+
+    The full process list is scanned only when no PID is known (at most every
+    MIN_RESCAN_INTERVAL on lookups) and from the optional background thread; a known
+    PID is re-checked with backend.is_running(). Listeners get (event, pid) on the
+    thread that noticed the change.
+
+    With several instances running the preferred one (see prefer()) is chosen, else the
+    first found. A discovery pinned to a PID never scans and only reports that process.
+    """
+
+    def __init__(self, backend, process_name: str = PVZ_PROCESS_NAME, pinned_pid: Optional[int] = None):
+        self.backend = backend
+        self.process_name = process_name
+        self.pinned_pid = pinned_pid
+        self._preferred: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._checked = 0.0  # monotonic() of the last successful check of _pid
+        self._scanned = float('-inf')  # monotonic() of the last full scan
+        self._lock = threading.Lock()  # One check or scan at a time
+        self._listeners: List[Callable] = []
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def set_backend(self, backend):
+        """Swap the backend; the known PID is forgotten"""
+        with self._lock:
+            self.backend = backend
+            previous, self._pid = self._pid, None
+            self._scanned = float('-inf')
+        if previous is not None:
+            self._notify(PROCESS_DETACHED, previous)
+
+    def add_listener(self, listener: Callable):
+        """Register listener(event, pid) for PROCESS_ATTACHED and PROCESS_DETACHED"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, pid: int):
+        for listener in list(self._listeners):
+            try:
+                listener(event, pid)
+            except Exception as e:
+                print(f"Error in process listener: {e}")
+
+    def current_pid(self) -> Optional[int]:
+        """PID of the running game or None; microseconds while the PID is known"""
+        pid = self._pid
+        if pid is not None and time.monotonic() - self._checked < VALIDATE_INTERVAL:
+            instrumentation.cache("process.pid", True)
+            return pid
+        instrumentation.cache("process.pid", False)
+        return self.check(force_scan=False)
+
+    def check(self, force_scan: bool = True) -> Optional[int]:
+        """Re-check the known PID, scanning the process list if it is gone (or force_scan)"""
+        events = []
+        with self._lock:
+            now = time.monotonic()
+            previous = self._pid
+            pid = previous
+            if pid is not None and (pid != (self._preferred or pid) or not self._is_running(pid)):
+                pid = None
+            if self.pinned_pid is not None:
+                pid = self.pinned_pid if self._is_running(self.pinned_pid) else None
+            elif pid is None and (force_scan or now - self._scanned >= MIN_RESCAN_INTERVAL):
+                pid = self._choose(self._scan())
+                self._scanned = now
+            self._pid = pid
+            if pid is not None:
+                self._checked = now
+            if previous != pid:
+                if previous is not None:
+                    events.append((PROCESS_DETACHED, previous))
+                if pid is not None:
+                    events.append((PROCESS_ATTACHED, pid))
+        for event, event_pid in events:
+            self._notify(event, event_pid)
+        return pid
+
+    def _is_running(self, pid: int) -> bool:
+        try:
+            return self.backend.is_running(pid)
+        except Exception as e:
+            print(f"Error checking process {pid}: {e}")
+            return False
+
+    def _scan(self) -> List[int]:
+        try:
+            with instrumentation.span("process.scan", "process"):
+                return self.backend.find_processes(self.process_name)
+        except Exception as e:
+            print(f"Error finding PVZ process: {e}")
+            return []
+
+    def _choose(self, process_ids: List[int]) -> Optional[int]:
+        if self._preferred in process_ids:
+            return self._preferred
+        # The preferred instance exited, fall back to any
+        self._preferred = None
+        return process_ids[0] if process_ids else None
+
+    def instances(self) -> List[int]:
+        """PIDs of every running instance of the game (always a full scan)"""
+        if self.pinned_pid is not None:
+            return [self.pinned_pid] if self._is_running(self.pinned_pid) else []
+        return self._scan()
+
+    def prefer(self, pid: Optional[int]) -> Optional[int]:
+        """Target pid from now on (None: any instance); returns the PID now targeted"""
+        with self._lock:
+            self._preferred = pid
+        return self.check(force_scan=pid != self._pid)
+
+    def attach(self, pid: int):
+        """Target a PID known without a scan (a process we started); it becomes the preferred one"""
+        with self._lock:
+            previous = self._pid
+            self._preferred = self._pid = pid
+            self._checked = time.monotonic()
+        if previous != pid:
+            if previous is not None:
+                self._notify(PROCESS_DETACHED, previous)
+            self._notify(PROCESS_ATTACHED, pid)
+
+    # --- background thread ---
+
+    def start(self, interval: float = BACKGROUND_INTERVAL):
+        """Check (and scan while the game is not running) every interval seconds"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="ProcessDiscovery", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _run(self, interval: float):
+        while self._running:
+            self.check(force_scan=True)
+            time.sleep(interval)
@@ -0,0 +1,135 @@
+"""
+Process fleet for PvZModTool
+Targets several running instances of the game at once: every selected instance gets its
+own handle, and a process edit fans out to all of them in parallel with one result each
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from file_io_utils import file_io_manager, FileIOManager, PROCESS_TARGET
+from instrumentation import instrumentation
+from process_discovery import PROCESS_DETACHED
+from write_queue import MAX_WRITE_GAP
+
+
+MAX_WORKERS = 8  # Instances written at once, more wait for a free worker
+
+
+class InstanceResult(NamedTuple):
+    pid: int
+    result: Any  # What the operation returned for this instance, None if it raised
+    error: Optional[str]  # Exception message, None if the operation returned
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.result)
+
+
+class ProcessFleet:
+    """The set of game instances process edits go to.
+
+    The first selected instance is the main manager's target, so its edits keep undo,
+    the write log and the caches; every other one gets a FileIOManager pinned to its PID
+    (own handle, own journal). With nothing or one instance selected run() only touches
+    the main manager, exactly like a single-instance session.
+    """
+
+    def __init__(self, manager=file_io_manager, max_workers: int = MAX_WORKERS):
+        self.manager = manager
+        self.max_workers = max_workers
+        self._selected: List[int] = []
+        self._instances: Dict[int, FileIOManager] = {}  # pid -> manager, for every selected pid but the first
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        manager.discovery.add_listener(self._on_process_event)
+
+    def instances(self) -> List[int]:
+        """PIDs of every running instance of the game"""
+        return self.manager.discovery.instances()
+
+    @property
+    def selected(self) -> List[int]:
+        return list(self._selected)
+
+    @property
+    def active(self) -> bool:
+        """True when edits fan out to more than one instance"""
+        return len(self._selected) > 1
+
+    def select(self, pids: List[int]):
+        """Target these instances; the first becomes the main manager's target"""
+        pids = self._set_selection(pids)
+        self.manager.discovery.prefer(pids[0] if pids else None)
+
+    def adopt(self, pid: int):
+        """Make a process we started the main target without a scan; the rest of the selection stays"""
+        self._set_selection([pid] + self._selected)
+        self.manager.discovery.attach(pid)
+
+    def _set_selection(self, pids: List[int]) -> List[int]:
+        pids = list(dict.fromkeys(pids))
+        with self._lock:
+            self._selected = pids
+            for pid in [pid for pid in self._instances if pid not in pids[1:]]:
+                self._instances.pop(pid).close_process_handle()
+            for pid in pids[1:]:
+                if pid not in self._instances:
+                    self._instances[pid] = self.manager.for_instance(pid)
+        return pids
+
+    def _on_process_event(self, event: str, pid: int):
+        """Discovery listener: an exited main target leaves the selection, the next one takes over"""
+        if event == PROCESS_DETACHED and self._selected and self._selected[0] == pid:
+            self.select(self._selected[1:])
+
+    def targets(self) -> List[Tuple[int, FileIOManager]]:
+        """(pid, manager) of every selected instance, the main manager first"""
+        with self._lock:
+            if not self._selected:
+                return [(self.manager.discovery.current_pid(), self.manager)]
+            return [(self._selected[0], self.manager)] + [(pid, self._instances[pid]) for pid in self._selected[1:]]
+
+    def run(self, func: Callable, *args, label: Optional[str] = None) -> List[InstanceResult]:
+        """func(manager, *args) for every selected instance in parallel, results in selection order.
+
+        With label each instance's writes form one undo step in that instance's journal.
+        """
+        def run_one(target):
+            pid, manager = target
+            manager.set_exe_path(self.manager.exe_path)  # Follow a project switch
+            try:
+                if label is None:
+                    return InstanceResult(pid, func(manager, *args), None)
+                with manager.transaction(label):
+                    return InstanceResult(pid, func(manager, *args), None)
+            except Exception as e:
+                print(f"Error in instance {pid}: {e}")
+                return InstanceResult(pid, None, str(e))
+
+        targets = self.targets()
+        with instrumentation.span("fleet.run", "process"):
+            if len(targets) == 1:
+                return [run_one(targets[0])]
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="Fleet")
+            return list(self._pool.map(run_one, targets))
+
+    def write(self, address: int, data: Union[int, bytes], size: int = 4,
+              label: Optional[str] = None) -> List[InstanceResult]:
+        """Write data at address (a file offset) into every selected instance"""
+        return self.run(lambda manager: manager.write_data(PROCESS_TARGET, address, data, size), label=label)
+
+    def write_batch(self, writes: List[Tuple[int, bytes, Optional[str]]], max_gap: int = MAX_WRITE_GAP,
+                    label: Optional[str] = None) -> List[InstanceResult]:
+        """FileIOManager.write_memory_batch in every selected instance; ok only if every write landed"""
+        return self.run(lambda manager: all(manager.write_memory_batch(writes, max_gap)), label=label)
+
+
+def failed_pids(results: List[InstanceResult]) -> List[int]:
+    return [result.pid for result in results if not result.ok]
+
+
+# Global instance
+process_fleet = ProcessFleet()
@@ -0,0 +1,129 @@
+"""
+Process snapshot for PvZModTool
+Copies whole data sections of the running game in a few large reads and answers typed
+reads from that copy until our own write or an explicit refresh makes it stale
+"""
+import bisect
+import struct
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+from file_io_utils import file_io_manager, PROCESS_TARGET
+from instrumentation import instrumentation
+
+
+DEFAULT_SECTIONS = ('.data', '.rdata')
+
+
+class SnapshotRegion(NamedTuple):
+    start: int  # File offset, like every other address in the tool
+    end: int
+    data: bytes
+
+
+class ProcessSnapshot:
+    """Generation-stamped copy of chosen sections of the game's image.
+
+    Reads return memoryviews into the copy (no syscall, no copy). A process write made
+    through FileIOManager that touches a region drops the copy; the next read or
+    refresh() captures a new one with a new generation.
+    """
+
+    def __init__(self, manager=file_io_manager, sections: Tuple[str, ...] = DEFAULT_SECTIONS):
+        self.manager = manager
+        self.sections = sections
+        self.generation = 0  # Bumped by every capture
+        self._capture: Optional[Tuple[List[int], List[SnapshotRegion]]] = None  # (starts, regions), None when stale
+        self._bounds: List[Tuple[int, int]] = []  # Regions of the last capture, kept while stale
+        self._writes = 0  # Bumped by every invalidating write, a capture racing one is not kept
+        self._lock = threading.Lock()  # One capture at a time
+        manager.add_write_listener(self.on_write)
+
+    @property
+    def stale(self) -> bool:
+        return self._capture is None
+
+    def on_write(self, target: str, address: int, size: int):
+        """Write listener: a process write inside a captured region makes the copy stale"""
+        if target != PROCESS_TARGET:
+            return
+        for start, end in self._bounds:
+            if start < address + size and address < end:
+                self.invalidate()
+                return
+
+    def invalidate(self):
+        self._writes += 1
+        self._capture = None
+
+    def refresh(self) -> bool:
+        """Capture the sections now; False if the game or the EXE's section table is unavailable"""
+        return self._take() is not None
+
+    @instrumentation.timed("snapshot.capture", "process")
+    def _take(self) -> Optional[Tuple[List[int], List[SnapshotRegion]]]:
+        section_map = self.manager.section_map()
+        if section_map is None:
+            return None
+        with self._lock:
+            writes = self._writes
+            regions = []
+            rescan = True  # Check the process list once, then reuse the handle
+            for section in section_map.sections:
+                if section.name not in self.sections or section.mapped_size == 0:
+                    continue
+                data = self.manager.read_memory_raw(section.raw_offset, section.mapped_size, rescan=rescan)
+                rescan = False
+                if data is None:
+                    self._capture = None
+                    return None
+                regions.append(SnapshotRegion(section.raw_offset, section.raw_offset + section.mapped_size, data))
+            regions.sort()
+            self._bounds = [(region.start, region.end) for region in regions]
+            self.generation += 1
+            capture = ([region.start for region in regions], regions)
+            # A write that landed during the reads leaves the copy stale, but it still serves this caller
+            self._capture = capture if writes == self._writes else None
+        return capture
+
+    def covers(self, address: int, size: int = 1) -> bool:
+        """True if [address, address + size) lies in one of the captured sections"""
+        return any(start <= address and address + size <= end for start, end in self._bounds)
+
+    def view(self, address: int, size: int) -> Optional[memoryview]:
+        """Bytes at address from the copy, capturing it first if stale; None if not covered"""
+        capture = self._capture
+        if capture is None:
+            instrumentation.cache("snapshot.read", False)
+            capture = self._take()
+            if capture is None:
+                return None
+        else:
+            instrumentation.cache("snapshot.read", True)
+        starts, regions = capture
+        index = bisect.bisect_right(starts, address) - 1
+        if index < 0:
+            return None
+        region = regions[index]
+        if address + size > region.end:
+            return None
+        offset = address - region.start
+        return memoryview(region.data)[offset:offset + size]
+
+    def read(self, address: int, size: int = 4) -> Optional[bytes]:
+        view = self.view(address, size)
+        return None if view is None else view.tobytes()
+
+    def read_int(self, address: int, size: int = 4) -> Optional[int]:
+        """Little-endian unsigned value of size bytes"""
+        view = self.view(address, size)
+        return None if view is None else int.from_bytes(view, byteorder='little')
+
+    def unpack(self, fmt: str, address: int) -> Optional[tuple]:
+        """struct.unpack of fmt at address, straight from the copy"""
+        view = self.view(address, struct.calcsize(fmt))
+        return None if view is None else struct.unpack_from(fmt, view)
+
+
+# Global instance
+process_snapshot = ProcessSnapshot()
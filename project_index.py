@@ -0,0 +1,275 @@
+"""
+Project index for PvZModTool
+A per-project SQLite database of every file (size, mtime, content hash), the EXE fingerprint
+and the last known address values and spawn table, so an opened project is known at once
+and questions like "what changed since backup X" need no rescan
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fingerprint import fingerprint_service
+from instrumentation import instrumentation
+
+
+INDEX_FILE_NAME = "project_index.db"
+SCHEMA_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+BACKUP_PREFIX = "backup_"
+SPAWN_TABLE_KEY = "spawn_table"
+
+CHANGE_MODIFIED = "modified"
+CHANGE_ADDED = "added"  # In the project, not in the backup
+CHANGE_REMOVED = "removed"  # In the backup, not in the project anymore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,  -- Relative to the project, '/' separated
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS exe_values (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    address INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    value INTEGER,
+    PRIMARY KEY (category, name, address)  -- Some entries patch several addresses
+);
+CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, data BLOB);
+"""
+
+
+class IndexUpdate(NamedTuple):
+    files: int
+    added: int
+    changed: int
+    removed: int
+    hashed_bytes: int
+    seconds: float
+
+
+def _hash_file(path: str) -> Optional[str]:
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+    except OSError as e:
+        print(f"Error hashing {path}: {e}")
+        return None
+    return digest.hexdigest()
+
+
+def _like_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class ProjectIndex:
+    """Index of the open project, stored as INDEX_FILE_NAME in the project folder.
+
+    update() walks the folder and rehashes only files whose size or mtime moved; a file
+    in a backup_* folder with the same size and mtime as its project original (backups
+    are made with copy2) takes the original's hash without being read.
+    """
+
+    def __init__(self):
+        self.project_path: Optional[str] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # One statement at a time on the shared connection
+
+    def open(self, project_path: str):
+        self.close()
+        path = os.path.join(project_path, INDEX_FILE_NAME)
+        try:
+            connection = sqlite3.connect(path, check_same_thread=False)
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS meta; "
+                                         "DROP TABLE IF EXISTS exe_values; DROP TABLE IF EXISTS blobs;")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.executescript(_SCHEMA)
+            connection.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error as e:
+            print(f"Error opening project index {path}: {e}")
+            return
+        self.project_path = project_path
+        self._connection = connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._connection is not None
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        if self._connection is None:
+            return []
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    # --- files ---
+
+    def _walk(self) -> Dict[str, Tuple[int, int]]:
+        """relative path -> (size, mtime_ns) of every file in the project except the index itself"""
+        found = {}
+        pending = [("", self.project_path)]
+        while pending:
+            relative, directory = pending.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    for entry in iterator:
+                        name = relative + entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append((name + "/", entry.path))
+                                continue
+                            if entry.name.startswith(INDEX_FILE_NAME):
+                                continue  # The database and its -wal/-shm files, also inside backups
+                            info = entry.stat()
+                        except OSError:
+                            continue
+                        found[name] = (info.st_size, info.st_mtime_ns)
+            except OSError as e:
+                print(f"Error listing {directory}: {e}")
+        return found
+
+    @instrumentation.timed("index.update", "io")
+    def update(self) -> Optional[IndexUpdate]:
+        """Bring the file table up to date; None if no index is open"""
+        if self._connection is None:
+            return None
+        start = time.perf_counter()
+        found = self._walk()
+        known = {path: (size, mtime_ns, file_hash)
+                 for path, size, mtime_ns, file_hash in self._query("SELECT path, size, mtime_ns, hash FROM files")}
+
+        rows = []
+        hashed_bytes = 0
+        added = changed = 0
+        # Project files first, so backup copies can reuse their hashes
+        for path in sorted(found, key=lambda path: path.startswith(BACKUP_PREFIX)):
+            size, mtime_ns = found[path]
+            previous = known.get(path)
+            if previous is not None and previous[:2] == (size, mtime_ns) and previous[2] is not None:
+                continue
+            file_hash = None
+            if path.startswith(BACKUP_PREFIX) and "/" in path:
+                original = known.get(path.split("/", 1)[1])
+                if original is not None and original[:2] == (size, mtime_ns):
+                    file_hash = original[2]
+            if file_hash is None:
+                file_hash = _hash_file(os.path.join(self.project_path, path))
+                hashed_bytes += size
+            known[path] = (size, mtime_ns, file_hash)
+            rows.append((path, size, mtime_ns, file_hash))
+            if previous is None:
+                added += 1
+            else:
+                changed += 1
+        removed = [(path,) for path in known if path not in found]
+
+        with self._lock:
+            with self._connection:
+                self._connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", rows)
+                self._connection.executemany("DELETE FROM files WHERE path = ?", removed)
+                self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('updated', ?)", (str(time.time()),))
+        return IndexUpdate(len(found), added, changed, len(removed), hashed_bytes, time.perf_counter() - start)
+
+    def file_count(self) -> int:
+        """Files of the project itself, backups excluded"""
+        rows = self._query("SELECT count(*) FROM files WHERE path NOT LIKE ? ESCAPE '\\'",
+                           (_like_escape(BACKUP_PREFIX) + "%",))
+        return rows[0][0] if rows else 0
+
+    def backups(self) -> List[Tuple[str, int, int]]:
+        """(backup folder, files, bytes) of every backup_* folder, oldest first"""
+        return self._query(
+            "SELECT substr(path, 1, instr(path, '/') - 1) AS backup, count(*), sum(size) FROM files "
+            "WHERE path LIKE ? ESCAPE '\\' AND instr(path, '/') > 0 GROUP BY backup ORDER BY backup",
+            (_like_escape(BACKUP_PREFIX) + "%",))
+
+    def changed_since_backup(self, backup: str) -> List[Tuple[str, str]]:
+        """(path, CHANGE_*) of project files that differ from the copy in backup"""
+        prefix = backup.rstrip("/") + "/"
+        project_only = "path NOT LIKE ? ESCAPE '\\'"
+        backup_pattern = _like_escape(BACKUP_PREFIX) + "%"
+        return self._query(
+            f"SELECT f.path, CASE WHEN b.path IS NULL THEN '{CHANGE_ADDED}' ELSE '{CHANGE_MODIFIED}' END "
+            f"FROM files f LEFT JOIN files b ON b.path = ? || f.path "
+            f"WHERE f.{project_only} AND (b.path IS NULL OR b.hash IS NOT f.hash) "
+            f"UNION ALL "
+            f"SELECT substr(b.path, ?), '{CHANGE_REMOVED}' FROM files b "
+            f"WHERE b.path LIKE ? ESCAPE '\\' AND NOT EXISTS (SELECT 1 FROM files f WHERE f.path = substr(b.path, ?)) "
+            f"ORDER BY 1",
+            (prefix, backup_pattern, len(prefix) + 1, _like_escape(prefix) + "%", len(prefix) + 1))
+
+    def search(self, pattern: str, limit: int = 500) -> List[Tuple[str, int, int]]:
+        """(path, size, mtime_ns) of files whose path contains pattern (* and ? are wildcards)"""
+        if "*" in pattern or "?" in pattern:
+            return self._query("SELECT path, size, mtime_ns FROM files WHERE path GLOB ? ORDER BY path LIMIT ?",
+                               (pattern if pattern.startswith("*") else "*" + pattern, limit))
+        return self._query("SELECT path, size, mtime_ns FROM files WHERE path LIKE ? ESCAPE '\\' ORDER BY path LIMIT ?",
+                           ("%" + _like_escape(pattern) + "%", limit))
+
+    # --- EXE identity, values and spawn table ---
+
+    def _set_meta(self, key: str, value: str):
+        if self._connection is None:
+            return
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def record_exe(self, exe_path: str) -> Optional[str]:
+        """Store the EXE's fingerprint; returns it"""
+        digest = fingerprint_service.fingerprint(exe_path)
+        if digest is not None:
+            self._set_meta("exe_fingerprint", digest)
+        return digest
+
+    def save_values(self, values: Dict) -> int:
+        """Store an address_table.snapshot() result (AddressEntry -> value or None)"""
+        if self._connection is None:
+            return 0
+        rows = [(entry.category, entry.name, entry.address, entry.size, value) for entry, value in values.items()]
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM exe_values")
+            self._connection.executemany("INSERT INTO exe_values VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def values(self) -> Dict[Tuple[str, str], Optional[int]]:
+        """(category, name) -> last known value in the EXE (of the entry's first address)"""
+        return {(category, name): value for category, name, value
+                in self._query("SELECT category, name, value FROM exe_values ORDER BY address DESC")}
+
+    def value(self, category: str, name: str) -> Optional[int]:
+        """Last known value of the entry's first address"""
+        rows = self._query("SELECT value FROM exe_values WHERE category = ? AND name = ? ORDER BY address LIMIT 1",
+                           (category, name))
+        return rows[0][0] if rows else None
+
+    def save_blob(self, key: str, data: bytes):
+        if self._connection is None:
+            return
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?)", (key, sqlite3.Binary(data)))
+
+    def blob(self, key: str) -> Optional[bytes]:
+        rows = self._query("SELECT data FROM blobs WHERE key = ?", (key,))
+        return bytes(rows[0][0]) if rows else None
+
+
+# Global instance
+project_index = ProjectIndex()
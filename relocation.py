@@ -0,0 +1,190 @@
+"""
+AOB relocation for PvZModTool
+Finds the patch points of addresses.py on other PvZ builds and remembers the result per build
+"""
+import bisect
+import hashlib
+import json
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple
+
+import addresses
+from pe_sections import HEADER_READ_SIZE, section_map_cache
+from signatures import CACHE_DIR, PatternMatcher, parse_pattern
+
+
+# Addresses further than this from the nearest located signature are not relocated by inference
+MAX_ANCHOR_DISTANCE = 0x10000
+
+# Bump when the cache layout changes so stale tables are re-resolved
+CACHE_VERSION = 1
+
+
+def build_id(exe_path: str) -> str:
+    """Identify the PvZ build by its PE headers.
+
+    Our patches never touch the headers, so a modded EXE keeps the build id of the
+    EXE it was made from and reuses its resolved table.
+    """
+    with open(exe_path, 'rb') as f:
+        return hashlib.sha1(f.read(HEADER_READ_SIZE)).hexdigest()
+
+
+def locate_signatures(exe_path: str, signature_table: Dict[int, tuple]) -> Dict[int, Optional[int]]:
+    """Locate every signature in one pass over the mapped EXE.
+
+    Returns original offset -> offset in this EXE, or None when the signature is
+    missing or ambiguous.
+    """
+    originals, patterns, patch_offsets = [], [], []
+    for original, (pattern, patch_offset) in signature_table.items():
+        segments = parse_pattern(pattern)
+        if segments is None:
+            print(f"Invalid signature for {hex(original)}: {pattern}")
+            continue
+        originals.append(original)
+        patterns.append(segments)
+        patch_offsets.append(patch_offset)
+
+    resolved: Dict[int, Optional[int]] = {original: None for original in signature_table}
+    if not patterns:
+        return resolved
+
+    hits = [[] for _ in patterns]
+    with open(exe_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for index, offset in PatternMatcher(patterns).scan(data):
+                hits[index].append(offset)
+
+    for index, found in enumerate(hits):
+        # A signature that matches more than once cannot be trusted for patching
+        if len(found) == 1:
+            resolved[originals[index]] = found[0] + patch_offsets[index]
+    return resolved
+
+
+class RelocationTable:
+    """Translation of this tool's file offsets into one specific EXE build.
+
+    section_map is the section table of that build; without it only signed addresses translate.
+    """
+
+    def __init__(self, resolved: Dict[int, Optional[int]], section_map=None):
+        self.resolved = resolved
+        self.section_map = section_map
+        # Every signature located and none moved: this is the build addresses.py was written
+        # for. A missing signature leaves its section unverified, so that is not enough
+        self.identity = bool(resolved) and all(found == original for original, found in resolved.items())
+
+        # Located signatures grouped by the section they were found in, sorted by original offset
+        self._anchors: Dict[str, Tuple[List[int], List[int]]] = {}
+        for original, found in sorted((o, f) for o, f in resolved.items() if f is not None):
+            name = section_map.section_name(found) if section_map else None
+            if name is None:
+                continue
+            offsets, deltas = self._anchors.setdefault(name, ([], []))
+            offsets.append(original)
+            deltas.append(found - original)
+
+    @property
+    def identified(self) -> bool:
+        """True if at least one signature was located in this build"""
+        return any(found is not None for found in self.resolved.values())
+
+    @property
+    def missing(self):
+        return [original for original, found in self.resolved.items() if found is None]
+
+    def translate(self, address: int) -> Optional[int]:
+        """Return the offset of address in this build, or None if it cannot be located safely"""
+        if self.identity:
+            return address
+        found = self.resolved.get(address)
+        if found is not None:
+            return found
+
+        # Infer the delta from the nearest located signature whose section the address lands
+        # in; a section with no located signature is not relocated at all
+        best = None
+        for name, (offsets, deltas) in self._anchors.items():
+            index = bisect.bisect_left(offsets, address)
+            candidates = [i for i in (index - 1, index) if 0 <= i < len(offsets)]
+            nearest = min(candidates, key=lambda i: abs(offsets[i] - address))
+            distance = abs(offsets[nearest] - address)
+            if distance > MAX_ANCHOR_DISTANCE or (best is not None and distance >= best[0]):
+                continue
+            located = address + deltas[nearest]
+            if self.section_map.section_name(located) == name:
+                best = (distance, located)
+        return best[1] if best else None
+
+
+class AddressRelocator:
+    """Resolves addresses.py against the current EXE, caching tables per build on disk"""
+
+    def __init__(self, signature_table: Optional[Dict[int, tuple]] = None):
+        self.signature_table = signature_table if signature_table is not None else addresses.aob_signatures
+        self.table: Optional[RelocationTable] = None
+        self._tables: Dict[str, RelocationTable] = {}
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(CACHE_DIR, f"relocation_{key}.json")
+
+    def _signature_stamp(self) -> str:
+        """Hash of the signature table so editing addresses.py re-resolves cached builds"""
+        items = sorted((original, pattern, offset) for original, (pattern, offset) in self.signature_table.items())
+        return hashlib.sha1(repr((CACHE_VERSION, items)).encode()).hexdigest()
+
+    def load_for_exe(self, exe_path: str) -> Optional[RelocationTable]:
+        """Make exe_path the translation target; resolves unknown builds once and remembers them.
+
+        Returns None if the build cannot be identified: no signature was located, every
+        translate() then returns None so nothing is written to unverified offsets.
+        """
+        try:
+            key = build_id(exe_path)
+        except Exception as e:
+            print(f"Error identifying EXE build {exe_path}: {e}")
+            self.table = RelocationTable({})  # Unknown build: nothing translates
+            return None
+
+        table = self._tables.get(key)
+        if table is None:
+            # Same headers, same section table: it is cached per build like the table
+            section_map = section_map_cache.get(exe_path)
+            stamp = self._signature_stamp()
+            cache_path = self._cache_path(key)
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get("stamp") == stamp:
+                    table = RelocationTable({int(k): v for k, v in cached["resolved"].items()}, section_map)
+            except Exception:
+                pass
+
+            if table is None:
+                table = RelocationTable(locate_signatures(exe_path, self.signature_table), section_map)
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    with open(cache_path, 'w', encoding='utf-8') as f:
+                        json.dump({"stamp": stamp, "resolved": table.resolved}, f, indent=1)
+                except Exception as e:
+                    print(f"Error saving relocation cache: {e}")
+            self._tables[key] = table
+
+        self.table = table
+        if not table.identified:
+            print(f"No signature found in {exe_path}, build not identified")
+            return None
+        return table
+
+    def translate(self, address):
+        """Translate an address from addresses.py; non-integer entries pass through unchanged"""
+        if self.table is None or not isinstance(address, int):
+            return address
+        return self.table.translate(address)
+
+
+# Global instance
+address_relocator = AddressRelocator()
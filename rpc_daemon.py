@@ -0,0 +1,448 @@
+"""
+RPC daemon for PvZModTool
+Serves the tool's FileIOManager to scripts over a local named pipe (Unix socket elsewhere),
+so every client shares one process handle, one read cache and one write queue
+
+Requests are JSON-RPC 2.0 objects or batches (lists) of them, one message per call; bytes
+travel as hex strings and addresses are file offsets like everywhere else in the tool.
+
+Clients authenticate with a key generated for each session and stored, readable only by the
+user, in the user's cache directory; RpcClient picks it up from there. Only the game and
+the EXE the tool works on can be targeted.
+
+Usage:
+    python rpc_daemon.py --exe PATH\\PlantsVsZombies.exe    (standalone, without the GUI)
+    python main.py --rpc                                     (the GUI serves its own session)
+"""
+import hashlib
+import itertools
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+from collections import deque
+from multiprocessing.connection import AuthenticationError, Client, Listener
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from file_io_utils import file_io_manager, PROCESS_TARGET
+from instrumentation import instrumentation
+from write_queue import process_write_queue, MAX_WRITE_GAP
+
+
+if sys.platform == "win32":
+    DEFAULT_ADDRESS = r"\\.\pipe\PvZModTool"
+else:
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "pvzmodtool.sock")
+
+QUEUED_WRITE_TIMEOUT = 5.0  # Seconds a queued write waits for its flush before reporting failure
+AUTHKEY_SIZE = 32
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def user_cache_dir() -> str:
+    """Per-user cache folder (%LOCALAPPDATA%\\PvZModTool, $XDG_CACHE_HOME/pvzmodtool)"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return os.path.join(base, "PvZModTool")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pvzmodtool")
+
+
+def authkey_path(address: str = DEFAULT_ADDRESS) -> str:
+    """File holding the session key of the daemon on address"""
+    name = hashlib.sha1(address.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(user_cache_dir(), f"rpc_{name}.key")
+
+
+def load_authkey(address: str = DEFAULT_ADDRESS) -> Optional[bytes]:
+    """Session key of the daemon on address, None if no daemon wrote one"""
+    try:
+        with open(authkey_path(address), 'rb') as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def _save_authkey(address: str, authkey: bytes) -> bool:
+    path = authkey_path(address)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        # Created readable by the user only, never world-readable for a moment
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(authkey)
+        return True
+    except OSError as e:
+        print(f"Error saving RPC key to {path}: {e}")
+        return False
+
+
+class _Session:
+    """One client connection: its watches and a lock so notifications and replies don't interleave"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.watches: Dict[int, Tuple[str, int, int]] = {}  # id -> (target, start, end)
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+        with self.send_lock:
+            self.connection.send_bytes(data)
+
+
+class RpcServer:
+    """Accepts clients on a background thread, one thread per client.
+
+    Methods: pid, read, read_many, write, write_batch, queue_write, watch, unwatch. watch
+    reports every write made through the shared manager (by any client or the GUI) that
+    touches the range, as a "written" notification.
+    """
+
+    def __init__(self, manager=file_io_manager, write_queue=process_write_queue,
+                 address: str = DEFAULT_ADDRESS, authkey: Optional[bytes] = None):
+        """authkey None: start() generates one and saves it for clients at authkey_path(address)"""
+        self.manager = manager
+        self.write_queue = write_queue
+        self.address = address
+        self.authkey = authkey
+        self.session_authkey: Optional[bytes] = None  # Key clients must present while listening
+        self._saved_authkey = False  # The key file is ours, remove it on stop
+        self._listener: Optional[Listener] = None
+        self._sessions: List[_Session] = []
+        self._lock = threading.Lock()  # Guards _sessions
+        self._watch_ids = itertools.count(1)
+        self._methods = {
+            "pid": self.rpc_pid,
+            "read": self.rpc_read,
+            "read_many": self.rpc_read_many,
+            "write": self.rpc_write,
+            "write_batch": self.rpc_write_batch,
+            "queue_write": self.rpc_queue_write,
+            "watch": self.rpc_watch,
+            "unwatch": self.rpc_unwatch,
+        }
+
+    def start(self) -> bool:
+        """Listen on address; False if it is taken (another daemon runs)"""
+        if self._listener is not None:
+            return True
+        if sys.platform != "win32" and os.path.exists(self.address):
+            # A socket file left behind by a daemon that did not exit cleanly
+            try:
+                Client(self.address, authkey=self.authkey or load_authkey(self.address) or b"-").close()
+                print(f"RPC address {self.address} is already served")
+                return False
+            except AuthenticationError:
+                print(f"RPC address {self.address} is already served")
+                return False
+            except (OSError, EOFError):
+                os.remove(self.address)
+        authkey = self.authkey or secrets.token_bytes(AUTHKEY_SIZE)
+        try:
+            self._listener = Listener(self.address, authkey=authkey)
+        except OSError as e:
+            print(f"Error starting RPC daemon on {self.address}: {e}")
+            return False
+        if self.authkey is None:
+            # Saved only once the address is ours, so the key of a running daemon is never replaced
+            if not _save_authkey(self.address, authkey):
+                self._listener.close()
+                self._listener = None
+                return False
+            self._saved_authkey = True
+        self.session_authkey = authkey
+        self.manager.add_write_listener(self.on_write)
+        threading.Thread(target=self._accept_loop, name="RpcAccept", daemon=True).start()
+        return True
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+        self.session_authkey = None
+        if self._saved_authkey:
+            self._saved_authkey = False
+            try:
+                os.remove(authkey_path(self.address))
+            except OSError:
+                pass
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.connection.close()
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError:
+                print("RPC client rejected: wrong session key")
+                continue
+            except (OSError, EOFError) as e:
+                if self._listener is not None:
+                    print(f"Error accepting RPC client: {e}")
+                continue
+            session = _Session(connection)
+            with self._lock:
+                self._sessions.append(session)
+            threading.Thread(target=self._serve, args=(session,), name="RpcClient", daemon=True).start()
+
+    def _serve(self, session: _Session):
+        try:
+            while True:
+                try:
+                    data = session.connection.recv_bytes()
+                except (EOFError, OSError):
+                    break
+                reply = self.handle(data, session)
+                if reply is not None:
+                    session.send(reply)
+        finally:
+            with self._lock:
+                if session in self._sessions:
+                    self._sessions.remove(session)
+            session.connection.close()
+
+    def handle(self, data: bytes, session: Optional[_Session] = None):
+        """Reply for one message (a request or a batch), None if it held only notifications"""
+        try:
+            message = json.loads(data)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, str(e))
+        if isinstance(message, list):
+            if not message:
+                return _error(None, INVALID_REQUEST, "Empty batch")
+            with instrumentation.span("rpc.batch", "rpc", calls=len(message)):
+                replies = [self._call(request, session) for request in message]
+            replies = [reply for reply in replies if reply is not None]
+            return replies or None
+        return self._call(message, session)
+
+    def _call(self, request, session: Optional[_Session]):
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _error(None, INVALID_REQUEST, "Request must be an object with a method")
+        request_id = request.get("id")
+        method = self._methods.get(request["method"])
+        if method is None:
+            return _error(request_id, METHOD_NOT_FOUND, f"Unknown method {request['method']}")
+        params = request.get("params", {})
+        try:
+            if isinstance(params, list):
+                result = method(session, *params)
+            else:
+                result = method(session, **params)
+        except TypeError as e:
+            return _error(request_id, INVALID_PARAMS, str(e))
+        except RpcError as e:
+            return _error(request_id, e.code, str(e))
+        except Exception as e:
+            print(f"Error in RPC method {request['method']}: {e}")
+            return _error(request_id, INTERNAL_ERROR, str(e))
+        if "id" not in request:
+            return None  # Notification: no reply
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _target(self, name: Optional[str]) -> str:
+        """"process" (the default) means the game, "exe" or its path the EXE the tool works on;
+        no other file can be read or written through the daemon"""
+        if name in (None, "process", PROCESS_TARGET):
+            return PROCESS_TARGET
+        exe_path = self.manager.exe_path
+        if exe_path and (name == "exe" or os.path.normcase(os.path.abspath(name)) ==
+                         os.path.normcase(os.path.abspath(exe_path))):
+            return exe_path
+        raise RpcError(INVALID_PARAMS, "target must be \"process\" or the EXE the tool works on")
+
+    # --- methods, each gets the calling session first ---
+
+    def rpc_pid(self, session) -> Optional[int]:
+        return self.manager.find_pvz_process()
+
+    def _read(self, target: str, address: int, size: int) -> Optional[str]:
+        data = self.manager.read_data(target, address, size)
+        if data is None:
+            return None
+        if isinstance(data, int):
+            data = data.to_bytes(size, byteorder='little')
+        return data.hex()
+
+    def rpc_read(self, session, address: int, size: int = 4, target: Optional[str] = None) -> Optional[str]:
+        return self._read(self._target(target), address, size)
+
+    def rpc_read_many(self, session, reads: List[List[int]], target: Optional[str] = None) -> List[Optional[str]]:
+        """[[address, size], ...] -> hex or None per read, the cheap way to batch reads"""
+        target = self._target(target)
+        return [self._read(target, address, size) for address, size in reads]
+
+    def rpc_write(self, session, address: int, data: str, target: Optional[str] = None,
+                  label: Optional[str] = None) -> bool:
+        target = self._target(target)
+        with self.manager.transaction(label or f"RPC {hex(address)}"):
+            return self.manager.write_data(target, address, bytes.fromhex(data), len(data) // 2)
+
+    def rpc_write_batch(self, session, writes: List[list], max_gap: int = MAX_WRITE_GAP,
+                        label: Optional[str] = None) -> List[bool]:
+        """[[address, hex, label or null], ...] into the game as merged spans, one undo step"""
+        batch = [(address, bytes.fromhex(data), entry_label) for address, data, entry_label in writes]
+        with self.manager.transaction(label or "RPC batch"):
+            return self.manager.write_memory_batch(batch, max_gap)
+
+    def rpc_queue_write(self, session, address: int, data: str, label: Optional[str] = None) -> bool:
+        """Through the shared write queue, coalesced with the writes of every other client"""
+        pending = self.write_queue.write(address, bytes.fromhex(data), label=label)
+        return bool(pending.wait(QUEUED_WRITE_TIMEOUT))
+
+    def rpc_watch(self, session, address: int, size: int = 1, target: Optional[str] = None) -> int:
+        if session is None:
+            raise RpcError(INVALID_REQUEST, "watch needs a connection")
+        watch_id = next(self._watch_ids)
+        session.watches[watch_id] = (self._target(target), address, address + size)
+        return watch_id
+
+    def rpc_unwatch(self, session, watch: int) -> bool:
+        return session is not None and session.watches.pop(watch, None) is not None
+
+    def on_write(self, target: str, address: int, size: int):
+        """Write listener: notify the sessions watching the range"""
+        end = address + size
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            for watch_id, (watched, start, watch_end) in list(session.watches.items()):
+                if watched == target and start < end and address < watch_end:
+                    try:
+                        session.send({"jsonrpc": "2.0", "method": "written",
+                                      "params": {"watch": watch_id, "address": address, "size": size}})
+                    except (OSError, ValueError):
+                        pass  # The client is gone, its thread cleans up
+
+
+def _error(request_id, code: int, message: str) -> Dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class RpcClient:
+    """Blocking client; "written" notifications that arrive between replies collect in events"""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, authkey: Optional[bytes] = None):
+        """authkey None: the session key the daemon on address saved in the user's cache directory"""
+        authkey = authkey or load_authkey(address)
+        if authkey is None:
+            raise ConnectionRefusedError(f"No RPC session key for {address}, is the daemon running?")
+        self.connection = Client(address, authkey=authkey)
+        self.events: Deque[Dict] = deque()
+        self._ids = itertools.count(1)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _receive(self):
+        """Next reply, queueing notifications met on the way"""
+        while True:
+            message = json.loads(self.connection.recv_bytes())
+            if isinstance(message, dict) and "id" not in message:
+                self.events.append(message)
+                continue
+            return message
+
+    def call(self, method: str, **params) -> Any:
+        request_id = next(self._ids)
+        self.connection.send_bytes(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                                               "params": params}).encode('utf-8'))
+        return _result(self._receive())
+
+    def batch(self, calls: List[Tuple[str, Dict]]) -> List[Any]:
+        """Send [(method, params), ...] as one message; results in the same order"""
+        first = next(self._ids)
+        self._ids = itertools.count(first + len(calls))
+        requests = [{"jsonrpc": "2.0", "id": first + i, "method": method, "params": params}
+                    for i, (method, params) in enumerate(calls)]
+        self.connection.send_bytes(json.dumps(requests).encode('utf-8'))
+        replies = self._receive()
+        if isinstance(replies, dict):
+            _result(replies)  # The whole batch was rejected
+        by_id = {reply.get("id"): reply for reply in replies}
+        return [_result(by_id[request["id"]]) for request in requests]
+
+    def wait_event(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next notification, waiting up to timeout seconds for one; None if none came"""
+        if not self.events and self.connection.poll(timeout):
+            self.events.append(json.loads(self.connection.recv_bytes()))
+        return self.events.popleft() if self.events else None
+
+    def read(self, address: int, size: int = 4, target: Optional[str] = None) -> Optional[bytes]:
+        data = self.call("read", address=address, size=size, target=target)
+        return None if data is None else bytes.fromhex(data)
+
+    def read_many(self, reads: List[Tuple[int, int]], target: Optional[str] = None) -> List[Optional[bytes]]:
+        return [None if data is None else bytes.fromhex(data)
+                for data in self.call("read_many", reads=reads, target=target)]
+
+    def write(self, address: int, data: bytes, target: Optional[str] = None, label: Optional[str] = None) -> bool:
+        return self.call("write", address=address, data=data.hex(), target=target, label=label)
+
+    def write_batch(self, writes: List[Tuple[int, bytes, Optional[str]]], label: Optional[str] = None) -> List[bool]:
+        return self.call("write_batch", writes=[[address, data.hex(), entry_label]
+                                                for address, data, entry_label in writes], label=label)
+
+
+def _result(reply: Dict) -> Any:
+    if "error" in reply:
+        raise RpcError(reply["error"]["code"], reply["error"]["message"])
+    return reply.get("result")
+
+
+# Global instance
+rpc_server = RpcServer()
+
+
+def main(argv=None) -> int:
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="PvZModTool RPC daemon")
+    parser.add_argument("--exe", help="PlantsVsZombies.exe whose section table maps file offsets")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help=f"Pipe or socket path (default {DEFAULT_ADDRESS})")
+    args = parser.parse_args(argv)
+
+    if args.exe:
+        from relocation import address_relocator
+        file_io_manager.set_exe_path(args.exe)
+        address_relocator.load_for_exe(args.exe)
+    rpc_server.address = args.address
+    if not rpc_server.start():
+        return 1
+    file_io_manager.discovery.start()
+    print(f"Serving on {args.address}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        rpc_server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+PE signature scanner for PvZModTool
+Compiles the CFF Explorer signature database into a cached multi-pattern matcher
+"""
+import os
+import pickle
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from pe_sections import parse_section_map, HEADER_READ_SIZE
+
+
+SIGNATURES_DIR = os.path.join(os.getcwd(), "tools", "CFF_Explorer", "Signatures")
+CACHE_DIR = os.path.join(os.getcwd(), "cache")
+
+# Bump when the pickled layout changes so stale caches are rebuilt
+CACHE_VERSION = 1
+
+MACHINE_FILES = {
+    0x14C: "IMAGE_FILE_MACHINE_I386.xml",
+    0x8664: "IMAGE_FILE_MACHINE_AMD64.xml",
+    0x1C0: "IMAGE_FILE_MACHINE_ARM.xml",
+    0x200: "IMAGE_FILE_MACHINE_IA64.xml",
+}
+PLATFORM_INDEPENDENT_FILE = "PLATFORM_INDEPENDENT.xml"
+
+# Matches with these words are compilers/linkers, anything else is treated as a packer or protector
+COMPILER_KEYWORDS = (
+    "visual c", "visual basic", "microsoft", "borland", "delphi", "mingw", "watcom",
+    "gcc", "lcc", "masm", "tasm", "fasm", "pascal", "compiler", "linker",
+)
+
+
+def parse_pattern(text: str) -> Optional[List[Tuple[int, bytes]]]:
+    """Parse a CFF pattern like '6068????B8' into (offset, literal) segments.
+
+    Returns None for patterns using jump/variable tokens the matcher cannot express.
+    A trailing wildcard run is kept as a segment with empty bytes so the length is known.
+    """
+    text = "".join(text.split()).upper()
+    if not text or len(text) % 2:
+        return None
+
+    segments = []
+    literal = bytearray()
+    literal_start = 0
+    for i in range(0, len(text), 2):
+        token = text[i:i + 2]
+        offset = i // 2
+        if all(c in "0123456789ABCDEF" for c in token):
+            if not literal:
+                literal_start = offset
+            literal.append(int(token, 16))
+        elif all(c in "0123456789ABCDEF?" for c in token):
+            # Whole or half-byte wildcard
+            if literal:
+                segments.append((literal_start, bytes(literal)))
+                literal = bytearray()
+        else:
+            return None
+    if literal:
+        segments.append((literal_start, bytes(literal)))
+    if not segments:
+        return None
+    segments.append((len(text) // 2, b''))
+    return segments
+
+
+# Padding and filler bytes that make poor anchors because they occur in long runs
+FILLER_BYTES = frozenset((0x00, 0x90, 0xCC, 0xFF))
+
+# Anchor bytes the prefilter regex looks at, the trie walk checks the rest
+PREFILTER_DEPTH = 4
+
+
+def anchor_score(literal: bytes) -> Tuple[int, int]:
+    """Rank a literal run by how selective it is as a search anchor"""
+    return sum(1 for byte in literal if byte not in FILLER_BYTES), len(literal)
+
+
+def is_selective(segments: List[Tuple[int, bytes]]) -> bool:
+    """True if the pattern has at least one literal byte that is not padding"""
+    return any(anchor_score(literal)[0] for _, literal in segments)
+
+
+class PatternMatcher:
+    """Multi-pattern matcher for wildcarded byte patterns.
+
+    Each pattern is anchored on its most selective literal run. One regex over all
+    anchor prefixes finds candidate positions in C, a trie of the anchors enumerates every
+    anchor starting there, and the remaining literal segments are verified in place.
+    """
+
+    def __init__(self, patterns: List[List[Tuple[int, bytes]]]):
+        self.patterns = patterns
+        self.anchors = []  # (anchor offset within pattern, anchor literal) per pattern
+        self._goto: List[Dict[int, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+
+        for index, segments in enumerate(patterns):
+            offset, literal = max(segments, key=lambda seg: anchor_score(seg[1]))
+            # Start the anchor on a non-filler byte so the regex can skip padding runs quickly
+            while literal[0] in FILLER_BYTES:
+                offset, literal = offset + 1, literal[1:]
+            self.anchors.append((offset, literal))
+            self._add(literal, index)
+        self._compile()
+
+    def _add(self, literal: bytes, index: int):
+        state = 0
+        for byte in literal:
+            next_state = self._goto[state].get(byte)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][byte] = next_state
+                self._goto.append({})
+                self._output.append([])
+            state = next_state
+        self._output[state].append(index)
+
+    def _trie_regex(self, state: int, depth: int = 0) -> bytes:
+        """Regex source for the anchor prefixes below a trie node, with shared prefixes factored
+        out so the regex engine tests one branch per byte instead of one per anchor"""
+        children = self._goto[state]
+        if depth == PREFILTER_DEPTH:
+            return b''
+        branches = [re.escape(bytes([byte])) + self._trie_regex(child, depth + 1)
+                    for byte, child in sorted(children.items())]
+        if self._output[state] or not branches:
+            # An anchor ends here, nothing more is needed to report a candidate
+            return b''
+        if len(branches) == 1:
+            return branches[0]
+        return b'(?:' + b'|'.join(branches) + b')'
+
+    def _compile(self):
+        self._prefilter = re.compile(self._trie_regex(0), re.DOTALL) if self._goto[0] else None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_prefilter']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def _verify(self, data, index: int, start: int, end: int) -> bool:
+        segments = self.patterns[index]
+        if start < 0 or start + segments[-1][0] > end:
+            return False
+        for offset, literal in segments:
+            position = start + offset
+            if literal and data[position:position + len(literal)] != literal:
+                return False
+        return True
+
+    def scan(self, data, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Yield (pattern index, match offset) for every pattern found in data[start:end]"""
+        if end is None:
+            end = len(data)
+        if self._prefilter is None:
+            return
+        goto, output, anchors, search = self._goto, self._output, self.anchors, self._prefilter.search
+        candidate = search(data, start, end)
+        while candidate is not None:
+            position = candidate.start()
+            # Restart one byte later rather than after the match so overlapping anchors are found
+            candidate = search(data, position + 1, end)
+            state = 0
+            cursor = position
+            while cursor < end:
+                state = goto[state].get(data[cursor])
+                if state is None:
+                    break
+                cursor += 1
+                for index in output[state]:
+                    match_start = position - anchors[index][0]
+                    if match_start >= start and self._verify(data, index, match_start, end):
+                        yield index, match_start
+
+
+class SignatureMatch(NamedTuple):
+    name: str
+    comments: str
+    offset: int
+    entry_point: bool
+
+
+class SignatureDatabase:
+    """Compiled signatures for one machine type"""
+
+    def __init__(self, names: List[str], comments: List[str], entry_point_flags: List[bool],
+                 patterns: List[List[Tuple[int, bytes]]], skipped: int):
+        self.names = names
+        self.comments = comments
+        self.skipped = skipped
+        # Entry point and whole-PE signatures get separate matchers: the former only
+        # ever needs to look at a small window after the entry point
+        self.entry_point_indices = [i for i, flag in enumerate(entry_point_flags) if flag]
+        self.whole_pe_indices = [i for i, flag in enumerate(entry_point_flags) if not flag]
+        self.entry_point_matcher = PatternMatcher([patterns[i] for i in self.entry_point_indices])
+        self.whole_pe_matcher = PatternMatcher([patterns[i] for i in self.whole_pe_indices])
+        self.entry_point_window = max((patterns[i][-1][0] for i in self.entry_point_indices), default=0)
+
+    @classmethod
+    def from_xml(cls, xml_paths: List[str]) -> 'SignatureDatabase':
+        names, comments, flags, patterns = [], [], [], []
+        skipped = 0
+        for xml_path in xml_paths:
+            if not os.path.exists(xml_path):
+                continue
+            for entry in ET.parse(xml_path).getroot().iter("ENTRY"):
+                name = (entry.findtext("NAME") or "").strip()
+                comment = (entry.findtext("COMMENTS") or "").strip()
+                for tag, entry_point in (("ENTRYPOINT", True), ("ENTIREPE", False)):
+                    text = (entry.findtext(tag) or "").strip()
+                    if not text:
+                        continue
+                    segments = parse_pattern(text)
+                    if segments is None or not is_selective(segments):
+                        skipped += 1
+                        continue
+                    names.append(name)
+                    comments.append(comment)
+                    flags.append(entry_point)
+                    patterns.append(segments)
+        return cls(names, comments, flags, patterns, skipped)
+
+    def scan(self, data, entry_point_offset: Optional[int],
+             regions: List[Tuple[int, int]]) -> List[SignatureMatch]:
+        """Match entry point signatures at entry_point_offset and whole-PE signatures
+        anywhere inside the (start, end) regions, visiting each region once."""
+        matches = []
+        if entry_point_offset is not None:
+            window_end = min(len(data), entry_point_offset + self.entry_point_window)
+            for index, offset in self.entry_point_matcher.scan(data, entry_point_offset, window_end):
+                if offset == entry_point_offset:
+                    name_index = self.entry_point_indices[index]
+                    matches.append(SignatureMatch(self.names[name_index], self.comments[name_index], offset, True))
+
+        seen = set()
+        for start, end in regions:
+            for index, offset in self.whole_pe_matcher.scan(data, start, end):
+                if index in seen:
+                    continue
+                seen.add(index)
+                name_index = self.whole_pe_indices[index]
+                matches.append(SignatureMatch(self.names[name_index], self.comments[name_index], offset, False))
+        return matches
+
+
+_databases: Dict[int, SignatureDatabase] = {}
+
+
+def _cache_path(machine: int) -> str:
+    return os.path.join(CACHE_DIR, f"signatures_{machine:04X}.pickle")
+
+
+def _source_stamp(xml_paths: List[str]) -> Tuple:
+    stamp = [CACHE_VERSION]
+    for xml_path in xml_paths:
+        try:
+            stat = os.stat(xml_path)
+            stamp.append((os.path.basename(xml_path), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            stamp.append((os.path.basename(xml_path), None, None))
+    return tuple(stamp)
+
+
+def load_signature_database(machine: int = 0x14C) -> SignatureDatabase:
+    """Load the compiled database for a machine type, parsing the XML only when the cache is stale"""
+    if machine in _databases:
+        return _databases[machine]
+
+    xml_paths = [os.path.join(SIGNATURES_DIR, PLATFORM_INDEPENDENT_FILE)]
+    if machine in MACHINE_FILES:
+        xml_paths.append(os.path.join(SIGNATURES_DIR, MACHINE_FILES[machine]))
+    stamp = _source_stamp(xml_paths)
+    cache_path = _cache_path(machine)
+
+    database = None
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_stamp, cached_database = pickle.load(f)
+        if cached_stamp == stamp:
+            database = cached_database
+    except Exception:
+        pass
+
+    if database is None:
+        database = SignatureDatabase.from_xml(xml_paths)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump((stamp, database), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Error saving signature cache: {e}")
+
+    _databases[machine] = database
+    return database
+
+
+class ExeReport(NamedTuple):
+    matches: List[SignatureMatch]
+    packers: List[str]
+    supported: bool
+    reason: str
+
+
+def is_compiler_signature(name: str) -> bool:
+    lowered = name.lower()
+    return any(keyword in lowered for keyword in COMPILER_KEYWORDS)
+
+
+def scan_exe(exe_path: str) -> ExeReport:
+    """Identify the compiler/packer of an EXE and decide whether it is safe to patch"""
+    try:
+        with open(exe_path, 'rb') as f:
+            data = f.read()
+        section_map = parse_section_map(data[:HEADER_READ_SIZE])
+    except Exception as e:
+        return ExeReport([], [], False, f"Not a readable PE file: {e}")
+
+    if section_map.machine != 0x14C:
+        return ExeReport([], [], False, f"Unsupported machine type {hex(section_map.machine)}")
+
+    regions = []
+    for section in section_map.sections:
+        start = section.raw_offset
+        end = min(len(data), section.raw_offset + section.raw_size)
+        if start < end:
+            regions.append((start, end))
+    regions.sort()
+
+    database = load_signature_database(section_map.machine)
+    matches = database.scan(data, section_map.rva_to_file_offset(section_map.entry_point), regions)
+    packers = list(dict.fromkeys(match.name for match in matches if not is_compiler_signature(match.name)))
+    if packers:
+        return ExeReport(matches, packers, False, f"Packed or protected: {', '.join(packers)}")
+    return ExeReport(matches, packers, True, "OK")
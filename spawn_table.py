@@ -0,0 +1,189 @@
+"""
+Adventure spawn table model for PvZModTool
+The spawn grid (zombie type x adventure level) as a NumPy array with bulk row, column, world,
+mask and region edits; the model remembers what the target holds, so any edit turns into the
+minimal set of changed cells, written back as one batch
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+# Spawn table: cell address = base + column * 0x04 + row * 0xCC
+SPAWN_BASE_ADDRESS = 0x2A35B4
+SPAWN_COLUMN_STRIDE = 0x04
+SPAWN_ROW_STRIDE = 0xCC
+
+GRID_HEIGHT = 32  # Zombie types
+GRID_WIDTH = 50  # Adventure levels 1-1 .. 5-10
+WORLDS = 5
+LEVELS_PER_WORLD = 10
+
+ROW_NAMES = [
+    "Zombie", "Flag", "Conehead", "Pole Vaulter", "Buckethead", "Newspaper",
+    "Screen Door", "Football", "Dancing", "Backup Dancer", "Ducky Tube", "Snorkel",
+    "Zomboni", "Bobsled Team", "Dolphin Rider", "Jack-In-The-Box", "Balloon",
+    "Digger", "Pogo", "Yeti", "Bungee", "Ladder", "Catapult", "Gargantuar",
+    "Imp", "Zomboss", "Peashooter", "Wall-nut", "Jalapeno", "Gatling Pea",
+    "Squash", "Tall-Nut", "Giga-Garg"
+]
+COLUMN_NAMES = [f"{world}-{level}" for world in range(1, WORLDS + 1) for level in range(1, LEVELS_PER_WORLD + 1)]
+
+POOL_WORLDS = (3, 4)  # Pool and Fog
+POOL_ROWS = ("Ducky Tube", "Snorkel", "Dolphin Rider")
+
+Index = Union[int, slice, Sequence[int], np.ndarray]
+
+
+def table_size(height: int = GRID_HEIGHT, width: int = GRID_WIDTH) -> int:
+    """Bytes from the first to the last cell of the table"""
+    return (height - 1) * SPAWN_ROW_STRIDE + (width - 1) * SPAWN_COLUMN_STRIDE + 1
+
+
+def cell_offsets(height: int = GRID_HEIGHT, width: int = GRID_WIDTH) -> np.ndarray:
+    """[row, column] -> offset of the cell from the start of the table"""
+    return np.add.outer(np.arange(height) * SPAWN_ROW_STRIDE, np.arange(width) * SPAWN_COLUMN_STRIDE)
+
+
+def world_columns(world: int) -> slice:
+    """Columns of one world (1-5)"""
+    return slice((world - 1) * LEVELS_PER_WORLD, world * LEVELS_PER_WORLD)
+
+
+def world_mask(worlds: Sequence[int], width: int = GRID_WIDTH) -> np.ndarray:
+    """Boolean column mask of the given worlds"""
+    selected = np.zeros(width, dtype=bool)
+    for world in worlds:
+        selected[world_columns(world)] = True
+    return selected
+
+
+def level_column(world: int, level: int) -> int:
+    """Column of level world-level, both counted from 1"""
+    return (world - 1) * LEVELS_PER_WORLD + level - 1
+
+
+def row_index(name: str) -> int:
+    return ROW_NAMES.index(name)
+
+
+class CellChange(NamedTuple):
+    """Cells that differ from the target: parallel arrays of rows, columns and new values"""
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class SpawnTable:
+    """Spawn grid as a (rows, columns) uint8 array of 0/1 cells.
+
+    Edits change cells only; pending() compares them with the last state known to be on
+    the target and returns what has to be written, mark_written() and rollback() settle
+    it once the write is done.
+    """
+
+    def __init__(self, height: int = GRID_HEIGHT, width: int = GRID_WIDTH):
+        self.cells = np.zeros((height, width), dtype=np.uint8)
+        self._written = self.cells.copy()  # What the target holds, as far as we know
+        self._offsets = cell_offsets(height, width)
+
+    @property
+    def height(self) -> int:
+        return self.cells.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.cells.shape[1]
+
+    def load(self, spawn_bytes: Optional[bytes]) -> int:
+        """Take cells from the raw table read from the target (None - every cell off); returns cells read"""
+        if spawn_bytes is None:
+            self.cells[:] = 0
+        else:
+            table = np.frombuffer(spawn_bytes, dtype=np.uint8)
+            self.cells[:] = table[self._offsets] != 0
+        self._written[:] = self.cells
+        return 0 if spawn_bytes is None else self.cells.size
+
+    def tolist(self) -> List[List[int]]:
+        return self.cells.tolist()
+
+    # --- edits ---
+
+    @staticmethod
+    def _index(rows: Index, cols: Index):
+        """Rows x columns; two lists select their cross product like two slices would"""
+        if not isinstance(rows, (int, np.integer, slice)) and not isinstance(cols, (int, np.integer, slice)):
+            return np.ix_(rows, cols)
+        return rows, cols
+
+    def set(self, rows: Index, cols: Index, value: int):
+        """Turn the selected cells on (1) or off (0)"""
+        self.cells[self._index(rows, cols)] = 1 if value else 0
+
+    def toggle(self, row: int, col: int) -> int:
+        self.cells[row, col] ^= 1
+        return int(self.cells[row, col])
+
+    def mask(self, rows: Index = slice(None), cols: Index = slice(None)) -> np.ndarray:
+        """Boolean (rows, columns) mask of the selected cells, to combine with & | ~"""
+        selected = np.zeros(self.cells.shape, dtype=bool)
+        selected[self._index(rows, cols)] = True
+        return selected
+
+    def set_mask(self, mask: np.ndarray, value: int):
+        """Turn every cell under mask on or off"""
+        self.cells[mask] = 1 if value else 0
+
+    def copy_region(self, rows: Index = slice(None), cols: Index = slice(None)) -> np.ndarray:
+        """Copy of a region, for paste_region"""
+        return self.cells[self._index(rows, cols)].copy()
+
+    def paste_region(self, region: np.ndarray, row: int, col: int):
+        """Put a copied region with its top left cell at (row, col); what falls outside the grid is dropped"""
+        region = np.atleast_2d(region)
+        height = min(region.shape[0], self.height - row)
+        width = min(region.shape[1], self.width - col)
+        if height > 0 and width > 0:
+            self.cells[row:row + height, col:col + width] = region[:height, :width] != 0
+
+    def copy_world(self, source: int, destination: int, rows: Index = slice(None)):
+        """Copy the column pattern of world source onto world destination"""
+        self.cells[rows, world_columns(destination)] = self.cells[rows, world_columns(source)]
+
+    # --- write back ---
+
+    def layout(self) -> CellChange:
+        """Every cell, for writing the whole grid regardless of what the target holds"""
+        rows, cols = np.indices(self.cells.shape).reshape(2, -1)
+        return CellChange(rows, cols, self.cells[rows, cols].copy())
+
+    def pending(self) -> CellChange:
+        """Cells changed since the last load or write"""
+        rows, cols = np.nonzero(self.cells != self._written)
+        return CellChange(rows, cols, self.cells[rows, cols].copy())
+
+    def writes(self, base_address: int, change: CellChange, label: Optional[str] = None) -> List[Tuple[int, bytes, Optional[str]]]:
+        """(address, byte, label) writes of a change for write_memory_batch / write_file_batch"""
+        addresses = base_address + self._offsets[change.rows, change.cols]
+        return [(int(address), bytes([int(value)]), label) for address, value in zip(addresses, change.values)]
+
+    def mark_written(self, change: CellChange):
+        """The target now holds change"""
+        self._written[change.rows, change.cols] = change.values
+
+    def mark_cell_written(self, row: int, col: int, value: int):
+        """The target now holds value in one cell (single-cell edits written outside pending())"""
+        self._written[row, col] = value
+
+    def rollback(self, change: CellChange) -> np.ndarray:
+        """Undo a change that failed to write, except cells edited again since; returns a mask of the cells reset"""
+        reset = np.zeros(self.cells.shape, dtype=bool)
+        still = self.cells[change.rows, change.cols] == change.values
+        rows, cols = change.rows[still], change.cols[still]
+        self.cells[rows, cols] = self._written[rows, cols]
+        reset[rows, cols] = True
+        return reset
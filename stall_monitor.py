@@ -0,0 +1,160 @@
+"""
+Tk event-loop stall monitor for PvZModTool
+A heartbeat after() timer measures event-loop latency; a sampler thread grabs the Tk thread's
+stack while the heartbeat is late, so each stall is attributed to the callback that caused it
+"""
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+from instrumentation import instrumentation
+
+
+DEFAULT_THRESHOLD = 0.1  # Seconds of event-loop latency reported as a stall
+HEARTBEAT_INTERVAL = 0.05
+MAX_STALLS = 500  # Stalls kept in memory for the report
+STACK_DEPTH = 12  # Frames kept per sampled stack
+
+_TKINTER_DIR = os.path.dirname(os.path.abspath(__import__('tkinter').__file__))
+
+
+class Stall(NamedTuple):
+    started: float  # time.time() when the stall began
+    duration: float
+    callback: str
+    stack: str
+
+
+def _is_tkinter_frame(frame) -> bool:
+    return os.path.dirname(os.path.abspath(frame.f_code.co_filename)) == _TKINTER_DIR
+
+
+def _callback_name(frame) -> str:
+    code = frame.f_code
+    self_obj = frame.f_locals.get('self')
+    owner = f"{type(self_obj).__name__}." if self_obj is not None else ""
+    return f"{owner}{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def attribute_stack(frame) -> str:
+    """Name the Tk callback a stack is running: the first non-tkinter frame under Tk's dispatch"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()  # Outermost first
+
+    callback = None
+    for index, current in enumerate(frames):
+        # CallWrapper.__call__ (commands, bindings) and after() wrappers dispatch into Python code
+        if _is_tkinter_frame(current) and current.f_code.co_name in ('__call__', 'callit'):
+            for inner in frames[index + 1:]:
+                if not _is_tkinter_frame(inner):
+                    callback = inner
+                    break
+    if callback is None:
+        # Not inside a Tk callback (e.g. blocking work before mainloop): use the innermost project frame
+        for current in reversed(frames):
+            if not _is_tkinter_frame(current):
+                callback = current
+                break
+    return _callback_name(callback) if callback is not None else "<unknown>"
+
+
+class StallMonitor:
+    """Watchdog for the Tk thread; call start() after the root window exists"""
+
+    def __init__(self, root, threshold: float = DEFAULT_THRESHOLD, interval: float = HEARTBEAT_INTERVAL):
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: List[Stall] = []
+        self._tk_thread_id = threading.get_ident()
+        self._expected = 0.0  # perf_counter() when the next heartbeat should fire
+        self._samples: List[tuple] = []  # (callback, stack) captured during the current stall
+        self._lock = threading.Lock()
+        self._running = False
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._tk_thread_id = threading.get_ident()
+        self._schedule()
+        self._sampler = threading.Thread(target=self._sample_loop, name="StallSampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._running = False
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval
+        try:
+            self.root.after(int(self.interval * 1000), self._heartbeat)
+        except Exception:
+            # Root window destroyed
+            self._running = False
+
+    def _heartbeat(self):
+        if not self._running:
+            return
+        lateness = time.perf_counter() - self._expected
+        if lateness >= self.threshold:
+            with self._lock:
+                samples, self._samples = self._samples, []
+            self._record(lateness, samples)
+        else:
+            with self._lock:
+                self._samples = []
+        self._schedule()
+
+    def _sample_loop(self):
+        period = max(self.threshold / 4, 0.005)
+        while self._running:
+            time.sleep(period)
+            late = time.perf_counter() - self._expected
+            if late < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._tk_thread_id)
+            if frame is None:
+                continue
+            callback = attribute_stack(frame)
+            stack = "".join(traceback.format_list(traceback.extract_stack(frame, limit=STACK_DEPTH)))
+            del frame
+            with self._lock:
+                self._samples.append((callback, stack))
+
+    def _record(self, duration: float, samples: List[tuple]):
+        if samples:
+            # The callback seen in most samples owns the stall
+            callback = Counter(name for name, _ in samples).most_common(1)[0][0]
+            stack = next(stack for name, stack in samples if name == callback)
+        else:
+            callback, stack = "<not sampled>", ""
+        stall = Stall(time.time() - duration, duration, callback, stack)
+        self.stalls.append(stall)
+        if len(self.stalls) > MAX_STALLS:
+            del self.stalls[0]
+        instrumentation.count(f"ui.stall {callback}")
+        print(f"UI stall {duration * 1000:.0f} ms in {callback}")
+
+    def report(self) -> str:
+        """Stalls grouped by callback, worst total first"""
+        totals = {}
+        for stall in self.stalls:
+            count, total, worst = totals.get(stall.callback, (0, 0.0, 0.0))
+            totals[stall.callback] = (count + 1, total + stall.duration, max(worst, stall.duration))
+        lines = [f"{'callback':60s} {'stalls':>6s} {'total ms':>10s} {'max ms':>8s}"]
+        for callback, (count, total, worst) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{callback[:60]:60s} {count:6d} {total * 1000:10.0f} {worst * 1000:8.0f}")
+        if self.stalls:
+            worst_stall = max(self.stalls, key=lambda stall: stall.duration)
+            lines.append("")
+            lines.append(f"Longest stall ({worst_stall.duration * 1000:.0f} ms) in {worst_stall.callback}:")
+            lines.append(worst_stall.stack)
+        return "\n".join(lines)
@@ -0,0 +1,108 @@
+"""
+Startup mod for PvZModTool
+Launches the game, targets the launched PID without scanning for it, and applies a set of
+process patches as one coalesced batch as soon as the image is mapped
+"""
+import subprocess
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import addresses
+from file_io_utils import file_io_manager
+from instrumentation import instrumentation
+from process_fleet import process_fleet
+from relocation import address_relocator
+from write_queue import MAX_WRITE_GAP
+
+
+MAP_TIMEOUT = 10.0  # Seconds to wait for the image to become readable
+POLL_INTERVAL = 0.001  # Seconds between reads of the probe address while waiting
+
+Write = Tuple[int, bytes, Optional[str]]  # (file offset, bytes, label) as taken by write_memory_batch
+
+
+class LaunchReport(NamedTuple):
+    pid: int
+    written: int
+    total: int
+    mapped_seconds: Optional[float]  # Launch to the first successful read of the image, None if it never came
+    apply_seconds: Optional[float]  # The batch write alone
+
+    @property
+    def total_seconds(self) -> Optional[float]:
+        """Launch to the last patched byte"""
+        if self.mapped_seconds is None or self.apply_seconds is None:
+            return None
+        return self.mapped_seconds + self.apply_seconds
+
+
+def patch_writes(names: Iterable[str], replacements: Optional[Dict] = None) -> List[Write]:
+    """Replacement bytes of the named multi-byte patches, at their addresses in the current build"""
+    replacements = replacements if replacements is not None else addresses.multi_byte_replacements
+    writes = []
+    for name in names:
+        info = replacements.get(name)
+        if not isinstance(info, dict):
+            continue
+        address = address_relocator.translate(info["addresses"])
+        if address is None:
+            print(f"Patch {name} not found in this build, skipped")
+            continue
+        writes.append((address, info["replacement_bytes"], name))
+    return writes
+
+
+def freeze_writes(frozen) -> List[Write]:
+    """Values of a freeze list (ValueFreezer.frozen()) as writes"""
+    return [(value.address, value.data, value.label) for value in frozen]
+
+
+def wait_until_mapped(address: int, manager=file_io_manager, timeout: float = MAP_TIMEOUT,
+                      exited: Optional[Callable[[], bool]] = None) -> bool:
+    """Poll a read of address until the game's image answers; False on timeout or if exited() says so"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if manager.read_memory_raw(address, 1, rescan=True) is not None:
+            return True
+        if exited is not None and exited():
+            return False
+        time.sleep(POLL_INTERVAL)
+    return False
+
+
+def apply_when_mapped(pid: int, writes: List[Write], started: float, manager=file_io_manager,
+                      label: Optional[str] = None, timeout: float = MAP_TIMEOUT,
+                      exited: Optional[Callable[[], bool]] = None) -> LaunchReport:
+    """Write the batch into the already targeted process pid once its image is mapped.
+
+    started is the perf_counter() taken right before the launch, both latencies count from it.
+    """
+    if not writes:
+        return LaunchReport(pid, 0, 0, None, None)
+    with instrumentation.span("launch.wait_mapped", "process"):
+        mapped = wait_until_mapped(min(address for address, _, _ in writes), manager, timeout, exited)
+    if not mapped:
+        print(f"Image of process {pid} not readable after {timeout}s, startup mod not applied")
+        return LaunchReport(pid, 0, len(writes), None, None)
+    mapped_at = time.perf_counter()
+    with instrumentation.span("launch.apply", "process"), manager.transaction(label or "Startup mod"):
+        results = manager.write_memory_batch(writes, MAX_WRITE_GAP)
+    report = LaunchReport(pid, sum(results), len(writes), mapped_at - started, time.perf_counter() - mapped_at)
+    print(f"Startup mod: {report.written}/{report.total} writes in process {pid}, "
+          f"mapped after {report.mapped_seconds * 1000:.1f} ms, applied in {report.apply_seconds * 1000:.2f} ms")
+    return report
+
+
+def launch(exe_path: str, writes: List[Write], cwd: Optional[str] = None, label: Optional[str] = None,
+           fleet=process_fleet, timeout: float = MAP_TIMEOUT) -> Tuple[subprocess.Popen, LaunchReport]:
+    """Start the game, make its PID the main target and apply writes before it gets far.
+
+    Returns the Popen (the caller waits on it) and the report of the startup batch.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([exe_path], cwd=cwd)
+    # The PID is known, no need to find it in the process list
+    fleet.adopt(process.pid)
+    report = apply_when_mapped(process.pid, writes, started, fleet.manager, label, timeout,
+                               exited=lambda: process.poll() is not None)
+    return process, report
@@ -0,0 +1,257 @@
+"""
+Write log for PvZModTool
+Append-only, length-prefixed binary log of every committed edit in a project, and a replay
+engine that rebuilds a modded EXE from a pristine one in a single coalesced write
+
+Usage:
+    python write_log.py dump PROJECT/edits.pvzlog
+    python write_log.py replay PROJECT/edits.pvzlog PlantsVsZombies.exe -o Modded.exe
+"""
+import os
+import shutil
+import struct
+import threading
+import time
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from address_table import coalesce_ranges, label_for
+from file_io_utils import file_io_manager, PROCESS_TARGET
+
+
+LOG_FILE_NAME = "edits.pvzlog"
+LOG_MAGIC = b'PVZL'
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct('<4sI')
+RECORD_LENGTH = struct.Struct('<I')
+# timestamp, target kind, entry count, label length
+RECORD_HEADER = struct.Struct('<dBHH')
+# offset, length, label length; then old bytes, new bytes, label
+ENTRY_HEADER = struct.Struct('<IIH')
+
+TARGET_EXE = 0
+TARGET_PROCESS = 1
+
+
+class LogEntry(NamedTuple):
+    offset: int
+    old: bytes
+    new: bytes
+    label: str  # Name from addresses.py, empty if the offset is not a known address
+
+
+class LogRecord(NamedTuple):
+    timestamp: float
+    target_kind: int
+    label: str
+    entries: List[LogEntry]
+
+
+def encode_record(record: LogRecord) -> bytes:
+    label = record.label.encode('utf-8')
+    parts = [RECORD_HEADER.pack(record.timestamp, record.target_kind, len(record.entries), len(label)), label]
+    for entry in record.entries:
+        entry_label = entry.label.encode('utf-8')
+        parts.append(ENTRY_HEADER.pack(entry.offset, len(entry.new), len(entry_label)))
+        parts.extend((entry.old, entry.new, entry_label))
+    payload = b''.join(parts)
+    return RECORD_LENGTH.pack(len(payload)) + payload
+
+
+def decode_record(payload: bytes) -> LogRecord:
+    timestamp, target_kind, count, label_length = RECORD_HEADER.unpack_from(payload)
+    position = RECORD_HEADER.size
+    label = payload[position:position + label_length].decode('utf-8')
+    position += label_length
+    entries = []
+    for _ in range(count):
+        offset, length, entry_label_length = ENTRY_HEADER.unpack_from(payload, position)
+        position += ENTRY_HEADER.size
+        old = payload[position:position + length]
+        new = payload[position + length:position + 2 * length]
+        position += 2 * length
+        entry_label = payload[position:position + entry_label_length].decode('utf-8')
+        position += entry_label_length
+        entries.append(LogEntry(offset, old, new, entry_label))
+    return LogRecord(timestamp, target_kind, label, entries)
+
+
+def read_log(log_path: str) -> Iterator[LogRecord]:
+    """Records in write order; a torn record at the end (crash mid-append) is ignored"""
+    with open(log_path, 'rb') as f:
+        data = f.read()
+    if len(data) < LOG_HEADER.size:
+        return
+    magic, version = LOG_HEADER.unpack_from(data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{log_path} is not a version {LOG_VERSION} write log")
+    position = LOG_HEADER.size
+    while position + RECORD_LENGTH.size <= len(data):
+        (length,) = RECORD_LENGTH.unpack_from(data, position)
+        position += RECORD_LENGTH.size
+        if position + length > len(data):
+            break
+        yield decode_record(data[position:position + length])
+        position += length
+
+
+class WriteLog:
+    """Appends every committed EditJournal step to the open project's log"""
+
+    def __init__(self):
+        self.log_path: Optional[str] = None
+        self._exe_path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def open(self, log_path: str, exe_path: Optional[str] = None):
+        """Start logging to log_path; only EXE edits to exe_path (if given) and process edits are logged"""
+        with self._lock:
+            self.log_path = log_path
+            self._exe_path = os.path.abspath(exe_path) if exe_path else None
+            try:
+                if not os.path.exists(log_path) or os.path.getsize(log_path) == 0:
+                    with open(log_path, 'wb') as f:
+                        f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+                else:
+                    self._truncate_torn_tail(log_path)
+            except OSError as e:
+                print(f"Error opening write log {log_path}: {e}")
+                self.log_path = None
+
+    @staticmethod
+    def _truncate_torn_tail(log_path: str):
+        """Cut a half-written record left by a crash so new records stay readable"""
+        end = LOG_HEADER.size
+        with open(log_path, 'rb') as f:
+            data = f.read()
+        while end + RECORD_LENGTH.size <= len(data):
+            (length,) = RECORD_LENGTH.unpack_from(data, end)
+            if end + RECORD_LENGTH.size + length > len(data):
+                break
+            end += RECORD_LENGTH.size + length
+        if end != len(data):
+            with open(log_path, 'r+b') as f:
+                f.truncate(end)
+
+    def set_exe_path(self, exe_path: Optional[str]):
+        self._exe_path = os.path.abspath(exe_path) if exe_path else None
+
+    def on_commit(self, label: str, entries: List[Tuple[str, int, bytes, bytes]]):
+        """EditJournal commit listener"""
+        if self.log_path is None:
+            return
+        by_kind = {}
+        for target, offset, old, new in entries:
+            if target == PROCESS_TARGET:
+                kind = TARGET_PROCESS
+            elif self._exe_path is None or os.path.abspath(target) == self._exe_path:
+                kind = TARGET_EXE
+            else:
+                continue
+            by_kind.setdefault(kind, []).append(LogEntry(offset, old, new, label_for(offset, len(new)) or ""))
+        if not by_kind:
+            return
+        data = b''.join(encode_record(LogRecord(time.time(), kind, label, kind_entries))
+                        for kind, kind_entries in by_kind.items())
+        with self._lock:
+            try:
+                with open(self.log_path, 'ab') as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"Error appending to write log: {e}")
+
+
+class ReplayResult(NamedTuple):
+    records: int
+    bytes_written: int
+    spans: int
+    mismatches: List[int]  # Offsets whose bytes did not match the log's old bytes
+
+
+def replay(log_path: str, exe_path: str, output_path: Optional[str] = None,
+           strict: bool = False) -> ReplayResult:
+    """Apply every EXE record of a log to exe_path (a pristine EXE) and write output_path.
+
+    All records are applied in memory, then the changed spans are written in one pass to a
+    temporary file that replaces the output. With strict, nothing is written if any entry's
+    old bytes do not match what the EXE holds at that point.
+    """
+    output_path = output_path or exe_path
+    with open(exe_path, 'rb') as f:
+        image = bytearray(f.read())
+
+    records = 0
+    mismatches = []
+    touched = []
+    for record in read_log(log_path):
+        if record.target_kind != TARGET_EXE:
+            continue
+        records += 1
+        for entry in record.entries:
+            end = entry.offset + len(entry.new)
+            if end > len(image):
+                mismatches.append(entry.offset)
+                continue
+            if image[entry.offset:end] != entry.old:
+                mismatches.append(entry.offset)
+            image[entry.offset:end] = entry.new
+            touched.append((entry.offset, len(entry.new)))
+
+    if strict and mismatches:
+        raise ValueError(f"{len(mismatches)} log entries do not match {exe_path}, first at {hex(mismatches[0])}")
+
+    # Copy the pristine EXE, write only the changed spans, then swap the file in
+    spans = coalesce_ranges(touched, max_gap=0)
+    temp_path = output_path + ".replay"
+    shutil.copyfile(exe_path, temp_path)
+    with open(temp_path, 'r+b') as f:
+        for start, end in spans:
+            f.seek(start)
+            f.write(image[start:end])
+    os.replace(temp_path, output_path)
+    return ReplayResult(records, sum(end - start for start, end in spans), len(spans), mismatches)
+
+
+# Global instance
+write_log = WriteLog()
+file_io_manager.journal.add_commit_listener(write_log.on_commit)
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="PvZModTool write log")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump_parser = commands.add_parser("dump", help="List the records of a log")
+    dump_parser.add_argument("log")
+    replay_parser = commands.add_parser("replay", help="Rebuild a modded EXE from a pristine one")
+    replay_parser.add_argument("log")
+    replay_parser.add_argument("exe", help="Pristine PlantsVsZombies.exe")
+    replay_parser.add_argument("-o", "--output", help="Output EXE (default: modify exe in place)")
+    replay_parser.add_argument("--strict", action="store_true", help="Fail if the EXE does not match the log")
+    args = parser.parse_args(argv)
+
+    if args.command == "dump":
+        for record in read_log(args.log):
+            kind = "process" if record.target_kind == TARGET_PROCESS else "exe"
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+            print(f"{stamp} [{kind}] {record.label}")
+            for entry in record.entries:
+                name = f"  ({entry.label})" if entry.label else ""
+                print(f"    {hex(entry.offset)}: {entry.old.hex()} -> {entry.new.hex()}{name}")
+        return 0
+
+    start = time.perf_counter()
+    try:
+        result = replay(args.log, args.exe, args.output, args.strict)
+    except (OSError, ValueError) as e:
+        print(f"Replay failed: {e}")
+        return 1
+    print(f"Replayed {result.records} records: {result.bytes_written} bytes in {result.spans} spans "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    if result.mismatches:
+        print(f"Warning: {len(result.mismatches)} entries did not match the EXE, first at {hex(result.mismatches[0])}")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Process write queue for PvZModTool
+Collects process writes and flushes them as merged spans, one read and one write per span
+"""
+import threading
+import time
+from typing import Callable, List, Optional, Union
+
+from file_io_utils import file_io_manager
+
+
+DEFAULT_FLUSH_DELAY = 0.02  # Seconds a queued write waits for neighbours before the timer flushes it
+# Writes closer than this are merged; the gap bytes are read and written back unchanged, so keep it
+# small: the game could change a gap byte between that read and the write
+MAX_WRITE_GAP = 16
+
+
+class PendingWrite:
+    """A queued write; success is None until the queue is flushed"""
+
+    def __init__(self, address: int, data: bytes, label: Optional[str], on_done: Optional[Callable]):
+        self.address = address
+        self.data = data
+        self.label = label
+        self.on_done = on_done
+        self.success: Optional[bool] = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[bool]:
+        """Block until flushed; returns success, or None on timeout"""
+        self._done.wait(timeout)
+        return self.success
+
+    def _finish(self, success: bool):
+        self.success = success
+        self._done.set()
+        if self.on_done is not None:
+            try:
+                self.on_done(success)
+            except Exception as e:
+                print(f"Error in write callback: {e}")
+
+
+class ProcessWriteQueue:
+    """Batches process writes made in quick succession.
+
+    write() only queues; flush() (or the flusher thread, flush_delay after the first queued
+    write) hands the whole batch to FileIOManager.write_memory_batch. on_done callbacks run
+    on the flushing thread, UI code passes them through io_executor.call_in_ui.
+    """
+
+    def __init__(self, manager=file_io_manager, flush_delay: float = DEFAULT_FLUSH_DELAY,
+                 max_gap: int = MAX_WRITE_GAP):
+        self.manager = manager
+        self.flush_delay = flush_delay
+        self.max_gap = max_gap
+        self._pending: List[PendingWrite] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Batches are written in the order they were taken
+        self._wake = threading.Event()  # Set when the first write of a batch is queued
+        self._flusher: Optional[threading.Thread] = None
+
+    def write(self, address: int, data: Union[int, bytes], size: int = 4, label: Optional[str] = None,
+              on_done: Optional[Callable] = None) -> PendingWrite:
+        """Queue data (an int of size bytes, or raw bytes) for address"""
+        data_bytes = data if isinstance(data, bytes) else data.to_bytes(size, byteorder='little')
+        pending = PendingWrite(address, data_bytes, label, on_done)
+        with self._lock:
+            first = not self._pending
+            self._pending.append(pending)
+            if first and self.flush_delay is not None:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="WriteQueue", daemon=True)
+                    self._flusher.start()
+                self._wake.set()
+        return pending
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            time.sleep(self.flush_delay)
+            # Usually empty already when the writer flushed on its own
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything queued so far on the calling thread; returns how many writes succeeded.
+
+        Called inside a transaction, the batch joins that undo step.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                results = self.manager.write_memory_batch(
+                    [(pending.address, pending.data, pending.label) for pending in batch], self.max_gap)
+            except Exception as e:
+                print(f"Error flushing write queue: {e}")
+                results = [False] * len(batch)
+        for pending, success in zip(batch, results):
+            pending._finish(success)
+        return sum(results)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+# Global instance
+process_write_queue = ProcessWriteQueue()